@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import json
+import numpy as np
+
+from core.ann_index import IVFIndex, top_k
+
+SIZES = [10_000, 100_000, 1_000_000]
+DIM = int(os.getenv("ANN_BENCH_DIM", "256"))
+CLUSTERS = 1000
+QUERIES = 200
+LEGACY_QUERIES = 10
+K = 10
+NPROBES = [1, 4, 8, 16, 32, 64]
+
+rng = np.random.default_rng(0)
+centers = rng.standard_normal((CLUSTERS, DIM), dtype=np.float32)
+
+def clustered(n: int, chunk_size: int = 100_000) -> np.ndarray:
+    """模擬嵌入向量：群中心加雜訊後正規化"""
+    out = np.empty((n, DIM), dtype=np.float32)
+    for i in range(0, n, chunk_size):
+        m = min(chunk_size, n - i)
+        block = centers[rng.integers(0, CLUSTERS, m)] + 0.6 * rng.standard_normal((m, DIM), dtype=np.float32)
+        out[i : i + m] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return out
+
+def legacy_search(q: np.ndarray, M: np.ndarray) -> np.ndarray:
+    """原本的做法：每次查詢重新正規化整個矩陣並完整排序"""
+    qn = q / (np.linalg.norm(q) + 1e-8)
+    Mn = M / (np.linalg.norm(M, axis=1, keepdims=True) + 1e-8)
+    return np.argsort(-(Mn @ qn))[:K]
+
+def timed_per_query(fn, queries) -> float:
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+def benchmark(n: int):
+    vectors = clustered(n)
+    queries = clustered(QUERIES)
+    truth = [set(top_k(vectors @ q, K).tolist()) for q in queries]
+
+    legacy_ms = timed_per_query(lambda q: legacy_search(q, vectors), queries[:LEGACY_QUERIES])
+    exact_ms = timed_per_query(lambda q: top_k(vectors @ q, K), queries)
+
+    index = IVFIndex(exact_threshold=0)
+    start = time.perf_counter()
+    index.build(vectors)
+    build_s = time.perf_counter() - start
+
+    print(f"\n📦 {n:,} 個向量（維度 {DIM}，nlist {index.stats()['nlist']}，建索引 {build_s:.1f} 秒）")
+    print(f"  原做法（正規化 + 完整排序） {legacy_ms:9.2f}ms")
+    print(f"  精確搜尋（預先正規化 + argpartition） {exact_ms:9.2f}ms")
+
+    probes = []
+    for nprobe in NPROBES:
+        ms = timed_per_query(lambda q: index.search(q, K, nprobe), queries)
+        recall = np.mean([
+            len(truth[i] & set(index.search(q, K, nprobe)[0].tolist())) / K
+            for i, q in enumerate(queries)
+        ])
+        speedup = exact_ms / ms if ms else float("inf")
+        print(f"  IVF nprobe={nprobe:<3} {ms:9.2f}ms   recall@{K} {recall:.3f}   ⚡ {speedup:6.1f} 倍")
+        probes.append({"nprobe": nprobe, "ms": ms, "recall": float(recall)})
+
+    return {
+        "items": n,
+        "dim": DIM,
+        "nlist": index.stats()["nlist"],
+        "build_s": build_s,
+        "legacy_ms": legacy_ms,
+        "exact_ms": exact_ms,
+        "ivf": probes
+    }
+
+def main():
+    print("🚀 近似最近鄰（IVF）與精確搜尋效能比較")
+    print("=" * 60)
+    report = [benchmark(n) for n in SIZES]
+    with open("ann_benchmark_report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("\n📄 報告已儲存至 ann_benchmark_report.json")
+
+if __name__ == "__main__":
+    main()
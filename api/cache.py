@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Dict, Any, Optional, List
 from pydantic import BaseModel
 
 from core.redis_client import redis_client
-from core.cache import CacheManager
+from core.cache import CacheManager, publish_invalidation
+from core.warmup import cache_warmer
 
 router = APIRouter()
 
@@ -18,9 +19,13 @@ class CacheValueRequest(BaseModel):
 class CachePatternRequest(BaseModel):
     pattern: str
 
+class CacheTagsRequest(BaseModel):
+    tags: List[str]
+
 class CacheInfoResponse(BaseModel):
     total_keys: int
     keys: list
+    tiers: Dict[str, Any]
     status: str
 
 @router.get("/info", response_model=CacheInfoResponse)
@@ -30,11 +35,32 @@ async def get_cache_info():
         return CacheInfoResponse(
             total_keys=info["total_keys"],
             keys=info["keys"],
+            tiers=CacheManager.get_tier_stats(),
             status="success"
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"取得快取資訊失敗: {str(e)}")
 
+@router.get("/stats")
+async def get_cache_stats():
+    try:
+        return {
+            **CacheManager.get_stats(),
+            "namespaces": await CacheManager.get_budget_usage(),
+            "status": "success"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"取得快取統計失敗: {str(e)}")
+
+@router.delete("/stats")
+async def reset_cache_stats():
+    CacheManager.reset_stats()
+    return {"status": "success", "message": "快取統計已歸零"}
+
+@router.get("/warmup")
+async def get_warmup_status():
+    return {"entries": cache_warmer.stats(), "status": "success"}
+
 @router.get("/get/{key}")
 async def get_cache_value(key: str):
     try:
@@ -51,6 +77,7 @@ async def get_cache_value(key: str):
 async def set_cache_value(request: CacheValueRequest):
     try:
         success = await redis_client.set(request.key, request.value, expire=request.ttl)
+        await publish_invalidation(keys=[request.key])
         if success:
             return {"key": request.key, "status": "success", "message": "快取值設定成功"}
         else:
@@ -62,6 +89,7 @@ async def set_cache_value(request: CacheValueRequest):
 async def delete_cache_value(key: str):
     try:
         success = await redis_client.delete(key)
+        await publish_invalidation(keys=[key])
         if success:
             return {"key": key, "status": "success", "message": "快取值刪除成功"}
         else:
@@ -72,11 +100,19 @@ async def delete_cache_value(key: str):
 @router.post("/clear-pattern")
 async def clear_cache_pattern(request: CachePatternRequest):
     try:
-        await CacheManager.clear_pattern(request.pattern)
-        return {"pattern": request.pattern, "status": "success", "message": "快取模式清空成功"}
+        deleted = await CacheManager.clear_pattern(request.pattern)
+        return {"pattern": request.pattern, "deleted": deleted, "status": "success", "message": "快取模式清空成功"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"清空快取模式失敗: {str(e)}")
 
+@router.post("/invalidate-tags")
+async def invalidate_cache_tags(request: CacheTagsRequest):
+    try:
+        await CacheManager.invalidate_tags(*request.tags)
+        return {"tags": request.tags, "status": "success", "message": "快取標籤已失效"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"失效快取標籤失敗: {str(e)}")
+
 @router.delete("/clear-all")
 async def clear_all_cache():
     try:
@@ -86,10 +122,20 @@ async def clear_all_cache():
         raise HTTPException(status_code=500, detail=f"清空所有快取失敗: {str(e)}")
 
 @router.get("/keys")
-async def get_cache_keys(pattern: str = "*"):
+async def get_cache_keys(
+    pattern: str = "*",
+    cursor: int = Query(0, ge=0, description="上一頁回傳的 next_cursor，0 表示從頭開始"),
+    count: int = Query(100, ge=1, le=1000, description="每頁走訪的鍵數量提示")
+):
     try:
-        keys = await redis_client.keys(pattern)
-        return {"keys": keys, "count": len(keys), "status": "success"}
+        page = await CacheManager.list_keys(pattern, cursor=cursor, count=count)
+        return {
+            "keys": page["keys"],
+            "count": len(page["keys"]),
+            "next_cursor": page["next_cursor"],
+            "complete": page["next_cursor"] == 0,
+            "status": "success"
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"取得快取鍵列表失敗: {str(e)}")
 
@@ -1,128 +1,215 @@
 # api/fuzzy_search.py
 import os
-import time
 import asyncio
-import inspect
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 import numpy as np
 from fastapi import APIRouter, Query, HTTPException
 from dotenv import load_dotenv
-from openai import OpenAI
 from core.cache import cache
+from core.db import get_database
+from core.item_registry import item_registry
+from core.embedding_store import EmbeddingStore
+from core.query_vectors import QueryVectorCache, normalize_query
+from core.ann_index import IVFIndex
+from core.embedding_backends import create_backend
+from core.lexical_index import LexicalIndex
 
 load_dotenv()
 
 router = APIRouter()
-EMBED_MODEL = os.getenv("SEARCH_EMBED_MODEL", "text-embedding-3-small") 
-EMBED_DIM = 1536 if EMBED_MODEL.endswith("small") else 3072
-CACHE_TTL = int(os.getenv("SEARCH_EMBED_TTL", "300")) 
+EMBED_DIR = os.getenv("SEARCH_EMBED_DIR", "data/embeddings")
 BATCH_SIZE = int(os.getenv("SEARCH_EMBED_BATCH", "128"))
-
-# ---- OpenAI client (sync) ---------------------------------------------------
-_api_key = os.getenv("OPENAI_API_KEY")
-if not _api_key:
-    raise RuntimeError("OPENAI_API_KEY not set")
-client = OpenAI(api_key=_api_key)
-
-# ---- In-memory cache for item embeddings ------------------------------------
+CONCURRENCY = int(os.getenv("SEARCH_EMBED_CONCURRENCY", "8"))
+MAX_RETRIES = int(os.getenv("SEARCH_EMBED_MAX_RETRIES", "5"))
+# 混合模式重排時字面分數的權重（其餘為餘弦相似度）
+LEXICAL_WEIGHT = float(os.getenv("SEARCH_LEXICAL_WEIGHT", "0.3"))
+RERANK_CANDIDATES = int(os.getenv("SEARCH_RERANK_CANDIDATES", "50"))
+
+# ---- Embedding backend --------------------------------------------------------
+# SEARCH_EMBED_MODEL=local-hash[-<dim>] 使用行程內的 n-gram 雜湊，其他名稱為 OpenAI 模型
+backend = create_backend(
+    os.getenv("SEARCH_EMBED_MODEL", "text-embedding-3-small"),
+    api_key=os.getenv("OPENAI_API_KEY"),
+    batch_size=BATCH_SIZE,
+    concurrency=CONCURRENCY,
+    max_retries=MAX_RETRIES
+)
+EMBED_MODEL = backend.model
+EMBED_DIM = backend.dim
+
+# ---- Persistent item embeddings ---------------------------------------------
+# 以物品名稱雜湊為鍵存於本機磁碟，重啟後不必重算；只有新物品需要嵌入。
+# 第一次搜尋時才在執行緒池開啟（需等待檔案鎖並讀入 ids），匯入模組不會碰觸磁碟
+embedding_store: Optional[EmbeddingStore] = None
+_store_lock = asyncio.Lock()
+
+async def get_embedding_store() -> EmbeddingStore:
+    global embedding_store
+    if embedding_store is None:
+        async with _store_lock:
+            if embedding_store is None:
+                loop = asyncio.get_running_loop()
+                embedding_store = await loop.run_in_executor(None, EmbeddingStore, EMBED_DIR, EMBED_MODEL, EMBED_DIM)
+    return embedding_store
+
+# 查詢向量：以（模型, 正規化查詢）為鍵，行程內 LRU + Redis，top_k 等參數不同時不必重新嵌入
+query_vectors = QueryVectorCache(
+    EMBED_MODEL,
+    EMBED_DIM,
+    ttl=int(os.getenv("SEARCH_QUERY_VECTOR_TTL", "86400")),
+    local_max_bytes=int(os.getenv("SEARCH_QUERY_VECTOR_LOCAL_BYTES", str(16 * 1024 * 1024)))
+)
+
+# 物品向量的近似最近鄰索引（IVF），id 為 embedding_store 的列號
+item_index = IVFIndex(
+    nprobe=int(os.getenv("SEARCH_ANN_NPROBE", "8")),
+    exact_threshold=int(os.getenv("SEARCH_ANN_EXACT_THRESHOLD", "5000"))
+)
+
+# 物品名稱的前綴 + 三連字索引，新物品登錄後即可查到，不需等待嵌入
+lexical_index = LexicalIndex()
+
+# 已加入索引的物品（列號 ↔ 名稱）與對應的物品登錄表版本
 _item_cache = {
-    "items": None,            # List[str]
-    "embeddings": None,       # np.ndarray (N, D)
-    "ts": 0.0,                # unix timestamp
+    "version": None,          # 物品登錄表版本（向量索引）
+    "lexical_version": None,  # 物品登錄表版本（字面索引）
+    "names": {},              # Dict[int, str]
+    "rows": {},               # Dict[str, int]
 }
+_item_lock = asyncio.Lock()
 
 # ---- Embedding helpers -------------------------------------------------------
-def _embed_texts(texts: List[str]) -> np.ndarray:
-    """Return shape=(N, D) float32 numpy array."""
+async def _embed_texts(texts: List[str]) -> np.ndarray:
+    """Return shape=(N, D) float32 numpy array（並行批次、重試與合併進行中的請求由後端處理）"""
     if not texts:
         return np.zeros((0, EMBED_DIM), dtype=np.float32)
+    return await backend.aembed(texts)
+
+async def _sync_item_index(items: List[str], version: int):
+    # 物品登錄表版本有變（新增物品）時，只把新物品嵌入並加入索引
+    if version == _item_cache["version"]:
+        return
+    async with _item_lock:
+        if version == _item_cache["version"]:
+            return
+        store = await get_embedding_store()
+        rows = await store.arows_for(items, _embed_texts)
+        names = _item_cache["names"]
+        new_rows = np.array([row for row in rows.tolist() if row not in names], dtype=np.int64)
+        if len(new_rows):
+            # 先登記名稱再加入索引，並行查詢取得的 id 一定找得到名稱
+            added = {row: name for row, name in zip(rows.tolist(), items) if row not in names}
+            _item_cache["names"] = {**names, **added}
+            _item_cache["rows"] = {**_item_cache["rows"], **{name: row for row, name in added.items()}}
+            loop = asyncio.get_running_loop()
+            vectors = np.asarray(store.vectors[new_rows])
+            await loop.run_in_executor(None, item_index.add, vectors, new_rows)
+        _item_cache["version"] = version
+
+async def _sync_lexical_index(items: List[str], version: int):
+    # 已登錄的名稱會略過；大量新增（例如啟動後第一次查詢）交給執行緒池
+    if version == _item_cache["lexical_version"]:
+        return
+    if len(items) - len(lexical_index) > 1000:
+        await asyncio.get_running_loop().run_in_executor(None, lexical_index.add, items)
+    else:
+        lexical_index.add(items)
+    _item_cache["lexical_version"] = version
 
-    vecs: List[List[float]] = []
-    for i in range(0, len(texts), BATCH_SIZE):
-        chunk = texts[i : i + BATCH_SIZE]
-        resp = client.embeddings.create(model=EMBED_MODEL, input=chunk)
-        for d in resp.data:
-            vecs.append(d.embedding)
-    return np.asarray(vecs, dtype=np.float32)
-
-def _cosine_sim(q: np.ndarray, M: np.ndarray) -> np.ndarray:
-    """q: (D,), M: (N, D) -> sims: (N,)"""
-    qn = q / (np.linalg.norm(q) + 1e-8)
-    Mn = M / (np.linalg.norm(M, axis=1, keepdims=True) + 1e-8)
-    return Mn @ qn
-
-def _need_refresh(items: List[str]) -> bool:
-    if _item_cache["items"] is None or _item_cache["embeddings"] is None:
-        return True
-    if time.time() - _item_cache["ts"] > CACHE_TTL:
-        return True
-    # 如果物品清單內容有變，則重算
-    return items != _item_cache["items"]
-
-def _get_item_embeddings(items: List[str]) -> np.ndarray:
-    if _need_refresh(items):
-        emb = _embed_texts(items)
-        _item_cache["items"] = items
-        _item_cache["embeddings"] = emb
-        _item_cache["ts"] = time.time()
-    return _item_cache["embeddings"]
-
-# ---- Data source: api.trade.get_all_items -----------------------------------
-async def _fetch_all_item_names() -> List[str]:
+# ---- Data source: core.item_registry -----------------------------------------
+async def _fetch_all_item_names() -> Tuple[int, List[str]]:
     """
-    呼叫 api.trade.get_all_items() 取得所有 collection 名稱，
-    並以字串清單形式回傳。
+    從物品登錄表取得 (版本, 所有物品名稱)，讀取行程內快照。
     """
-    from api.trade import get_all_items
-    res = None
-    if inspect.iscoroutinefunction(get_all_items):
-        res = await get_all_items()
-    else:
-        res = get_all_items()
-        if inspect.isawaitable(res):
-            res = await res
-
-    items = []
-    if isinstance(res, dict):
-        raw = res.get("items", [])
-        items = [str(x) for x in raw]
-    return items
+    db = await get_database()
+    return await item_registry.snapshot(db)
 
 # ---- Local core (sync) ------------------------------------------------------
-def _fuzzy_search_core(query: str, items: List[str], top_k: int, min_score: float) -> List[str]:
-    if not items:
-        return []
+def _fuzzy_search_core(
+    q_vec: np.ndarray,
+    top_k: int,
+    min_score: float,
+    nprobe: Optional[int] = None,
+    lexical: Optional[List[Tuple[str, float]]] = None
+) -> List[str]:
+    ids, sims = item_index.search(q_vec, top_k, nprobe)    # 由高到低
+    names = _item_cache["names"]
+    if not lexical:
+        return [names[int(i)] for i, sim in zip(ids, sims) if float(sim) >= min_score]
+
+    # 混合重排：字面候選與向量近鄰聯集，分數 = 權重 × 字面分數 + (1 - 權重) × 餘弦相似度
+    cosine = {names[int(i)]: float(sim) for i, sim in zip(ids, sims)}
+    rows = _item_cache["rows"]
+    missing = [name for name, _ in lexical if name not in cosine and name in rows]
+    if missing:
+        q = q_vec / (np.linalg.norm(q_vec) + 1e-8)
+        vectors = np.asarray(embedding_store.vectors[[rows[name] for name in missing]])
+        cosine.update(zip(missing, (vectors @ q).tolist()))
+    lexical_scores = dict(lexical)
+    ranked = []
+    for name in dict.fromkeys([*lexical_scores, *cosine]):
+        lex, cos = lexical_scores.get(name, 0.0), cosine.get(name, 0.0)
+        if lex >= min_score or cos >= min_score:
+            ranked.append((LEXICAL_WEIGHT * lex + (1 - LEXICAL_WEIGHT) * cos, name))
+    ranked.sort(key=lambda x: -x[0])
+    return [name for _, name in ranked[:top_k]]
 
-    item_vecs = _get_item_embeddings(items)    # (N, D)
-    q_vec = _embed_texts([query])[0]           # (D,)
-    sims = _cosine_sim(q_vec, item_vecs)       # (N,)
+@cache(ttl=600, key_prefix="search:fuzzy")
+async def _semantic_search(q: str, top_k: int, min_score: float, nprobe: Optional[int], hybrid: bool) -> List[str]:
+    try:
+        version, items = await _fetch_all_item_names()
+        if not items:
+            return []
+        await _sync_item_index(items, version)
+        if backend.local:
+            # 行程內嵌入比查詢 Redis 快取更快
+            q_vec = backend.embed([normalize_query(q)])[0]
+        else:
+            q_vec = await query_vectors.get(q, _embed_texts)   # (D,)
+        lexical = lexical_index.search(q, RERANK_CANDIDATES) if hybrid else None
 
-    order = np.argsort(-sims)
-    results: List[str] = []
-    for idx in order:
-        if len(results) >= top_k:
-            break
-        if float(sims[idx]) < min_score:
-            continue
-        results.append(items[idx])
-    return results
+        loop = asyncio.get_event_loop()
+        result_list: List[str] = await loop.run_in_executor(
+            None, lambda: _fuzzy_search_core(q_vec, top_k, min_score, nprobe, lexical)
+        )
+        return result_list
+    except Exception as e:
+        return []
 
 # ---- API route (GET) --------------------------------------------------------
 @router.get("/fuzzy-search")
-@cache(ttl=600, key_prefix="search:fuzzy")
 async def fuzzy_search(
     q: str = Query(..., description="使用者查詢字串（語意模糊搜尋）"),
     top_k: int = Query(10, ge=1, le=100, description="取前 K 筆"),
     min_score: float = Query(0.20, ge=0.0, le=1.0, description="相似度門檻（0~1）"),
+    nprobe: Optional[int] = Query(None, ge=1, le=1024, description="近似搜尋比對的群數（越大召回率越高、越慢）"),
+    mode: str = Query("hybrid", pattern="^(hybrid|lexical|semantic)$", description="hybrid：字面候選與向量近鄰合併後依加權分數排序；lexical：只用字面比對；semantic：只用嵌入"),
 ) -> List[str]:
     try:
-        items = await _fetch_all_item_names()
-
-        loop = asyncio.get_event_loop()
-        result_list: List[str] = await loop.run_in_executor(
-            None, lambda: _fuzzy_search_core(q, items, top_k, min_score)
-        )
-        return result_list
+        if mode != "semantic":
+            # 字面比對只需行程內的排序陣列與倒排表，不經過 Redis 快取
+            version, items = await _fetch_all_item_names()
+            if not items:
+                return []
+            await _sync_lexical_index(items, version)
+            if mode == "lexical":
+                return [name for name, score in lexical_index.search(q, top_k) if score >= min_score]
+        results = await _semantic_search(q, top_k, min_score, nprobe, mode == "hybrid")
+        if not results and mode == "hybrid":
+            # 嵌入失敗（例如 OpenAI 無法連線）時仍回傳字面比對結果
+            return [name for name, score in lexical_index.search(q, top_k) if score >= min_score]
+        return results
     except Exception as e:
-        return []
\ No newline at end of file
+        return []
+
+@router.get("/fuzzy-search/stats")
+async def fuzzy_search_stats() -> Dict[str, Any]:
+    """嵌入後端吞吐量、向量庫、查詢向量快取、近似最近鄰索引與字面索引的統計"""
+    return {
+        "backend": backend.stats(),
+        "embedding_store": embedding_store.stats() if embedding_store is not None else None,
+        "query_vectors": query_vectors.stats(),
+        "index": item_index.stats(),
+        "lexical_index": lexical_index.stats()
+    }
@@ -1,15 +1,142 @@
-from fastapi import APIRouter, Body, status
-from fastapi.responses import JSONResponse
-from typing import Dict, Any
+from fastapi import APIRouter, Body, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
 import datetime
+import base64
+import json
+import time
+import uuid
+from bson import ObjectId
 from core.db import get_database
 import core.graph_manager as graph_manager
-from core.cache import cache, invalidate_cache
+from core.cache import cache, invalidate_cache, _etag_matches
+from core.redis_client import DateTimeEncoder, redis_client
+from core.recent_items import recent_items_index
+from core.trade_counters import trade_counters
+from core.pair_stats import pair_stats
+from core.item_registry import item_registry
+from core.candles import rate_candles, RESOLUTIONS
 
 router = APIRouter()
 
+# trade-history 以 (timestamp, _id) 由新到舊做 keyset 分頁；串流模式不受每頁筆數限制
+TRADE_HISTORY_SORT = [("timestamp", -1), ("_id", -1)]
+TRADE_HISTORY_PAGE_SIZE = 100
+TRADE_HISTORY_MAX_PAGE_SIZE = 1000
+TRADE_HISTORY_STREAM_BATCH = 500
+# 啟動時建立既有 collection 分頁索引的完成標記與跨 worker 鎖
+TRADE_HISTORY_INDEX_MARKER = "trade:history-indexed"
+TRADE_HISTORY_INDEX_LOCK = "trade:history-index-lock"
+_indexed_collections = set()
+
+def _encode_cursor(trade: Dict[str, Any]) -> str:
+    """以一頁最後一筆的 (timestamp, _id) 作為下一頁的游標"""
+    timestamp = trade.get("timestamp")
+    raw = json.dumps([timestamp.isoformat() if timestamp else None, str(trade["_id"])])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(token: str) -> Dict[str, Any]:
+    """將游標轉為「排在該筆之後」的查詢條件；格式錯誤時拋出例外"""
+    timestamp, oid = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    oid = ObjectId(oid)
+    if timestamp is None:
+        # 沒有 timestamp 的文件在遞減排序中排在最後
+        return {"timestamp": None, "_id": {"$lt": oid}}
+    timestamp = datetime.datetime.fromisoformat(timestamp)
+    return {"$or": [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "_id": {"$lt": oid}},
+        {"timestamp": None}
+    ]}
+
+async def _ensure_history_index(collection):
+    """
+    分頁查詢所需的 (timestamp, _id) 索引，每個 collection 在行程內只建立一次
+    
+    只在寫入路徑與啟動時呼叫：create_index 會建立不存在的 collection，讀取請求不得觸發。
+    """
+    if collection.name in _indexed_collections:
+        return
+    try:
+        await collection.create_index(TRADE_HISTORY_SORT)
+        _indexed_collections.add(collection.name)
+    except Exception as e:
+        print(f"建立交易歷史索引失敗: {collection.name} - {e}")
+
+async def ensure_trade_history_indexes(db, lock_timeout: int = 600):
+    """
+    啟動時為既有的交易 collection（交易歷史、物品、使用者）建立分頁索引，不會建立新 collection
+    
+    跨 worker 以分散式鎖互斥，完成後寫入標記，其他 worker 與之後的重啟直接略過
+    （之後新增的 collection 由 new_trade 建立索引）。Redis 無法使用時各自執行，
+    對已存在的索引 create_index 不會重建。
+    """
+    if await redis_client.exists(TRADE_HISTORY_INDEX_MARKER):
+        return
+    token = uuid.uuid4().hex
+    acquired = await redis_client.acquire_lock(TRADE_HISTORY_INDEX_LOCK, token, lock_timeout)
+    if acquired is False:
+        return
+    try:
+        if acquired and await redis_client.exists(TRADE_HISTORY_INDEX_MARKER):
+            return
+        existing = set(await db.list_collection_names())
+        _, items = await item_registry.snapshot(db)
+        users = await db["Trade-History"].distinct("user_a")
+        names = ({"Trade-History"} | set(items) | {u for u in users if isinstance(u, str)}) & existing
+        await asyncio.gather(*(_ensure_history_index(db[name]) for name in names))
+        if all(name in _indexed_collections for name in names):
+            await redis_client.set(TRADE_HISTORY_INDEX_MARKER, time.time())
+        print(f"📇 已確認 {len(names)} 個交易 collection 的分頁索引")
+    finally:
+        if acquired:
+            await redis_client.release_lock(TRADE_HISTORY_INDEX_LOCK, token)
+
+def _dump_trade(trade: Dict[str, Any]) -> str:
+    trade["_id"] = str(trade["_id"])
+    return json.dumps(trade, ensure_ascii=False, cls=DateTimeEncoder)
+
+async def _stream_trades(cursor):
+    """
+    逐筆輸出 NDJSON，Motor 每取回一批就送出，不在記憶體中累積整個結果
+    
+    回應標頭已送出，中途失敗時以最後一行 {"error": ..., "details": ...} 告知用戶端結果不完整。
+    """
+    try:
+        async for trade in cursor:
+            yield _dump_trade(trade) + "\n"
+    except Exception as e:
+        print(f"交易歷史串流錯誤: {e}")
+        yield json.dumps({"error": "交易歷史串流中斷", "details": str(e)}, ensure_ascii=False) + "\n"
+
+async def _stream_trade_document(cursor):
+    """
+    以與分頁相同的 JSON 格式輸出全部交易（limit <= 0），逐筆送出，不在記憶體中累積整個結果
+    
+    中途失敗時在文件末尾附上 error / details，文件仍是合法的 JSON。
+    """
+    count = 0
+    error = None
+    yield '{"trade_history":['
+    try:
+        async for trade in cursor:
+            yield ("," if count else "") + _dump_trade(trade)
+            count += 1
+    except Exception as e:
+        print(f"交易歷史串流錯誤: {e}")
+        error = {"error": "交易歷史串流中斷", "details": str(e)}
+    tail = {"count": count, "next_cursor": None, **(error or {})}
+    yield "]," + json.dumps(tail, ensure_ascii=False)[1:]
+
+def _cacheable_history_request(*args, **kwargs) -> bool:
+    """串流與「全部」（limit <= 0 且沒有 cursor）的請求逐筆輸出，不經快取"""
+    if kwargs.get("stream"):
+        return False
+    return kwargs.get("limit", -1) > 0 or bool(kwargs.get("cursor"))
+
 @router.post("/new_trade")
-@invalidate_cache(pattern="trade:*")
+@invalidate_cache(tags=["trade"])
 async def new_trade(
     user_a: str,
     item_a: str,
@@ -56,6 +183,15 @@ async def new_trade(
             "original_trade_id": trade_data["trade_id"]
         })
         item_b_result = await item_b_collection.insert_one(swapped_trade_data)
+        await asyncio.gather(*(
+            _ensure_history_index(c)
+            for c in (trade_history_collection, item_a_collection, user_a_collection, item_b_collection)
+        ))
+        await recent_items_index.record(user_a, item_a, trade_data["timestamp"])
+        await trade_counters.record(item_a, item_b)
+        await pair_stats.record(db, item_a, quantity_a, item_b, quantity_b, trade_data["timestamp"])
+        await item_registry.register(db, [item_a, item_b], trade_data["timestamp"])
+        await rate_candles.record(db, item_a, quantity_a, item_b, quantity_b, trade_data["timestamp"])
         
         graph_manager.update_graph_from_trade(trade_data)
         return JSONResponse(status_code=status.HTTP_200_OK, content={"code": 1})
@@ -71,7 +207,7 @@ async def root():
     }
 
 @router.get("/collections")
-@cache(ttl=600, key_prefix="trade:collections")
+@cache(ttl=600, key_prefix="trade:collections", local_ttl=30)
 async def get_collections():
     try:
         db = await get_database()
@@ -85,8 +221,25 @@ async def get_collections():
         return {"error": "無法取得集合清單", "details": str(e)}
 
 @router.get("/trade-history")
-@cache(ttl=300, key_prefix="trade:history")
-async def get_trade_history(target: str = "", user: str = "", limit: int = -1):
+@cache(
+    ttl=300, key_prefix="trade:history", lock_timeout=30, response=True,
+    cache_condition=_cacheable_history_request
+)
+async def get_trade_history(
+    target: str = "",
+    user: str = "",
+    limit: int = -1,
+    cursor: str = "",
+    stream: bool = False
+):
+    """
+    交易歷史（由新到舊）
+    
+    limit > 0 時回傳一頁：limit 為每頁筆數（上限 1000），把回傳的 next_cursor 帶入 cursor
+    取得下一頁，next_cursor 為 None 表示沒有更多資料；帶 cursor 而未指定 limit 時每頁 100 筆。
+    limit <= 0（預設）且沒有 cursor 時與過去相同回傳全部交易，以相同 JSON 格式逐筆串流，不經快取。
+    stream=true 時以 NDJSON 逐筆輸出（limit <= 0 表示全部），不經快取。
+    """
     try:
         db = await get_database()
         if target != "":
@@ -95,31 +248,50 @@ async def get_trade_history(target: str = "", user: str = "", limit: int = -1):
             trade_history_collection = db[user]
         else:
             trade_history_collection = db["Trade-History"]
-        cursor = trade_history_collection.find().sort("timestamp", -1).limit(limit) if limit > 0 else trade_history_collection.find().sort("timestamp", -1)
-        trades = []
-        async for trade in cursor:
+        try:
+            query = _decode_cursor(cursor) if cursor else {}
+        except Exception:
+            return {"error": "無效的 cursor", "details": cursor}
+        
+        if stream:
+            documents = trade_history_collection.find(
+                query, batch_size=TRADE_HISTORY_STREAM_BATCH
+            ).sort(TRADE_HISTORY_SORT)
+            if limit > 0:
+                documents = documents.limit(limit)
+            return StreamingResponse(_stream_trades(documents), media_type="application/x-ndjson")
+        if limit <= 0 and not cursor:
+            documents = trade_history_collection.find(
+                query, batch_size=TRADE_HISTORY_STREAM_BATCH
+            ).sort(TRADE_HISTORY_SORT)
+            return StreamingResponse(_stream_trade_document(documents), media_type="application/json")
+        
+        page_size = min(limit, TRADE_HISTORY_MAX_PAGE_SIZE) if limit > 0 else TRADE_HISTORY_PAGE_SIZE
+        # 多取一筆判斷是否還有下一頁
+        trades = await trade_history_collection.find(query).sort(TRADE_HISTORY_SORT) \
+            .limit(page_size + 1).to_list(length=page_size + 1)
+        next_cursor: Optional[str] = _encode_cursor(trades[page_size - 1]) if len(trades) > page_size else None
+        trades = trades[:page_size]
+        for trade in trades:
             trade["_id"] = str(trade["_id"])
-            trades.append(trade)
         return {
             "trade_history": trades,
-            "count": len(trades)
+            "count": len(trades),
+            "next_cursor": next_cursor
         }
     except Exception as e:
         return {"error": "無法取得交易歷史", "details": str(e)}
 
 @router.get("/recent-items")
-@cache(ttl=300, key_prefix="trade:recent_items")
 async def get_recent_items(user: str, limit: int = -1):
+    """
+    使用者最近交易的物品（由新到舊、不重複）
+    
+    直接讀取 new_trade 維護的有序集合；索引未建立或已被清除時從 MongoDB 重建。
+    """
     try:
-        db = await get_database()
-        user_collection = db[user]
-        cursor = user_collection.find().sort("timestamp", -1).limit(limit) if limit > 0 else user_collection.find().sort("timestamp", -1)
-        recent_items = []
-        recent_items_set = set()
-        async for trade in cursor:
-            if trade["item_a"] not in recent_items_set:
-                recent_items.append({"item": trade["item_a"]})
-                recent_items_set.add(trade["item_a"])
+        items = await recent_items_index.items(await get_database(), user, limit)
+        recent_items = [{"item": item} for item in items]
         return {
             "user": user,
             "recent_items": recent_items,
@@ -129,22 +301,92 @@ async def get_recent_items(user: str, limit: int = -1):
         return {"error": f"無法取得使用者 '{user}' 的最近交易物品", "details": str(e)}
 
 @router.get("/get-all-items")
-@cache(ttl=600, key_prefix="trade:all_items")
-async def get_all_items():
+async def get_all_items(request: Request):
+    """
+    取得所有物品（來自 new_trade 維護的物品登錄表，讀取行程內快照）
+    
+    回傳的 version 只在物品增加時改變；ETag 相符時回傳 304。
+    """
     try:
         db = await get_database()
-        collections = await db.list_collection_names()
-        item_collections = [col for col in collections if col not in ["Trade-History"] and not col.startswith("user_")]
-        return {
-            "total_items": len(item_collections),
-            "items": item_collections
-        }
+        version, items = await item_registry.snapshot(db)
+        headers = {"ETag": item_registry.etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request, item_registry.etag):
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(
+            content={"total_items": len(items), "items": items, "version": version},
+            headers=headers
+        )
     except Exception as e:
         return {"error": "無法取得所有物品清單", "details": str(e)}
 
+async def _partner_counts_from_db(collection, target: str, limit: int) -> List[Tuple[str, int]]:
+    """計數器尚未建立時，以聚合計算與 target 交易過的物品次數"""
+    pipeline = [
+        {"$group": {"_id": {"$cond": [{"$eq": ["$item_a", target]}, "$item_b", "$item_a"]}, "count": {"$sum": 1}}},
+        {"$match": {"_id": {"$ne": None}}},
+        {"$sort": {"count": -1}},
+    ]
+    if limit > 0:
+        pipeline.append({"$limit": limit})
+    results = await collection.aggregate(pipeline).to_list(length=None)
+    return [(r["_id"], r["count"]) for r in results]
+
+_RATE_STATISTICS = {"average": {"$avg": "$rate"}, "min": {"$min": "$rate"}, "max": {"$max": "$rate"}}
+
+async def _partner_rate_statistics(collection, target: str, partners: List[str]) -> Dict[str, Dict[str, float]]:
+    """在 MongoDB 端計算 target 對各交易對象的匯率平均、最小、最大值"""
+    if not partners:
+        return {}
+    pipeline = [
+        {"$addFields": {"partner": {"$cond": [{"$eq": ["$item_a", target]}, "$item_b", "$item_a"]}}},
+        {"$match": {"partner": {"$in": partners}}},
+        {"$project": {"partner": 1, "rate": {"$cond": [ {"$eq": ["$item_a", target]}, {"$divide": ["$quantity_b", "$quantity_a"]}, {"$divide": ["$quantity_a", "$quantity_b"]} ]}}},
+        {"$group": {"_id": "$partner", **_RATE_STATISTICS}},
+    ]
+    results = await collection.aggregate(pipeline).to_list(length=None)
+    return {r["_id"]: r for r in results}
+
+async def _item_counts_from_db(collection, limit: int) -> List[Tuple[str, int]]:
+    """計數器尚未建立時，以聚合計算各物品出現次數"""
+    pipeline = [
+        {"$project": {"item": ["$item_a", "$item_b"]}},
+        {"$unwind": "$item"},
+        {"$group": {"_id": "$item", "count": {"$sum": 1}}},
+        {"$match": {"_id": {"$ne": None}}},
+        {"$sort": {"count": -1}},
+    ]
+    if limit > 0:
+        pipeline.append({"$limit": limit})
+    results = await collection.aggregate(pipeline).to_list(length=None)
+    return [(r["_id"], r["count"]) for r in results]
+
+async def _item_rate_statistics(collection, items: List[str]) -> Dict[str, Dict[str, float]]:
+    """在 MongoDB 端計算各物品的匯率平均、最小、最大值"""
+    if not items:
+        return {}
+    pipeline = [
+        {"$match": {"$or": [{"item_a": {"$in": items}}, {"item_b": {"$in": items}}]}},
+        {"$project": {
+            "item": ["$item_a", "$item_b"],
+            "rate": {"$divide": ["$quantity_b", "$quantity_a"]}
+        }},
+        {"$unwind": "$item"},
+        {"$match": {"item": {"$in": items}}},
+        {"$group": {"_id": "$item", **_RATE_STATISTICS}},
+    ]
+    results = await collection.aggregate(pipeline).to_list(length=None)
+    return {r["_id"]: r for r in results}
+
 @router.get("/most-freq-trade")
-@cache(ttl=300, key_prefix="trade:freq_trade")
+@cache(ttl=300, key_prefix="trade:freq_trade", stale_ttl=60, early_refresh=1.0, lock_timeout=30)
 async def get_most_frequent_trades(target: str = "", limit: int = -1):
+    """
+    最常交易的物品（或與 target 最常交易的物品）
+
+    排名與次數讀取 new_trade 維護的 Redis 計數器（trade_counters），
+    MongoDB 只查詢回傳項目的匯率；計數器尚未建立（或已被清除）時退回聚合計算並排程核對。
+    """
     try:
         db = await get_database()
         if target:
@@ -155,30 +397,36 @@ async def get_most_frequent_trades(target: str = "", limit: int = -1):
                     "trade_pairs": []
                 }
             target_collection = db[target]
-            pipeline = [
-                {"$group": {"_id": {"$cond": [ {"$eq": ["$item_a", target]}, "$item_b", "$item_a"]}, "count": {"$sum": 1}, "rates": {"$push": {"$cond": [ {"$eq": ["$item_a", target]}, {"$divide": ["$quantity_b", "$quantity_a"]}, {"$divide": ["$quantity_a", "$quantity_b"]} ]}, }, "timestamps": {"$push": "$timestamp"} }},
-                {"$match": {"_id": {"$ne": None}}},
-                {"$sort": {"count": -1}},
-            ]
-            if limit > 0:
-                pipeline.append({"$limit": limit})
-            cursor = target_collection.aggregate(pipeline)
-            aggregation_results = await cursor.to_list(length=None)
+            partners = await trade_counters.top_partners(target, limit)
+            if partners is None:
+                trade_counters.request_reconcile(db)
+            if not partners:
+                partners = await _partner_counts_from_db(target_collection, target, limit)
+            partner_names = [p for p, _ in partners]
+            # 優先使用 new_trade 維護的交易對摘要，缺少的才以聚合計算
+            summaries = {
+                partner: pair_stats.summarize(doc)
+                for partner, doc in (await pair_stats.get(db, target, partner_names)).items()
+            }
+            missing = [p for p in partner_names if p not in summaries]
+            aggregated = await _partner_rate_statistics(target_collection, target, missing)
             trade_pairs = []
-            for result in aggregation_results:
-                trade_to = result["_id"]
-                count = result["count"]
+            for trade_to, count in partners:
                 paths = graph_manager.find_trade_path(target, trade_to, max_depth=3)
                 recommended_rate = 0.0
                 if paths:
                     recommended_rate = graph_manager.calculate_recommand_rate(paths)
-                historical_rates = result.get("rates", [])
-                historical_avg = sum(historical_rates) / len(historical_rates) if historical_rates else 0.0
+                summary = summaries.get(trade_to)
+                if summary:
+                    historical = {"average": summary["mean"], "min": summary["min"], "max": summary["max"]}
+                else:
+                    historical = aggregated.get(trade_to, {})
                 rate_stats = {
                     "recommended_rate": recommended_rate,
-                    "historical_average": historical_avg,
-                    "historical_min": min(historical_rates) if historical_rates else 0.0,
-                    "historical_max": max(historical_rates) if historical_rates else 0.0,
+                    "historical_average": historical.get("average") or 0.0,
+                    "historical_min": historical.get("min") or 0.0,
+                    "historical_max": historical.get("max") or 0.0,
+                    "historical_quantiles": summary["quantiles"] if summary else {},
                     "path_count": len(paths)
                 }
                 trade_pair = {
@@ -195,37 +443,19 @@ async def get_most_frequent_trades(target: str = "", limit: int = -1):
             }
         else:
             trade_history_collection = db["Trade-History"]
-            pipeline = [
-                {"$project": {
-                    "item": ["$item_a", "$item_b"],
-                    "rate": {"$divide": ["$quantity_b", "$quantity_a"]},
-                    "timestamp": "$timestamp"
-                }},
-                {"$unwind": "$item"},
-                {"$group": {
-                    "_id": "$item",
-                    "count": {"$sum": 1},
-                    "rates": {"$push": "$rate"},
-                    "timestamps": {"$push": "$timestamp"}
-                }},
-                {"$match": {"_id": {"$ne": None}}},
-                {"$sort": {"count": -1}},
-            ]
-            if limit > 0:
-                pipeline.append({"$limit": limit})
-
-            cursor = trade_history_collection.aggregate(pipeline)
-            aggregation_results = await cursor.to_list(length=None)
+            items = await trade_counters.top_items(limit)
+            if items is None:
+                trade_counters.request_reconcile(db)
+            if not items:
+                items = await _item_counts_from_db(trade_history_collection, limit)
+            statistics_by_item = await _item_rate_statistics(trade_history_collection, [i for i, _ in items])
             trade_items = []
-            for result in aggregation_results:
-                item = result["_id"]
-                count = result["count"]
-                historical_rates = result.get("rates", [])
-                historical_avg = sum(historical_rates) / len(historical_rates) if historical_rates else 0.0
+            for item, count in items:
+                historical = statistics_by_item.get(item, {})
                 rate_stats = {
-                    "historical_average": historical_avg,
-                    "historical_min": min(historical_rates) if historical_rates else 0.0,
-                    "historical_max": max(historical_rates) if historical_rates else 0.0
+                    "historical_average": historical.get("average") or 0.0,
+                    "historical_min": historical.get("min") or 0.0,
+                    "historical_max": historical.get("max") or 0.0
                 }
                 trade_item = {
                     "item": item,
@@ -249,33 +479,40 @@ async def get_most_frequent_trades(target: str = "", limit: int = -1):
 async def get_most_frequent_pairs(limit: int = -1):
     """
     回傳最熱門的交易對，A, B 以字典序較小的作為第一項，統計所有交易對出現次數並排序
+    
+    直接讀取 Redis 計數器；計數器尚未建立（或已被清除）時退回 MongoDB 聚合並排程核對。
     """
     try:
-        db = await get_database()
-        trade_history_collection = db["Trade-History"]
-        pipeline = [
-            {"$project": {
-                "pair": {
-                    "$cond": [
-                        {"$lt": ["$item_a", "$item_b"]},
-                        ["$item_a", "$item_b"],
-                        ["$item_b", "$item_a"]
-                    ]
-                }
-            }},
-            {"$group": {
-                "_id": "$pair",
-                "count": {"$sum": 1}
-            }},
-            {"$sort": {"count": -1}},
-        ]
-        if limit > 0:
-            pipeline.append({"$limit": limit})
-        cursor = trade_history_collection.aggregate(pipeline)
-        aggregation_results = await cursor.to_list(length=None)
+        top_pairs = await trade_counters.top_pairs(limit)
+        if not top_pairs:
+            db = await get_database()
+            if top_pairs is None:
+                trade_counters.request_reconcile(db)
+            trade_history_collection = db["Trade-History"]
+            pipeline = [
+                {"$project": {
+                    "pair": {
+                        "$cond": [
+                            {"$lt": ["$item_a", "$item_b"]},
+                            ["$item_a", "$item_b"],
+                            ["$item_b", "$item_a"]
+                        ]
+                    }
+                }},
+                {"$group": {
+                    "_id": "$pair",
+                    "count": {"$sum": 1}
+                }},
+                {"$sort": {"count": -1}},
+            ]
+            if limit > 0:
+                pipeline.append({"$limit": limit})
+            cursor = trade_history_collection.aggregate(pipeline)
+            aggregation_results = await cursor.to_list(length=None)
+            top_pairs = [(result["_id"], result["count"]) for result in aggregation_results]
         pairs = [
-            {"pair": result["_id"], "count": result["count"]}
-            for result in aggregation_results
+            {"pair": pair, "count": count}
+            for pair, count in top_pairs
         ]
         return {
             "total_pairs": len(pairs),
@@ -288,8 +525,72 @@ async def get_most_frequent_pairs(limit: int = -1):
             "pairs": []
         }
 
+@cache(ttl=60, key_prefix="trade:pair_stats")
+async def _pair_stats_summary(item_from: str, item_to: str, quantiles: str) -> Dict[str, Any]:
+    """已建立摘要時的查詢結果（建立中的錯誤由路由回傳，不進快取）"""
+    qs = [float(q) for q in quantiles.split(",") if q.strip()]
+    try:
+        db = await get_database()
+        docs = await pair_stats.get(db, item_from, [item_to])
+        if item_to not in docs:
+            return {"item_from": item_from, "item_to": item_to, "count": 0, "message": "沒有交易紀錄"}
+        return pair_stats.summarize(docs[item_to], qs)
+    except Exception as e:
+        return {"error": "無法取得交易對匯率摘要", "details": str(e)}
+
+@router.get("/pair-stats/{item_from}/{item_to}")
+async def get_pair_stats(item_from: str, item_to: str, quantiles: str = "0.5,0.9,0.99"):
+    """
+    交易對匯率摘要（每單位 item_from 可換得的 item_to）
+    
+    次數、平均、最小、最大與近似分位數（相對誤差 1%），由 new_trade 增量維護，不掃描交易歷史。
+    """
+    try:
+        qs = [float(q) for q in quantiles.split(",") if q.strip()]
+        if any(q < 0 or q > 1 for q in qs):
+            raise ValueError(quantiles)
+    except ValueError:
+        return {"error": "quantiles 必須是 0 到 1 之間以逗號分隔的數字", "details": quantiles}
+    try:
+        if not await pair_stats.built(await get_database()):
+            return {"error": "交易對匯率摘要尚在建立中", "details": "請稍後再試或執行 rebuild_pair_stats.py"}
+    except Exception as e:
+        return {"error": "無法取得交易對匯率摘要", "details": str(e)}
+    return await _pair_stats_summary(item_from, item_to, quantiles)
+
+@router.get("/candles/{item_from}/{item_to}")
+@cache(ttl=60, key_prefix="trade:candles", response=True)
+async def get_candles(
+    item_from: str,
+    item_to: str,
+    resolution: str = "1h",
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None,
+    limit: int = 500
+):
+    """
+    交易對匯率 K 線（每單位 item_from 可換得的 item_to）
+    
+    resolution 為 1m、1h 或 1d；回傳區間起點在 [start, end) 內的 K 線，由舊到新。
+    未指定 start 時回傳 end（預設為現在）之前最新的 limit 根。K 線由 new_trade 增量維護，不掃描交易歷史。
+    """
+    if resolution not in RESOLUTIONS:
+        return {"error": f"resolution 必須是 {', '.join(RESOLUTIONS)} 之一", "details": resolution}
+    limit = max(1, min(limit, 5000))
+    try:
+        db = await get_database()
+        candles = await rate_candles.query(db, item_from, item_to, resolution, start, end, limit)
+        return {
+            "item_from": item_from,
+            "item_to": item_to,
+            "resolution": resolution,
+            "candles": candles
+        }
+    except Exception as e:
+        return {"error": "無法取得匯率 K 線", "details": str(e)}
+
 @router.get("/graph/path/{start_item}/{target_item}")
-@cache(ttl=600, key_prefix="trade:graph_path")
+@cache(ttl=600, key_prefix="trade:graph_path", response=True)
 async def find_trade_path(start_item: str, target_item: str, max_depth: int = 5):
     paths = graph_manager.find_trade_path(start_item, target_item, max_depth)
     recommand_rate = graph_manager.calculate_recommand_rate(paths)
@@ -15,13 +15,15 @@ async def real_database_query(query_type: str, params: dict = None):
     db = await get_database()
     
     if query_type == "get-all-items":
-        collections = await db.list_collection_names()
-        item_collections = [col for col in collections if col not in ["Trade-History"] and not col.startswith("user_")]
+        from core.item_registry import item_registry
+        
+        version, items = await item_registry.snapshot(db)
         return {
             "query_type": query_type,
             "params": params,
-            "data": item_collections,
-            "total_items": len(item_collections),
+            "data": items,
+            "total_items": len(items),
+            "version": version,
             "timestamp": time.time()
         }
     
@@ -128,14 +130,18 @@ async def real_database_query(query_type: str, params: dict = None):
             }
     
     elif query_type == "fuzzy-search":
-        from api.fuzzy_search import _fetch_all_item_names, _fuzzy_search_core
+        from api.fuzzy_search import (
+            _fetch_all_item_names, _sync_item_index, _embed_texts, _fuzzy_search_core, query_vectors
+        )
         
         q = params.get("q", "") if params else ""
         top_k = params.get("top_k", 10) if params else 10
         min_score = params.get("min_score", 0.20) if params else 0.20
         
-        items = await _fetch_all_item_names()
-        result_list = _fuzzy_search_core(q, items, top_k, min_score)
+        version, items = await _fetch_all_item_names()
+        await _sync_item_index(items, version)
+        q_vec = await query_vectors.get(q, _embed_texts)
+        result_list = _fuzzy_search_core(q_vec, top_k, min_score)
         
         return {
             "query_type": query_type,
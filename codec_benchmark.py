@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+import time
+import random
+import datetime
+import statistics
+
+from core.codecs import Codec, available_codecs
+
+def build_trade_history(count: int):
+    """模擬 trade-history 的回傳內容"""
+    items = [f"item_{i}" for i in range(200)]
+    now = datetime.datetime.utcnow()
+    trades = []
+    for i in range(count):
+        item_a, item_b = random.sample(items, 2)
+        quantity_a = random.randint(1, 50)
+        quantity_b = random.randint(1, 50)
+        trades.append({
+            "_id": f"{i:024x}",
+            "user_a": f"user_{random.randint(1, 500)}",
+            "item_a": item_a,
+            "quantity_a": quantity_a,
+            "user_b": "guess",
+            "item_b": item_b,
+            "quantity_b": quantity_b,
+            "rate": quantity_b / quantity_a,
+            "timestamp": now - datetime.timedelta(minutes=i),
+            "trade_id": f"TRADE_{random.getrandbits(48)}"
+        })
+    return {"trade_history": trades, "count": len(trades)}
+
+def build_paths(count: int):
+    """模擬 graph/path 的回傳內容"""
+    now = datetime.datetime.utcnow()
+    paths = []
+    for _ in range(count):
+        edges = [{
+            "trade_to": f"item_{random.randint(1, 200)}",
+            "rate": random.random() * 10,
+            "quantity_from": random.randint(1, 50),
+            "quantity_to": random.randint(1, 50),
+            "timestamp": now - datetime.timedelta(hours=random.random() * 100),
+            "weight": random.random() * 10000
+        } for _ in range(random.randint(1, 5))]
+        paths.append({"path": edges, "rate": random.random() * 10, "weight": random.random() * 10000})
+    return {"paths_found": len(paths), "paths": paths}
+
+def measure(func, repeat: int) -> float:
+    """回傳單次執行的中位數時間（毫秒）"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def benchmark_codec(name: str, codec: Codec, payload, repeat: int):
+    encoded = codec.encode(payload)
+    decoded = Codec.decode(encoded)
+    roundtrip_ok = decoded == payload
+    encode_ms = measure(lambda: codec.encode(payload), repeat)
+    decode_ms = measure(lambda: Codec.decode(encoded), repeat)
+    print(f"  {name:<16} {len(encoded):>10,} B  編碼 {encode_ms:8.3f}ms  解碼 {decode_ms:8.3f}ms  datetime 還原: {'✅' if roundtrip_ok else '❌'}")
+    return {
+        "codec": name,
+        "bytes": len(encoded),
+        "encode_ms": encode_ms,
+        "decode_ms": decode_ms,
+        "roundtrip": roundtrip_ok
+    }
+
+def main():
+    print("🚀 快取編解碼器效能測試")
+    print("=" * 80)
+    random.seed(42)
+    payloads = [
+        ("小型回應（10 筆交易）", build_trade_history(10), 200),
+        ("完整交易歷史（10,000 筆）", build_trade_history(10_000), 10),
+        ("交易路徑（2,000 條）", build_paths(2_000), 10),
+    ]
+    codecs = available_codecs()
+    missing = {"msgpack", "msgpack+zlib", "json+lz4", "msgpack+lz4"} - set(codecs)
+    if missing:
+        print(f"⚠️ 未安裝對應套件，略過: {', '.join(sorted(missing))}")
+
+    results = []
+    for title, payload, repeat in payloads:
+        print(f"\n📦 {title}")
+        for name, codec in codecs.items():
+            results.append(benchmark_codec(name, codec, payload, repeat))
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """分數最高的 k 個位置（由高到低），以 argpartition 避免完整排序"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    k: int,
+    iterations: int = 10,
+    sample_size: int = 65536,
+    seed: int = 0
+) -> np.ndarray:
+    """以餘弦相似度分群（輸入需已正規化），回傳已正規化的 (k, D) 中心"""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample_size:
+        vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        # 空群以隨機樣本重新播種
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+            norms[empty] = 1.0
+        centroids = sums / norms
+    return centroids.astype(np.float32)
+
+class IVFIndex:
+    """
+    倒排檔（IVF）近似最近鄰索引，只用 NumPy
+
+    以 spherical k-means 把已正規化的向量分成 nlist 群，查詢時只比對與查詢最相近的
+    nprobe 群。nprobe 是召回率與延遲的取捨：越大越接近精確搜尋。
+    新增向量直接分配到既有中心（只複製受影響的群）；總數超過上次訓練時的
+    retrain_factor 倍時重新訓練中心。向量數少於 exact_threshold 時不分群、直接精確搜尋。
+
+    狀態（中心與各群）以單一 tuple 整體替換，查詢不需加鎖；寫入之間以鎖互斥。
+
+    Args:
+        nprobe: 預設每次查詢比對的群數
+        exact_threshold: 低於此數量時不分群，直接精確搜尋
+        retrain_factor: 向量數成長到上次訓練時的幾倍就重新分群
+        iterations: k-means 迭代次數
+    """
+
+    def __init__(
+        self,
+        nprobe: int = 8,
+        exact_threshold: int = 5000,
+        retrain_factor: float = 2.0,
+        iterations: int = 10
+    ):
+        self.nprobe = nprobe
+        self.exact_threshold = exact_threshold
+        self.retrain_factor = retrain_factor
+        self.iterations = iterations
+        # (中心或 None, 各群向量, 各群 id)；不分群時只有一群
+        self._state: Tuple[Optional[np.ndarray], List[np.ndarray], List[np.ndarray]] = (None, [], [])
+        self._size = 0
+        self._trained_size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def centroids(self) -> Optional[np.ndarray]:
+        return self._state[0]
+
+    @staticmethod
+    def default_nlist(n: int) -> int:
+        return max(1, int(4 * np.sqrt(n)))
+
+    def build(self, vectors: np.ndarray, ids: Optional[np.ndarray] = None):
+        """
+        以全部向量重建索引
+
+        Args:
+            vectors: 已正規化的 (N, D) 向量
+            ids: 每列對應的識別碼，預設為列號
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        ids = np.arange(len(vectors), dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            self._train(vectors, ids)
+
+    def _train(self, vectors: np.ndarray, ids: np.ndarray):
+        n = len(ids)
+        self._size = self._trained_size = n
+        if n < self.exact_threshold:
+            self._state = (None, [vectors], [ids])
+            return
+        centroids = spherical_kmeans(vectors, self.default_nlist(n), self.iterations)
+        assign = self._assign(centroids, vectors)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(centroids) + 1))
+        lists = [vectors[order[bounds[c]:bounds[c + 1]]] for c in range(len(centroids))]
+        list_ids = [ids[order[bounds[c]:bounds[c + 1]]] for c in range(len(centroids))]
+        self._state = (centroids, lists, list_ids)
+
+    @staticmethod
+    def _assign(centroids: np.ndarray, vectors: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        if len(vectors) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([
+            np.argmax(vectors[i : i + chunk_size] @ centroids.T, axis=1)
+            for i in range(0, len(vectors), chunk_size)
+        ])
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray):
+        """新增已正規化的向量；成長超過 retrain_factor 倍（或跨過 exact_threshold）時重新分群"""
+        if len(ids) == 0:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            centroids, lists, list_ids = self._state
+            size = self._size + len(ids)
+            exact_too_large = centroids is None and size >= self.exact_threshold
+            if exact_too_large or (centroids is not None and size >= self._trained_size * self.retrain_factor):
+                self._train(np.concatenate(lists + [vectors]), np.concatenate(list_ids + [ids]))
+                return
+            lists, list_ids = list(lists), list(list_ids)
+            if centroids is None:
+                lists = [np.concatenate(lists + [vectors])]
+                list_ids = [np.concatenate(list_ids + [ids])]
+            else:
+                assign = self._assign(centroids, vectors)
+                for c in np.unique(assign):
+                    members = assign == c
+                    lists[c] = np.concatenate([lists[c], vectors[members]])
+                    list_ids[c] = np.concatenate([list_ids[c], ids[members]])
+            self._state = (centroids, lists, list_ids)
+            self._size = size
+
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        回傳 (ids, scores)，依餘弦相似度由高到低
+
+        Args:
+            query: 查詢向量（不需正規化）
+            k: 回傳數量
+            nprobe: 本次查詢比對的群數，預設為 self.nprobe
+        """
+        centroids, lists, list_ids = self._state
+        if not lists:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = np.asarray(query, dtype=np.float32)
+        query = query / (np.linalg.norm(query) + 1e-8)
+        if centroids is None:
+            vectors, ids = lists[0], list_ids[0]
+        else:
+            probes = top_k(centroids @ query, nprobe or self.nprobe)
+            vectors = np.concatenate([lists[c] for c in probes])
+            ids = np.concatenate([list_ids[c] for c in probes])
+        scores = vectors @ query
+        best = top_k(scores, k)
+        return ids[best], scores[best]
+
+    def stats(self) -> Dict[str, Any]:
+        centroids, _, list_ids = self._state
+        sizes = [len(ids) for ids in list_ids]
+        return {
+            "items": self._size,
+            "nlist": 0 if centroids is None else len(centroids),
+            "nprobe": self.nprobe,
+            "largest_list": max(sizes) if sizes else 0,
+            "exact": centroids is None
+        }
@@ -1,12 +1,453 @@
+import os
+import uuid
 import asyncio
 import hashlib
 import inspect
 from functools import wraps
-from typing import Any, Callable, Optional, Union, Dict, List
+from typing import Any, Callable, Optional, Union, Dict, List, Tuple
 from datetime import timedelta, datetime
 import json
+import math
+import time
+import random
+import bisect
+import threading
+from collections import defaultdict
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
 
-from .redis_client import redis_client, DateTimeEncoder
+from .redis_client import redis_client
+from .local_cache import LocalCache
+
+# 標籤世代計數器的鍵前綴；失效時只需 INCR 對應計數器即可
+TAG_KEY_PREFIX = "cache:tag:"
+ENVELOPE_TAGS_FIELD = "__cache_tags__"
+ENVELOPE_VALUE_FIELD = "value"
+ENVELOPE_EXPIRES_FIELD = "expires_at"
+ENVELOPE_DELTA_FIELD = "delta"
+
+# response=True 時快取的是編碼後的 JSON 回應本文與其 ETag
+RESPONSE_BODY_FIELD = "__response_body__"
+RESPONSE_ETAG_FIELD = "etag"
+RESPONSE_REQUEST_PARAM = "_cache_request"
+
+# SCAN 每批的 COUNT 提示與批次刪除大小；抽樣鍵名時最多走訪的頁數
+SCAN_BATCH_SIZE = 500
+SCAN_MAX_SAMPLE_PAGES = 10
+
+# 跨 worker 的重算鎖與等待他人重算時的輪詢間隔
+LOCK_KEY_PREFIX = "cache:lock:"
+LOCK_POLL_INTERVAL = 0.05
+
+# 容量控管：單一條目的大小上限，以及各命名空間在 Redis 中的總量預算（位元組，0 表示不限制）
+# CACHE_NAMESPACE_BUDGETS 可個別指定，例如 "trade=33554432,search=8388608"
+BUDGET_KEY_PREFIX = "cache:budget:"
+DEFAULT_MAX_ENTRY_BYTES = int(os.getenv("CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+DEFAULT_NAMESPACE_BUDGET = int(os.getenv("CACHE_NAMESPACE_BUDGET", str(64 * 1024 * 1024)))
+
+# L1（行程內）快取；L2 條目變更時透過 Pub/Sub 通知所有 worker 失效
+INVALIDATION_CHANNEL = "cache:invalidate"
+WORKER_ID = uuid.uuid4().hex
+local_cache = LocalCache(max_bytes=int(os.getenv("CACHE_L1_MAX_BYTES", str(32 * 1024 * 1024))))
+
+class LatencyHistogram:
+    """固定級距的延遲直方圖（毫秒）"""
+    
+    BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+    
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+    
+    def quantile(self, q: float) -> float:
+        """以級距上界估計分位數"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.BUCKETS_MS[i] if i < len(self.BUCKETS_MS) else self.max_ms
+        return self.max_ms
+    
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{b}ms" for b in self.BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "total_ms": self.total_ms,
+            "avg_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+class PrefixMetrics:
+    """單一 key_prefix 的快取統計"""
+    
+    def __init__(self):
+        self.function_latency = LatencyHistogram()
+        self.redis_latency = LatencyHistogram()
+        self.reset()
+    
+    def reset(self):
+        self.l1_hits = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.not_modified = 0
+        self.misses = 0
+        self.errors = 0
+        self.rejected_size = 0
+        self.rejected_budget = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.function_latency.reset()
+        self.redis_latency.reset()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.l1_hits + self.hits + self.misses
+        return {
+            "l1_hits": self.l1_hits,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "not_modified": self.not_modified,
+            "misses": self.misses,
+            "errors": self.errors,
+            "rejected_size": self.rejected_size,
+            "rejected_budget": self.rejected_budget,
+            "hit_ratio": (self.l1_hits + self.hits) / lookups if lookups else 0.0,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "avg_payload_bytes": self.bytes_written / self.misses if self.misses else 0.0,
+            "function_latency": self.function_latency.snapshot(),
+            "redis_latency": self.redis_latency.snapshot()
+        }
+
+class CacheMetrics:
+    """依 key_prefix 分組的命中率、錯誤數、延遲與資料量統計"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prefixes: Dict[str, PrefixMetrics] = defaultdict(PrefixMetrics)
+    
+    def prefix(self, name: str) -> PrefixMetrics:
+        with self._lock:
+            return self._prefixes[name]
+    
+    def totals(self) -> Dict[str, int]:
+        with self._lock:
+            prefixes = list(self._prefixes.values())
+        return {
+            "l1_hits": sum(m.l1_hits for m in prefixes),
+            "hits": sum(m.hits for m in prefixes),
+            "misses": sum(m.misses for m in prefixes),
+            "errors": sum(m.errors for m in prefixes)
+        }
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            items = list(self._prefixes.items())
+        return {name: m.snapshot() for name, m in sorted(items)}
+    
+    def reset(self):
+        with self._lock:
+            for m in self._prefixes.values():
+                m.reset()
+
+cache_metrics = CacheMetrics()
+
+# 預熱排程追蹤的快取鍵與其被存取次數（只有登記過的鍵才計數）
+tracked_access: Dict[str, int] = {}
+
+def track_access(cache_key: str):
+    tracked_access.setdefault(cache_key, 0)
+
+def pop_access_count(cache_key: str) -> int:
+    """取得並歸零快取鍵自上次呼叫以來的存取次數"""
+    count = tracked_access.get(cache_key, 0)
+    if cache_key in tracked_access:
+        tracked_access[cache_key] = 0
+    return count
+
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+def tag_key(tag: str) -> str:
+    """取得標籤世代計數器的 Redis 鍵"""
+    return f"{TAG_KEY_PREFIX}{tag}"
+
+def default_tags(key_prefix: str) -> List[str]:
+    """以鍵前綴的命名空間（第一段）作為預設標籤，例如 trade:history -> trade"""
+    if not key_prefix:
+        return []
+    return [key_prefix.split(":", 1)[0]]
+
+def _parse_generation(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _new_generation() -> int:
+    # 計數器遺失（被淘汰或清空）後以時間戳重新起算，避免舊世代的條目復活
+    return time.time_ns()
+
+def wrap_entry(
+    value: Any,
+    generations: Dict[str, int],
+    expires_at: Optional[float] = None,
+    delta: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    將快取值與寫入當下的標籤世代包裝在一起
+    
+    expires_at 為邏輯過期時間（之後進入 stale 視窗），delta 為重算耗時，
+    供提前重算的機率計算使用。
+    """
+    entry = {ENVELOPE_TAGS_FIELD: generations, ENVELOPE_VALUE_FIELD: value}
+    if expires_at is not None:
+        entry[ENVELOPE_EXPIRES_FIELD] = expires_at
+    if delta is not None:
+        entry[ENVELOPE_DELTA_FIELD] = delta
+    return entry
+
+def unwrap_entry(entry: Any, generations: Dict[str, Optional[int]]) -> Tuple[bool, Any]:
+    """
+    檢查快取條目的標籤世代是否仍為最新
+    
+    Returns:
+        (是否有效, 快取值)
+    """
+    if not isinstance(entry, dict) or ENVELOPE_TAGS_FIELD not in entry:
+        return False, None
+    stored = entry.get(ENVELOPE_TAGS_FIELD) or {}
+    for tag, generation in generations.items():
+        if generation is None or _parse_generation(stored.get(tag)) != generation:
+            return False, None
+    return True, entry.get(ENVELOPE_VALUE_FIELD)
+
+def build_response_entry(result: Any) -> Dict[str, str]:
+    """
+    將函數結果編碼為 JSON 回應本文並計算 ETag
+    
+    編碼方式與 FastAPI 預設的 JSONResponse 相同，命中時可直接回傳本文，
+    不必再反序列化後重新編碼。
+    """
+    body = json.dumps(
+        jsonable_encoder(result),
+        ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    )
+    return {RESPONSE_BODY_FIELD: body, RESPONSE_ETAG_FIELD: f'"{_digest(body)}"'}
+
+def _is_response_entry(value: Any) -> bool:
+    return isinstance(value, dict) and RESPONSE_BODY_FIELD in value
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in header.split(",")
+    )
+
+def render_response(value: Any, request: Optional[Request], metrics: "PrefixMetrics") -> Any:
+    """
+    將快取的回應本文轉為 Response；If-None-Match 相符時回傳 304
+    
+    無法編碼的結果（例如函數本身回傳 Response）原樣交給 FastAPI。
+    """
+    if not _is_response_entry(value):
+        return value
+    etag = value[RESPONSE_ETAG_FIELD]
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request is not None and _etag_matches(request, etag):
+        metrics.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=value[RESPONSE_BODY_FIELD], media_type="application/json", headers=headers)
+
+def response_value(value: Any) -> Any:
+    """直接呼叫（非 HTTP 請求）時還原為 JSON 相容的值，datetime 會是 ISO 字串"""
+    if _is_response_entry(value):
+        return json.loads(value[RESPONSE_BODY_FIELD])
+    return value
+
+def _invalidation_message(
+    keys: Optional[List[str]] = None,
+    tags: Optional[List[str]] = None,
+    pattern: Optional[str] = None,
+    clear: bool = False
+) -> Dict[str, Any]:
+    message = {"src": WORKER_ID}
+    if keys:
+        message["keys"] = list(keys)
+    if tags:
+        message["tags"] = list(tags)
+    if pattern:
+        message["pattern"] = pattern
+    if clear:
+        message["clear"] = True
+    return message
+
+def apply_invalidation(message: Dict[str, Any]):
+    """在本行程的 L1 快取套用失效訊息"""
+    if message.get("clear"):
+        local_cache.clear()
+        return
+    for k in message.get("keys", []):
+        local_cache.delete(k)
+    if message.get("tags"):
+        local_cache.invalidate_tags(message["tags"])
+    if message.get("pattern"):
+        local_cache.delete_pattern(message["pattern"])
+
+async def publish_invalidation(**kwargs):
+    """失效本行程的 L1，並廣播給其他 worker"""
+    message = _invalidation_message(**kwargs)
+    apply_invalidation(message)
+    await redis_client.publish(INVALIDATION_CHANNEL, message)
+
+def _publish_invalidation_sync(r, **kwargs):
+    message = _invalidation_message(**kwargs)
+    apply_invalidation(message)
+    r.publish(INVALIDATION_CHANNEL, json.dumps(message, ensure_ascii=False))
+
+class CacheInvalidationListener:
+    """訂閱失效頻道，將其他 worker 的 L2 變更套用到本行程的 L1"""
+    
+    def __init__(self, channel: str = INVALIDATION_CHANNEL, retry_delay: float = 1.0):
+        self.channel = channel
+        self.retry_delay = retry_delay
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            pubsub = None
+            try:
+                pubsub = await redis_client.pubsub()
+                await pubsub.subscribe(self.channel)
+                # 訂閱中斷期間可能漏掉訊息，重新訂閱後清空 L1
+                local_cache.clear()
+                async for raw in pubsub.listen():
+                    try:
+                        message = json.loads(raw["data"])
+                    except (json.JSONDecodeError, TypeError, KeyError):
+                        continue
+                    if message.get("src") != WORKER_ID:
+                        apply_invalidation(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"快取失效訂閱錯誤: {e}")
+                await asyncio.sleep(self.retry_delay)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+cache_invalidation_listener = CacheInvalidationListener()
+
+# 回收已過期條目的用量後，確認加入新條目不會超過預算才記帳；回傳 1 表示可以寫入
+# KEYS: 到期時間 ZSET、條目大小 HASH、總用量；ARGV: 快取鍵、大小、到期時間、現在時間、預算
+_ADMIT_SCRIPT = """
+local expired = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", ARGV[4], "LIMIT", 0, 100)
+for _, member in ipairs(expired) do
+    local size = tonumber(redis.call("HGET", KEYS[2], member) or "0")
+    redis.call("DECRBY", KEYS[3], size)
+    redis.call("HDEL", KEYS[2], member)
+    redis.call("ZREM", KEYS[1], member)
+end
+local used = tonumber(redis.call("GET", KEYS[3]) or "0")
+local previous = tonumber(redis.call("HGET", KEYS[2], ARGV[1]) or "0")
+local size = tonumber(ARGV[2])
+if used - previous + size > tonumber(ARGV[5]) then
+    return 0
+end
+redis.call("HSET", KEYS[2], ARGV[1], size)
+redis.call("ZADD", KEYS[1], ARGV[3], ARGV[1])
+redis.call("INCRBY", KEYS[3], size - previous)
+return 1
+"""
+
+def _parse_budgets(spec: str) -> Dict[str, int]:
+    budgets = {}
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            try:
+                budgets[name.strip()] = int(value)
+            except ValueError:
+                print(f"⚠️ 無效的快取預算設定: {part}")
+    return budgets
+
+namespace_budgets: Dict[str, int] = _parse_budgets(os.getenv("CACHE_NAMESPACE_BUDGETS", ""))
+# 所有 @cache 使用到的命名空間，供統計用
+known_namespaces = set()
+
+def namespace_budget(namespace: Optional[str]) -> int:
+    """命名空間的 Redis 用量預算（位元組），0 表示不限制"""
+    if not namespace:
+        return 0
+    return namespace_budgets.get(namespace, DEFAULT_NAMESPACE_BUDGET)
+
+def budget_keys(namespace: str) -> List[str]:
+    prefix = f"{BUDGET_KEY_PREFIX}{namespace}"
+    return [f"{prefix}:expiry", f"{prefix}:sizes", f"{prefix}:used"]
+
+async def _admit(namespace: Optional[str], cache_key: str, size: int, ttl: int) -> bool:
+    """
+    命名空間預算的准入檢查
+    
+    以條目大小記帳，過期的條目在下次檢查時扣回；超過預算的新條目不寫入，
+    避免少數大型回應把其他快取擠出 Redis。Redis 無法使用時直接放行（備援快取本身有上限）。
+    """
+    budget = namespace_budget(namespace)
+    if budget <= 0:
+        return True
+    now = time.time()
+    admitted = await redis_client.eval(
+        _ADMIT_SCRIPT, budget_keys(namespace), [cache_key, size, now + ttl, now, budget], default=1
+    )
+    return bool(admitted)
+
+def _admit_sync(r, namespace: Optional[str], cache_key: str, size: int, ttl: int) -> bool:
+    """_admit 的同步版本"""
+    budget = namespace_budget(namespace)
+    if budget <= 0:
+        return True
+    now = time.time()
+    keys = budget_keys(namespace)
+    return bool(r.eval(_ADMIT_SCRIPT, len(keys), *keys, cache_key, size, now + ttl, now, budget))
 
 class CacheConfig:
     """快取配置類別"""
@@ -18,7 +459,15 @@ class CacheConfig:
         include_args: bool = True,
         include_kwargs: bool = True,
         exclude_params: Optional[List[str]] = None,
-        cache_condition: Optional[Callable] = None
+        cache_condition: Optional[Callable] = None,
+        tags: Optional[List[str]] = None,
+        local_ttl: Optional[int] = None,
+        stale_ttl: int = 0,
+        early_refresh: float = 0.0,
+        lock_timeout: Optional[int] = None,
+        response: bool = False,
+        max_bytes: Optional[int] = None,
+        namespace: Optional[str] = None
     ):
         self.ttl = ttl
         self.key_prefix = key_prefix
@@ -26,31 +475,226 @@ class CacheConfig:
         self.include_kwargs = include_kwargs
         self.exclude_params = exclude_params or []
         self.cache_condition = cache_condition
+        self.tags = list(tags) if tags is not None else default_tags(key_prefix)
+        self.local_ttl = min(local_ttl, ttl) if local_ttl else None
+        self.stale_ttl = stale_ttl
+        self.early_refresh = early_refresh
+        self.lock_timeout = lock_timeout
+        self.response = response
+        self.max_bytes = DEFAULT_MAX_ENTRY_BYTES if max_bytes is None else max_bytes
+        self.namespace = namespace or (key_prefix.split(":", 1)[0] if key_prefix else None)
+
+def _is_fresh(entry: Dict[str, Any], now: float) -> bool:
+    expires_at = entry.get(ENVELOPE_EXPIRES_FIELD)
+    return expires_at is None or now < expires_at
+
+def _should_refresh(entry: Dict[str, Any], now: float, config: CacheConfig) -> bool:
+    """
+    是否需要在背景重算
+    
+    已過邏輯期限（stale）時一定重算；否則依 XFetch 演算法，以重算耗時 delta 與
+    early_refresh 係數決定提前重算的機率，讓同一批條目的到期時間自然錯開。
+    """
+    expires_at = entry.get(ENVELOPE_EXPIRES_FIELD)
+    if expires_at is None:
+        return False
+    if now >= expires_at:
+        return True
+    if config.early_refresh <= 0:
+        return False
+    delta = entry.get(ENVELOPE_DELTA_FIELD) or 0.0
+    return now - delta * config.early_refresh * math.log(1.0 - random.random()) >= expires_at
+
+# 行程內 single-flight：同一快取鍵同時只有一個重算
+_inflight: Dict[str, asyncio.Future] = {}
+_background_tasks = set()
+
+async def _read_l2(cache_key: str, tag_keys: List[str], config: CacheConfig):
+    """
+    條目與其標籤世代在同一次 MGET 中取得
+    
+    Returns:
+        (條目, 標籤世代, 條目的位元組數)
+    """
+    raw_entry, *raw_generations = await redis_client.mget([cache_key] + tag_keys, raw=True)
+    generations = {
+        t: _parse_generation(g) for t, g in zip(config.tags, raw_generations)
+    }
+    entry = redis_client.decode_value(raw_entry) if raw_entry is not None else None
+    return entry, generations, len(raw_entry) if raw_entry is not None else 0
+
+async def _single_flight(cache_key: str, compute: Callable):
+    """同一快取鍵的並行未命中只執行一次 compute，其餘等待其結果"""
+    inflight = _inflight.get(cache_key)
+    if inflight is not None:
+        await asyncio.wait([inflight])
+        if not inflight.cancelled():
+            return inflight.result()
+        return await compute()
+    
+    future = asyncio.get_running_loop().create_future()
+    _inflight[cache_key] = future
+    try:
+        result = await compute()
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # 沒有等待者時避免 "exception was never retrieved" 警告
+        future.exception()
+        raise
+    finally:
+        _inflight.pop(cache_key, None)
+
+async def _compute_with_lock(
+    cache_key: str,
+    tag_keys: List[str],
+    config: CacheConfig,
+    compute: Callable
+):
+    """
+    跨 worker 的重算協調
+    
+    取得 Redis 鎖者負責重算；其餘 worker 輪詢等待新條目出現。持有者可能沒有寫入
+    （重算失敗、條目過大或超過預算），因此鎖已釋放而條目仍不存在時立即自行重算，
+    不等到逾時。Redis 無法使用時直接重算。
+    """
+    if not config.lock_timeout:
+        return await compute()
+    
+    lock_key = f"{LOCK_KEY_PREFIX}{cache_key}"
+    token = uuid.uuid4().hex
+    acquired = await redis_client.acquire_lock(lock_key, token, config.lock_timeout)
+    if acquired is None:
+        return await compute()
+    if acquired:
+        try:
+            return await compute()
+        finally:
+            await redis_client.release_lock(lock_key, token)
+    
+    deadline = time.monotonic() + config.lock_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        entry, generations, _ = await _read_l2(cache_key, tag_keys, config)
+        valid, value = unwrap_entry(entry, generations)
+        if valid and _is_fresh(entry, time.time()):
+            return value
+        if not await redis_client.exists(lock_key):
+            break
+    return await compute()
+
+def _schedule_refresh(cache_key: str, refresh: Callable):
+    """在背景重算（已有同鍵重算進行中則略過）"""
+    if cache_key in _inflight:
+        return
+    task = asyncio.create_task(_single_flight(cache_key, refresh))
+    _background_tasks.add(task)
+    
+    def _done(t: asyncio.Task):
+        _background_tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            print(f"背景快取重算失敗: {cache_key} - {t.exception()}")
+    
+    task.add_done_callback(_done)
+
+# 綁定參數時略過的實例/類別參數名稱
+_BOUND_SELF_PARAMS = ("self", "cls")
+
+def _canonical_default(obj: Any) -> Any:
+    """將 JSON 無法直接表示的參數轉為穩定的表示法"""
+    if isinstance(obj, datetime):
+        return {"__datetime__": obj.isoformat()}
+    if isinstance(obj, (set, frozenset)):
+        return {"__set__": sorted(_canonical_encode(x) for x in obj)}
+    if isinstance(obj, bytes):
+        return {"__bytes__": obj.hex()}
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "__dict__"):
+        return {"__object__": type(obj).__qualname__, "state": vars(obj)}
+    return repr(obj)
+
+def _canonical_encode(obj: Any) -> str:
+    """與行程無關的正規化編碼（排序鍵、固定分隔符號）"""
+    try:
+        return json.dumps(
+            obj, sort_keys=True, ensure_ascii=False,
+            separators=(",", ":"), default=_canonical_default
+        )
+    except (TypeError, ValueError):
+        # 例如字典鍵型別混雜而無法排序時，退回 repr
+        return repr(obj)
+
+def _digest(payload: str) -> str:
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+def _bind_arguments(
+    signature: Optional[inspect.Signature],
+    args: tuple,
+    kwargs: dict,
+    config: CacheConfig
+) -> Dict[str, Any]:
+    """依函數簽章綁定參數並套用預設值，使 f(x) 與 f(x, limit=-1) 得到相同結果"""
+    if signature is None:
+        raise TypeError("no signature")
+    bound = signature.bind(*args, **kwargs)
+    positional = set(list(bound.arguments)[:len(args)])
+    bound.apply_defaults()
+    
+    arguments = {}
+    for name, value in bound.arguments.items():
+        if name in _BOUND_SELF_PARAMS or name in config.exclude_params:
+            continue
+        # 明確傳入的參數依傳入方式套用 include_args / include_kwargs；預設值只要任一開啟即納入
+        if name in positional:
+            if not config.include_args:
+                continue
+        elif name in kwargs:
+            if not config.include_kwargs:
+                continue
+        elif not (config.include_args or config.include_kwargs):
+            continue
+        arguments[name] = value
+    return arguments
 
 def generate_cache_key(
     func_name: str,
     args: tuple,
     kwargs: dict,
-    config: CacheConfig
+    config: CacheConfig,
+    signature: Optional[inspect.Signature] = None
 ) -> str:
-    """生成快取鍵"""
-    key_parts = [config.key_prefix, func_name] if config.key_prefix else [func_name]
+    """
+    生成快取鍵
     
+    參數以正規化 JSON 編碼後取 blake2b 摘要，跨行程與重啟皆穩定
+    （不受 PYTHONHASHSEED 影響），因此多個 worker 可共用快取。
+    """
+    key_parts = [config.key_prefix, func_name] if config.key_prefix else [func_name]
     
-    if config.include_args and args:
-       
-        filtered_args = args[1:] if args and hasattr(args[0], '__dict__') else args
-        if filtered_args:
-            key_parts.append(str(hash(str(filtered_args))))
+    try:
+        arguments = _bind_arguments(signature, args, kwargs, config)
+    except TypeError:
+        # 沒有簽章或參數無法綁定時，退回分別編碼位置參數與關鍵字參數
+        arguments = {}
+        if config.include_args and args:
+            filtered_args = args[1:] if args and hasattr(args[0], '__dict__') else args
+            if filtered_args:
+                arguments["__args__"] = list(filtered_args)
+        if config.include_kwargs and kwargs:
+            filtered_kwargs = {
+                k: v for k, v in kwargs.items() 
+                if k not in config.exclude_params
+            }
+            if filtered_kwargs:
+                arguments["__kwargs__"] = filtered_kwargs
     
-    if config.include_kwargs and kwargs:
-       
-        filtered_kwargs = {
-            k: v for k, v in kwargs.items() 
-            if k not in config.exclude_params
-        }
-        if filtered_kwargs:
-            key_parts.append(str(hash(str(sorted(filtered_kwargs.items())))))
+    if arguments:
+        key_parts.append(_digest(_canonical_encode(arguments)))
     
     return ":".join(key_parts)
 
@@ -60,7 +704,15 @@ def cache(
     include_args: bool = True,
     include_kwargs: bool = True,
     exclude_params: Optional[List[str]] = None,
-    cache_condition: Optional[Callable] = None
+    cache_condition: Optional[Callable] = None,
+    tags: Optional[List[str]] = None,
+    local_ttl: Optional[int] = None,
+    stale_ttl: int = 0,
+    early_refresh: float = 0.0,
+    lock_timeout: Optional[int] = None,
+    response: bool = False,
+    max_bytes: Optional[int] = None,
+    namespace: Optional[str] = None
 ):
     """
     快取裝飾器
@@ -72,6 +724,17 @@ def cache(
         include_kwargs: 是否包含關鍵字參數
         exclude_params: 排除的參數名稱列表
         cache_condition: 快取條件函數，返回 True 時才快取
+        tags: 快取標籤，預設為鍵前綴的命名空間；以 invalidate_cache(tags=...) 一次失效
+        local_ttl: 啟用行程內 L1 快取的存活時間（秒），None 表示只使用 Redis
+        stale_ttl: 過期後仍可回傳舊值的視窗（秒），期間由單一背景任務重算
+        early_refresh: 機率性提前重算的係數（XFetch beta），0 表示停用
+        lock_timeout: 跨 worker 重算鎖的逾時（秒），None 表示只做行程內去重
+        response: 快取編碼後的 JSON 回應本文與 ETag（僅限 async 端點），命中時直接回傳
+            Response，請求帶有相符的 If-None-Match 時回傳 304；直接呼叫時回傳 JSON 相容的值
+        max_bytes: 編碼後超過此大小的條目不寫入快取，None 使用 CACHE_MAX_ENTRY_BYTES，0 表示不限制
+        namespace: 計算 Redis 用量預算的命名空間，預設為鍵前綴的第一段
+    
+    同一快取鍵的並行未命中在行程內只會執行一次函數（async 版本）。
     """
     def decorator(func: Callable) -> Callable:
         config = CacheConfig(
@@ -80,8 +743,86 @@ def cache(
             include_args=include_args,
             include_kwargs=include_kwargs,
             exclude_params=exclude_params,
-            cache_condition=cache_condition
+            cache_condition=cache_condition,
+            tags=tags,
+            local_ttl=local_ttl,
+            stale_ttl=stale_ttl,
+            early_refresh=early_refresh,
+            lock_timeout=lock_timeout,
+            response=response,
+            max_bytes=max_bytes,
+            namespace=namespace
         )
+        if config.namespace:
+            known_namespaces.add(config.namespace)
+        tag_keys = [tag_key(t) for t in config.tags]
+        try:
+            signature = inspect.signature(func)
+        except (TypeError, ValueError):
+            signature = None
+        
+        metrics = cache_metrics.prefix(config.key_prefix or func.__name__)
+        
+        async def compute_and_store(cache_key, generations, args, kwargs):
+            started = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                metrics.errors += 1
+                raise
+            delta = time.perf_counter() - started
+            metrics.function_latency.observe(delta * 1000)
+            
+            if config.response:
+                if isinstance(result, Response):
+                    return result
+                try:
+                    result = build_response_entry(result)
+                except (TypeError, ValueError) as e:
+                    metrics.errors += 1
+                    print(f"回應編碼錯誤: {cache_key} - {e}")
+                    return result
+            
+            redis_started = time.perf_counter()
+            for t, generation in generations.items():
+                if generation is None:
+                    candidate = _new_generation()
+                    if not await redis_client.set(tag_key(t), candidate, nx=True):
+                        # 其他請求搶先初始化了世代，這次不寫入以免記錄錯誤的世代
+                        return result
+                    generations[t] = candidate
+            
+            try:
+                payload = redis_client.encode_value(
+                    wrap_entry(result, generations, time.time() + config.ttl, delta)
+                )
+            except ValueError as e:
+                metrics.errors += 1
+                print(f"快取編碼錯誤: {cache_key} - {e}")
+                return result
+            if config.max_bytes and len(payload) > config.max_bytes:
+                metrics.rejected_size += 1
+                print(f"📦 快取條目過大，不寫入: {cache_key} ({len(payload)} bytes)")
+                return result
+            if not await _admit(config.namespace, cache_key, len(payload), config.ttl + config.stale_ttl):
+                metrics.rejected_budget += 1
+                print(f"📦 命名空間 {config.namespace} 已達快取預算，不寫入: {cache_key}")
+                return result
+            async with redis_client.pipeline() as batch:
+                batch.command("set", cache_key, payload, ex=config.ttl + config.stale_ttl)
+                if config.local_ttl:
+                    message = _invalidation_message(keys=[cache_key])
+                    apply_invalidation(message)
+                    batch.publish(INVALIDATION_CHANNEL, message)
+            metrics.redis_latency.observe(_elapsed_ms(redis_started))
+            if batch.results and batch.results[0]:
+                metrics.bytes_written += len(payload)
+            else:
+                metrics.errors += 1
+            if config.local_ttl:
+                local_cache.set(cache_key, result, len(payload), config.local_ttl, config.tags)
+            
+            return result
         
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
@@ -90,21 +831,115 @@ def cache(
                 return await func(*args, **kwargs)
             
             
-            cache_key = generate_cache_key(func.__name__, args, kwargs, config)
+            cache_key = generate_cache_key(func.__name__, args, kwargs, config, signature)
+            if cache_key in tracked_access:
+                tracked_access[cache_key] += 1
             
+            if config.local_ttl:
+                found, cached_result = local_cache.get(cache_key)
+                if found:
+                    metrics.l1_hits += 1
+                    return cached_result
             
-            cached_result = await redis_client.get(cache_key)
-            if cached_result is not None:
+            redis_started = time.perf_counter()
+            entry, generations, size = await _read_l2(cache_key, tag_keys, config)
+            metrics.redis_latency.observe(_elapsed_ms(redis_started))
+            valid, cached_result = unwrap_entry(entry, generations)
+            now = time.time()
+            fresh = valid and _is_fresh(entry, now)
+            if fresh or (valid and config.stale_ttl):
+                metrics.hits += 1
+                metrics.bytes_read += size
+                if not fresh:
+                    metrics.stale_hits += 1
                 print(f"🎯 快取命中: {cache_key}")
+                if _should_refresh(entry, now, config):
+                    _schedule_refresh(
+                        cache_key,
+                        lambda: _compute_with_lock(
+                            cache_key, tag_keys, config,
+                            lambda: compute_and_store(cache_key, dict(generations), args, kwargs)
+                        )
+                    )
+                if fresh and config.local_ttl:
+                    local_cache.set(cache_key, cached_result, size, config.local_ttl, config.tags)
                 return cached_result
             
-            
+            metrics.misses += 1
             print(f"💾 執行函數並快取: {cache_key}")
-            result = await func(*args, **kwargs)
+            return await _single_flight(
+                cache_key,
+                lambda: _compute_with_lock(
+                    cache_key, tag_keys, config,
+                    lambda: compute_and_store(cache_key, dict(generations), args, kwargs)
+                )
+            )
+        
+        def make_key(*args, **kwargs) -> str:
+            return generate_cache_key(func.__name__, args, kwargs, config, signature)
+        
+        async def refresh(*args, **kwargs):
+            """不論快取狀態，重新執行函數並寫入快取"""
+            cache_key = make_key(*args, **kwargs)
+            _, generations, _ = await _read_l2(cache_key, tag_keys, config)
+            return await _single_flight(
+                cache_key,
+                lambda: _compute_with_lock(
+                    cache_key, tag_keys, config,
+                    lambda: compute_and_store(cache_key, generations, args, kwargs)
+                )
+            )
+        
+        async def status(*args, **kwargs) -> Dict[str, Any]:
+            """
+            查詢快取條目狀態
             
-            await redis_client.set(cache_key, result, expire=config.ttl)
+            Returns:
+                state 為 missing / fresh / stale；remaining 為距邏輯過期的秒數；
+                delta 為上次重算耗時（秒）
+            """
+            cache_key = make_key(*args, **kwargs)
+            entry, generations, _ = await _read_l2(cache_key, tag_keys, config)
+            valid, _ = unwrap_entry(entry, generations)
+            if not valid:
+                return {"key": cache_key, "state": "missing", "remaining": 0.0, "delta": None}
+            expires_at = entry.get(ENVELOPE_EXPIRES_FIELD)
+            remaining = expires_at - time.time() if expires_at is not None else float(config.ttl)
+            return {
+                "key": cache_key,
+                "state": "fresh" if remaining > 0 else "stale",
+                "remaining": remaining,
+                "delta": entry.get(ENVELOPE_DELTA_FIELD)
+            }
+        
+        if config.response:
+            cached_call = async_wrapper
             
-            return result
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                request = kwargs.pop(RESPONSE_REQUEST_PARAM, None)
+                value = await cached_call(*args, **kwargs)
+                if request is None:
+                    return response_value(value)
+                return render_response(value, request, metrics)
+            
+            if signature is not None:
+                # 讓 FastAPI 注入 Request 以讀取 If-None-Match；不影響快取鍵
+                parameters = list(signature.parameters.values())
+                position = next(
+                    (i for i, p in enumerate(parameters) if p.kind is inspect.Parameter.VAR_KEYWORD),
+                    len(parameters)
+                )
+                parameters.insert(position, inspect.Parameter(
+                    RESPONSE_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY,
+                    default=None, annotation=Request
+                ))
+                async_wrapper.__signature__ = signature.replace(parameters=parameters)
+        
+        async_wrapper.cache_config = config
+        async_wrapper.cache_key = make_key
+        async_wrapper.cache_refresh = refresh
+        async_wrapper.cache_status = status
         
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
@@ -113,35 +948,87 @@ def cache(
                 return func(*args, **kwargs)
             
            
-            cache_key = generate_cache_key(func.__name__, args, kwargs, config)
+            cache_key = generate_cache_key(func.__name__, args, kwargs, config, signature)
             
          
+            if config.local_ttl:
+                found, cached_result = local_cache.get(cache_key)
+                if found:
+                    metrics.l1_hits += 1
+                    return cached_result
+            
+            generations = {t: None for t in config.tags}
             try:
-                import redis
-                r = redis.Redis.from_url(redis_client.redis_url, decode_responses=True)
-                cached_result = r.get(cache_key)
-                if cached_result is not None:
-                    print(f"🎯 快取命中: {cache_key}")
-                    try:
-                        return json.loads(cached_result)
-                    except (json.JSONDecodeError, TypeError):
-                        return cached_result
+                with redis_client.sync_session() as r:
+                    if r is not None:
+                        redis_started = time.perf_counter()
+                        cached_result, *raw_generations = r.mget([cache_key] + tag_keys)
+                        metrics.redis_latency.observe(_elapsed_ms(redis_started))
+                        generations = {
+                            t: _parse_generation(g) for t, g in zip(config.tags, raw_generations)
+                        }
+                        if cached_result is not None:
+                            entry = redis_client.decode_value(cached_result)
+                            valid, value = unwrap_entry(entry, generations)
+                            # 同步版本不做背景重算，超過邏輯期限即視為未命中
+                            if valid and _is_fresh(entry, time.time()):
+                                metrics.hits += 1
+                                metrics.bytes_read += len(cached_result)
+                                print(f"🎯 快取命中: {cache_key}")
+                                if config.local_ttl:
+                                    local_cache.set(
+                                        cache_key, value, len(cached_result),
+                                        config.local_ttl, config.tags
+                                    )
+                                return value
             except Exception as e:
+                metrics.errors += 1
                 print(f"同步快取讀取錯誤: {e}")
             
-           
+            metrics.misses += 1
             print(f"💾 執行函數並快取: {cache_key}")
-            result = func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                metrics.errors += 1
+                raise
+            delta = time.perf_counter() - started
+            metrics.function_latency.observe(delta * 1000)
             
            
             try:
-                import redis
-                r = redis.Redis.from_url(redis_client.redis_url, decode_responses=True)
-                if isinstance(result, (dict, list)):
-                    r.setex(cache_key, config.ttl, json.dumps(result, ensure_ascii=False, cls=DateTimeEncoder))
-                else:
-                    r.setex(cache_key, config.ttl, str(result))
+                with redis_client.sync_session() as r:
+                    if r is not None:
+                        redis_started = time.perf_counter()
+                        for t, generation in generations.items():
+                            if generation is None:
+                                candidate = _new_generation()
+                                if not r.set(tag_key(t), candidate, nx=True):
+                                    return result
+                                generations[t] = candidate
+                        entry = redis_client.encode_value(
+                            wrap_entry(result, generations, time.time() + config.ttl, delta)
+                        )
+                        if config.max_bytes and len(entry) > config.max_bytes:
+                            metrics.rejected_size += 1
+                            print(f"📦 快取條目過大，不寫入: {cache_key} ({len(entry)} bytes)")
+                            return result
+                        if not _admit_sync(r, config.namespace, cache_key, len(entry), config.ttl + config.stale_ttl):
+                            metrics.rejected_budget += 1
+                            print(f"📦 命名空間 {config.namespace} 已達快取預算，不寫入: {cache_key}")
+                            return result
+                        # 寫入與失效廣播在同一次往返送出
+                        pipe = r.pipeline(transaction=False)
+                        pipe.setex(cache_key, config.ttl + config.stale_ttl, entry)
+                        if config.local_ttl:
+                            _publish_invalidation_sync(pipe, keys=[cache_key])
+                            local_cache.set(cache_key, result, len(entry), config.local_ttl, config.tags)
+                        pipe.execute()
+                        metrics.redis_latency.observe(_elapsed_ms(redis_started))
+                        metrics.bytes_written += len(entry)
             except Exception as e:
+                metrics.errors += 1
                 print(f"同步快取寫入錯誤: {e}")
             
             return result
@@ -154,27 +1041,29 @@ def cache(
     
     return decorator
 
-def invalidate_cache(pattern: str = None, key: str = None):
+def invalidate_cache(pattern: str = None, key: str = None, tags: Optional[List[str]] = None):
     """
     快取失效裝飾器
     
     Args:
-        pattern: 要失效的快取鍵模式
+        pattern: 要失效的快取鍵模式（經 CacheManager.clear_pattern 以 SCAN 走訪並分批 UNLINK，不阻塞 Redis）
         key: 要失效的具體快取鍵
+        tags: 要失效的快取標籤；每個標籤只需一次 INCR，與快取鍵數量無關
     """
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
             result = await func(*args, **kwargs)
             
-            if key:
+            if tags:
+                await CacheManager.invalidate_tags(*tags)
+            elif key:
                 await redis_client.delete(key)
+                await publish_invalidation(keys=[key])
                 print(f"🗑️ 失效快取: {key}")
             elif pattern:
-                keys = await redis_client.keys(pattern)
-                for k in keys:
-                    await redis_client.delete(k)
-                print(f"🗑️ 失效快取模式: {pattern} ({len(keys)} 個鍵)")
+                deleted = await CacheManager.clear_pattern(pattern)
+                print(f"🗑️ 失效快取模式: {pattern} ({deleted} 個鍵)")
             
             return result
         
@@ -184,16 +1073,29 @@ def invalidate_cache(pattern: str = None, key: str = None):
             
        
             try:
-                import redis
-                r = redis.Redis.from_url(redis_client.redis_url, decode_responses=True)
-                if key:
-                    r.delete(key)
-                    print(f"🗑️ 失效快取: {key}")
-                elif pattern:
-                    keys = r.keys(pattern)
-                    if keys:
-                        r.delete(*keys)
-                    print(f"🗑️ 失效快取模式: {pattern} ({len(keys)} 個鍵)")
+                with redis_client.sync_session() as r:
+                    if r is not None:
+                        if tags:
+                            for t in tags:
+                                r.incr(tag_key(t))
+                            _publish_invalidation_sync(r, tags=tags)
+                            print(f"🗑️ 失效快取標籤: {', '.join(tags)}")
+                        elif key:
+                            r.delete(key)
+                            _publish_invalidation_sync(r, keys=[key])
+                            print(f"🗑️ 失效快取: {key}")
+                        elif pattern:
+                            deleted = 0
+                            batch = []
+                            for k in r.scan_iter(match=pattern, count=SCAN_BATCH_SIZE):
+                                batch.append(k)
+                                if len(batch) >= SCAN_BATCH_SIZE:
+                                    deleted += r.unlink(*batch)
+                                    batch = []
+                            if batch:
+                                deleted += r.unlink(*batch)
+                            _publish_invalidation_sync(r, pattern=pattern)
+                            print(f"🗑️ 失效快取模式: {pattern} ({deleted} 個鍵)")
             except Exception as e:
                 print(f"同步快取失效錯誤: {e}")
             
@@ -213,25 +1115,103 @@ class CacheManager:
     async def clear_all():
         """清空所有快取"""
         await redis_client.flushdb()
+        await publish_invalidation(clear=True)
         print("🧹 已清空所有快取")
     
     @staticmethod
-    async def clear_pattern(pattern: str):
-        """清空符合模式的快取"""
-        keys = await redis_client.keys(pattern)
-        for key in keys:
-            await redis_client.delete(key)
-        print(f"🧹 已清空快取模式: {pattern} ({len(keys)} 個鍵)")
+    async def invalidate_tags(*tags: str):
+        """使標籤下的所有快取失效（遞增世代計數器，舊條目隨 TTL 自然過期）"""
+        message = _invalidation_message(tags=list(tags))
+        apply_invalidation(message)
+        # 所有標籤的 INCR 與失效廣播在同一次往返送出
+        async with redis_client.pipeline() as batch:
+            for t in tags:
+                batch.incr(tag_key(t))
+            batch.publish(INVALIDATION_CHANNEL, message)
+        print(f"🗑️ 失效快取標籤: {', '.join(tags)}")
+    
+    @staticmethod
+    async def clear_pattern(pattern: str, batch_size: int = SCAN_BATCH_SIZE) -> int:
+        """以 SCAN 走訪並分批 UNLINK 符合模式的快取，回傳刪除數量"""
+        deleted = 0
+        batch: List[str] = []
+        async for key in redis_client.scan_iter(match=pattern, count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                deleted += await redis_client.unlink_many(batch)
+                batch = []
+        if batch:
+            deleted += await redis_client.unlink_many(batch)
+        await publish_invalidation(pattern=pattern)
+        print(f"🧹 已清空快取模式: {pattern} ({deleted} 個鍵)")
+        return deleted
+    
+    @staticmethod
+    async def list_keys(pattern: str = "*", cursor: int = 0, count: int = 100) -> Dict[str, Any]:
+        """
+        分頁列出快取鍵
+        
+        每頁最多走訪約 count 個鍵（SCAN 的 COUNT 提示，實際回傳數量可能較少），
+        next_cursor 為 0 表示已走完。
+        """
+        next_cursor, keys = await redis_client.scan(cursor, match=pattern, count=count)
+        return {"keys": keys, "next_cursor": next_cursor}
+    
+    @staticmethod
+    async def get_cache_info(sample_size: int = 10):
+        """取得快取資訊（總數以 DBSIZE 取得，只抽樣少量鍵名）"""
+        total_keys = await redis_client.dbsize()
+        keys: List[str] = []
+        cursor = 0
+        for _ in range(SCAN_MAX_SAMPLE_PAGES):
+            cursor, page = await redis_client.scan(cursor, count=max(sample_size, 100))
+            keys.extend(page)
+            if len(keys) >= sample_size or cursor == 0:
+                break
+        return {
+            "total_keys": total_keys,
+            "keys": keys[:sample_size]
+        }
     
     @staticmethod
-    async def get_cache_info():
-        """取得快取資訊"""
-        keys = await redis_client.keys("*")
+    def get_tier_stats() -> Dict[str, Any]:
+        """分別回報 L1（行程內）與 L2（Redis）的命中率，以及 Redis 斷路器狀態"""
+        totals = cache_metrics.totals()
+        l2_lookups = totals["hits"] + totals["misses"]
         return {
-            "total_keys": len(keys),
-            "keys": keys[:10] if len(keys) > 10 else keys 
+            "l1": local_cache.stats(),
+            "l2": {
+                "hits": totals["hits"],
+                "misses": totals["misses"],
+                "hit_ratio": totals["hits"] / l2_lookups if l2_lookups else 0.0
+            },
+            "redis": redis_client.health()
         }
     
+    @staticmethod
+    async def get_budget_usage() -> Dict[str, Any]:
+        """各命名空間在 Redis 中記帳的用量與預算"""
+        namespaces = sorted(known_namespaces)
+        used = await redis_client.mget([budget_keys(ns)[2] for ns in namespaces])
+        return {
+            ns: {"used_bytes": int(u or 0), "budget_bytes": namespace_budget(ns)}
+            for ns, u in zip(namespaces, used)
+        }
+    
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        """依 key_prefix 回報命中、未命中、錯誤、延遲與資料量"""
+        return {
+            "prefixes": cache_metrics.snapshot(),
+            "tiers": CacheManager.get_tier_stats()
+        }
+    
+    @staticmethod
+    def reset_stats():
+        """歸零所有快取統計"""
+        cache_metrics.reset()
+        local_cache.reset_stats()
+    
     @staticmethod
     async def warm_up_cache(cache_functions: List[Callable]):
         """預熱快取"""
@@ -0,0 +1,194 @@
+import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+# K 線所在的 collection（不是物品）
+CANDLES_COLLECTION = "Rate-Candles"
+
+# 解析度 → (秒數, $dateTrunc 單位)
+RESOLUTIONS = {
+    "1m": (60, "minute"),
+    "1h": (3600, "hour"),
+    "1d": (86400, "day"),
+}
+
+def _naive_utc(timestamp: datetime.datetime) -> datetime.datetime:
+    # 交易紀錄的時間為 naive UTC，帶時區的查詢參數先轉換
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def bucket_start(timestamp: datetime.datetime, resolution: str) -> datetime.datetime:
+    """將時間對齊到該解析度的區間起點（naive UTC）"""
+    seconds, _ = RESOLUTIONS[resolution]
+    timestamp = _naive_utc(timestamp)
+    epoch = int((timestamp - datetime.datetime(1970, 1, 1)).total_seconds())
+    return datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=epoch - epoch % seconds)
+
+def _missing(field: str) -> Dict[str, Any]:
+    return {"$eq": [{"$type": field}, "missing"]}
+
+class RateCandles:
+    """
+    交易對匯率 K 線（OHLCV）
+
+    每個有向交易對（item_from → item_to，匯率 = 每單位 item_from 可換得的 item_to）
+    在 1m / 1h / 1d 三種解析度各有一份區間文件：開、高、低、收、成交量與筆數。
+    new_trade 以單次 bulk_write 更新兩個方向、三種解析度共 6 個區間；
+    開盤與收盤依交易時間比較，多個 worker 交錯寫入時仍正確。
+    圖表查詢只讀取區間文件，不掃描交易歷史。
+    """
+
+    def __init__(self):
+        self._indexed = False
+
+    async def _ensure_index(self, collection):
+        if self._indexed:
+            return
+        await collection.create_index(
+            [("item_from", 1), ("item_to", 1), ("resolution", 1), ("start", 1)], unique=True
+        )
+        self._indexed = True
+
+    @staticmethod
+    def _update(
+        item_from: str, item_to: str, resolution: str,
+        rate: float, quantity_from: int, quantity_to: int, timestamp: datetime.datetime
+    ) -> UpdateOne:
+        # 以聚合管線更新：同一個 $set 內的運算式都讀取更新前的值
+        return UpdateOne(
+            {
+                "item_from": item_from,
+                "item_to": item_to,
+                "resolution": resolution,
+                "start": bucket_start(timestamp, resolution)
+            },
+            [{"$set": {
+                "open": {"$cond": [{"$or": [_missing("$open_ts"), {"$lt": [timestamp, "$open_ts"]}]}, rate, "$open"]},
+                "close": {"$cond": [{"$or": [_missing("$close_ts"), {"$gte": [timestamp, "$close_ts"]}]}, rate, "$close"]},
+                "open_ts": {"$min": ["$open_ts", timestamp]},
+                "close_ts": {"$max": ["$close_ts", timestamp]},
+                "high": {"$max": ["$high", rate]},
+                "low": {"$min": ["$low", rate]},
+                "volume": {"$add": [{"$ifNull": ["$volume", 0]}, quantity_from]},
+                "volume_to": {"$add": [{"$ifNull": ["$volume_to", 0]}, quantity_to]},
+                "count": {"$add": [{"$ifNull": ["$count", 0]}, 1]}
+            }}],
+            upsert=True
+        )
+
+    async def record(self, db, item_a: str, quantity_a: int, item_b: str, quantity_b: int, timestamp: datetime.datetime):
+        """記錄一筆交易（兩個方向 × 三種解析度，單次 bulk_write）"""
+        if not quantity_a or not quantity_b:
+            return
+        try:
+            collection = db[CANDLES_COLLECTION]
+            await self._ensure_index(collection)
+            operations = []
+            for resolution in RESOLUTIONS:
+                operations.append(self._update(item_a, item_b, resolution, quantity_b / quantity_a, quantity_a, quantity_b, timestamp))
+                operations.append(self._update(item_b, item_a, resolution, quantity_a / quantity_b, quantity_b, quantity_a, timestamp))
+            await collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"更新匯率 K 線失敗: {item_a} / {item_b} - {e}")
+
+    async def query(
+        self,
+        db,
+        item_from: str,
+        item_to: str,
+        resolution: str,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+        limit: int = 500
+    ) -> List[Dict[str, Any]]:
+        """
+        依區間起點由舊到新取得 [start, end) 內的 K 線（索引範圍查詢）
+
+        未指定 start 時取 end（預設為現在）之前最新的 limit 根。
+        """
+        query: Dict[str, Any] = {"item_from": item_from, "item_to": item_to, "resolution": resolution}
+        if start is not None or end is not None:
+            query["start"] = {}
+            if start is not None:
+                query["start"]["$gte"] = bucket_start(start, resolution)
+            if end is not None:
+                query["start"]["$lt"] = _naive_utc(end)
+        projection = {"_id": 0, "start": 1, "open": 1, "high": 1, "low": 1, "close": 1, "volume": 1, "volume_to": 1, "count": 1}
+        direction = 1 if start is not None else -1
+        cursor = db[CANDLES_COLLECTION].find(query, projection).sort("start", direction).limit(limit)
+        candles = await cursor.to_list(length=limit)
+        if direction < 0:
+            candles.reverse()
+        return candles
+
+    async def rebuild(self, db) -> int:
+        """
+        依 Trade-History 重建所有 K 線
+
+        每個方向與解析度各一次聚合，以 $dateTrunc 分組後 $merge 寫回，資料不經過應用程式。
+        """
+        collection = db[CANDLES_COLLECTION]
+        await collection.delete_many({})
+        self._indexed = False
+        await self._ensure_index(collection)
+        directions = [
+            ("$item_a", "$item_b", "$quantity_a", "$quantity_b"),
+            ("$item_b", "$item_a", "$quantity_b", "$quantity_a"),
+        ]
+        for resolution, (_, unit) in RESOLUTIONS.items():
+            for item_from, item_to, quantity_from, quantity_to in directions:
+                pipeline = [
+                    {"$match": {
+                        "item_a": {"$ne": None}, "item_b": {"$ne": None},
+                        "quantity_a": {"$nin": [None, 0]}, "quantity_b": {"$nin": [None, 0]},
+                        "timestamp": {"$ne": None}
+                    }},
+                    {"$sort": {"timestamp": 1}},
+                    {"$project": {
+                        "item_from": item_from,
+                        "item_to": item_to,
+                        "quantity_from": quantity_from,
+                        "quantity_to": quantity_to,
+                        "rate": {"$divide": [quantity_to, quantity_from]},
+                        "timestamp": 1
+                    }},
+                    {"$group": {
+                        "_id": {
+                            "item_from": "$item_from",
+                            "item_to": "$item_to",
+                            "start": {"$dateTrunc": {"date": "$timestamp", "unit": unit}}
+                        },
+                        "open": {"$first": "$rate"},
+                        "close": {"$last": "$rate"},
+                        "high": {"$max": "$rate"},
+                        "low": {"$min": "$rate"},
+                        "open_ts": {"$first": "$timestamp"},
+                        "close_ts": {"$last": "$timestamp"},
+                        "volume": {"$sum": "$quantity_from"},
+                        "volume_to": {"$sum": "$quantity_to"},
+                        "count": {"$sum": 1}
+                    }},
+                    {"$project": {
+                        "_id": 0,
+                        "item_from": "$_id.item_from",
+                        "item_to": "$_id.item_to",
+                        "resolution": {"$literal": resolution},
+                        "start": "$_id.start",
+                        "open": 1, "close": 1, "high": 1, "low": 1, "open_ts": 1, "close_ts": 1,
+                        "volume": 1, "volume_to": 1, "count": 1
+                    }},
+                    {"$merge": {
+                        "into": CANDLES_COLLECTION,
+                        "on": ["item_from", "item_to", "resolution", "start"],
+                        "whenMatched": "replace",
+                        "whenNotMatched": "insert"
+                    }}
+                ]
+                await db["Trade-History"].aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+        total = await collection.count_documents({})
+        print(f"✅ 已重建 {total} 根匯率 K 線")
+        return total
+
+rate_candles = RateCandles()
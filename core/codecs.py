@@ -0,0 +1,196 @@
+import os
+import json
+import zlib
+import base64
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# 標頭位元組 = 0x80 | 基礎格式 | 壓縮旗標，落在 0x80~0xBF：這是 UTF-8 的延續位元組，
+# 不可能是合法 UTF-8 文字的第一個位元組，因此不會與舊版（無標頭）的 JSON / 字串值混淆
+_HEADER_MARK = 0x80
+FORMAT_JSON = 0x01
+FORMAT_MSGPACK = 0x02
+COMPRESS_NONE = 0x00
+COMPRESS_ZLIB = 0x10
+COMPRESS_LZ4 = 0x20
+_FORMAT_MASK = 0x0F
+_COMPRESS_MASK = 0x30
+
+_DATETIME_TAG = "__datetime__"
+_BYTES_TAG = "__bytes__"
+_MSGPACK_DATETIME_EXT = 1
+
+class CodecError(ValueError):
+    """無法編碼或解碼快取值"""
+
+def _fallback(obj: Any) -> Any:
+    # 與 DateTimeEncoder 相同：具有 __dict__ 的物件以其屬性表示，其餘轉為字串
+    if hasattr(obj, "__dict__"):
+        return obj.__dict__
+    return str(obj)
+
+# ---- JSON -------------------------------------------------------------------
+class _TaggedJSONEncoder(json.JSONEncoder):
+    """以標記物件保存 datetime 與 bytes，解碼時可還原型別"""
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return {_DATETIME_TAG: obj.isoformat()}
+        if isinstance(obj, (bytes, bytearray)):
+            return {_BYTES_TAG: base64.b64encode(bytes(obj)).decode("ascii")}
+        return _fallback(obj)
+
+def _json_object_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        if _DATETIME_TAG in obj:
+            return datetime.fromisoformat(obj[_DATETIME_TAG])
+        if _BYTES_TAG in obj:
+            return base64.b64decode(obj[_BYTES_TAG])
+    return obj
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), cls=_TaggedJSONEncoder).encode("utf-8")
+
+def _json_loads(data: bytes) -> Any:
+    return json.loads(data, object_hook=_json_object_hook)
+
+# ---- msgpack ----------------------------------------------------------------
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_MSGPACK_DATETIME_EXT, obj.isoformat().encode("ascii"))
+    return _fallback(obj)
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _MSGPACK_DATETIME_EXT:
+        return datetime.fromisoformat(data.decode("ascii"))
+    return msgpack.ExtType(code, data)
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+
+_FORMATS: Dict[int, Tuple[str, Callable, Callable, bool]] = {
+    FORMAT_JSON: ("json", _json_dumps, _json_loads, True),
+    FORMAT_MSGPACK: ("msgpack", _msgpack_dumps, _msgpack_loads, msgpack is not None),
+}
+
+_COMPRESSORS: Dict[int, Tuple[str, Callable, Callable, bool]] = {
+    COMPRESS_NONE: ("none", lambda b: b, lambda b: b, True),
+    COMPRESS_ZLIB: ("zlib", lambda b: zlib.compress(b, 1), zlib.decompress, True),
+    COMPRESS_LZ4: (
+        "lz4",
+        (lambda b: lz4_frame.compress(b)) if lz4_frame else None,
+        (lambda b: lz4_frame.decompress(b)) if lz4_frame else None,
+        lz4_frame is not None
+    ),
+}
+
+def _lookup(table: Dict[int, Tuple[str, Callable, Callable, bool]], name: str) -> int:
+    for flag, (flag_name, _, _, available) in table.items():
+        if flag_name == name:
+            if not available:
+                raise CodecError(f"{name} 需要安裝對應套件")
+            return flag
+    raise CodecError(f"未知的格式: {name}")
+
+class Codec:
+    """
+    快取值編解碼器
+
+    編碼結果的第一個位元組記錄格式與壓縮方式，因此不同設定寫入的值可以並存；
+    解碼時依標頭選擇格式，與目前設定無關。沒有標頭的舊資料以 JSON 文字解讀。
+
+    Args:
+        fmt: 基礎格式，"json" 或 "msgpack"
+        compression: 壓縮方式，"none"、"zlib" 或 "lz4"
+        min_compress_bytes: 編碼後超過此大小才壓縮
+    """
+
+    def __init__(self, fmt: str = "json", compression: str = "zlib", min_compress_bytes: int = 1024):
+        self.format = _lookup(_FORMATS, fmt)
+        self.compression = _lookup(_COMPRESSORS, compression)
+        self.min_compress_bytes = min_compress_bytes
+
+    @property
+    def name(self) -> str:
+        fmt = _FORMATS[self.format][0]
+        compression = _COMPRESSORS[self.compression][0]
+        return fmt if self.compression == COMPRESS_NONE else f"{fmt}+{compression}"
+
+    def encode(self, value: Any) -> bytes:
+        try:
+            payload = _FORMATS[self.format][1](value)
+        except (TypeError, ValueError, OverflowError) as e:
+            raise CodecError(f"無法編碼快取值: {e}") from e
+        flag = COMPRESS_NONE
+        if self.compression != COMPRESS_NONE and len(payload) >= self.min_compress_bytes:
+            compressed = _COMPRESSORS[self.compression][1](payload)
+            if len(compressed) < len(payload):
+                payload, flag = compressed, self.compression
+        return bytes((_HEADER_MARK | self.format | flag,)) + payload
+
+    @staticmethod
+    def decode(data: Any) -> Any:
+        if data is None:
+            return None
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if not data or data[0] not in _HEADERS:
+            return _decode_legacy(data)
+        header = data[0]
+        fmt = _FORMATS[header & _FORMAT_MASK]
+        compression = _COMPRESSORS[header & _COMPRESS_MASK]
+        if not (fmt[3] and compression[3]):
+            raise CodecError(f"無法解碼 {fmt[0]}+{compression[0]}，缺少對應套件")
+        try:
+            return fmt[2](compression[2](data[1:]))
+        except Exception as e:
+            raise CodecError(f"無法解碼快取值: {e}") from e
+
+_HEADERS = {_HEADER_MARK | f | c for f in _FORMATS for c in _COMPRESSORS}
+
+def _decode_legacy(data: bytes) -> Any:
+    """舊版 RedisClient 寫入的值：dict/list 為 JSON，其他為 str()"""
+    text = data.decode("utf-8", errors="replace")
+    try:
+        return json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return text
+
+def codec_from_env() -> Codec:
+    """依環境變數 CACHE_CODEC / CACHE_COMPRESSION / CACHE_COMPRESS_MIN_BYTES 建立編解碼器"""
+    fmt = os.getenv("CACHE_CODEC", "json")
+    compression = os.getenv("CACHE_COMPRESSION", "zlib")
+    min_bytes = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+    try:
+        return Codec(fmt, compression, min_bytes)
+    except CodecError as e:
+        print(f"⚠️ 快取編碼設定無效（{e}），改用 json+zlib")
+        return Codec("json", "zlib", min_bytes)
+
+def available_codecs(min_compress_bytes: int = 1024) -> Dict[str, Codec]:
+    """目前環境可用的所有格式組合"""
+    codecs: Dict[str, Codec] = {}
+    for _, (fmt, _, _, fmt_ok) in _FORMATS.items():
+        for _, (compression, _, _, comp_ok) in _COMPRESSORS.items():
+            if fmt_ok and comp_ok:
+                codec = Codec(fmt, compression, min_compress_bytes)
+                codecs[codec.name] = codec
+    return codecs
+
+def decode_text(data: Optional[Any]) -> Optional[str]:
+    """將 Redis 回傳的 bytes 轉為 str（鍵名、計數器等）"""
+    if isinstance(data, bytes):
+        return data.decode("utf-8", errors="replace")
+    return data
@@ -0,0 +1,297 @@
+import re
+import math
+import time
+import zlib
+import random
+import asyncio
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+LOCAL_HASH_PREFIX = "local-hash"
+
+class EmbeddingBackend(ABC):
+    """
+    嵌入後端介面（子類別未實作 embed 時無法建立實例）
+
+    Attributes:
+        model: 模型名稱（向量庫目錄與查詢向量快取的鍵都以此區分）
+        dim: 向量維度
+        local: 是否在行程內計算（不需網路，也不值得再查 Redis 快取）
+    """
+
+    model: str = ""
+    dim: int = 0
+    local: bool = False
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """回傳形狀 (N, dim) 的 float32 陣列"""
+
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        """非同步版本；行程內後端少量文字直接計算，大量時交給執行緒池以免阻塞事件迴圈"""
+        if len(texts) <= 256:
+            return self.embed(texts)
+        return await asyncio.get_running_loop().run_in_executor(None, self.embed, texts)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"model": self.model, "dim": self.dim, "local": self.local}
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """
+    OpenAI Embeddings（非同步客戶端，第一次嵌入時才建立）
+
+    文字依 batch_size 切批後並行送出，同時進行的請求數由 semaphore 限制在 concurrency 以內。
+    遇到速率限制、逾時、連線錯誤或 5xx 時以指數退避加隨機抖動重試（優先採用 Retry-After）。
+    同一段文字若已有請求進行中，後到的呼叫直接等待該結果，不會重複送出；
+    請求在共用的背景任務中執行，先送出的呼叫被取消時，等待同一段文字的其他呼叫不受影響。
+    吞吐量以「至少有一個請求進行中」的實際經過時間計算，重疊的呼叫不重複計時。
+
+    Args:
+        model: OpenAI 嵌入模型
+        api_key: OPENAI_API_KEY
+        batch_size: 每個請求的文字數
+        concurrency: 同時進行的請求上限
+        max_retries: 每批最多重試次數
+        backoff: 第一次重試的等待秒數（之後每次加倍，上限 30 秒）
+    """
+
+    def __init__(
+        self,
+        model: str,
+        api_key: Optional[str],
+        batch_size: int = 128,
+        concurrency: int = 8,
+        max_retries: int = 5,
+        backoff: float = 0.5
+    ):
+        self.model = model
+        self.dim = 1536 if model.endswith("small") else 3072
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._api_key = api_key
+        self._client = None
+        self._async_client = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._tasks = set()
+        self._active = 0
+        self._busy_since = 0.0
+        self.texts = 0
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.deduplicated = 0
+        self.busy_seconds = 0.0
+
+    def _check_key(self):
+        if not self._api_key:
+            raise RuntimeError("OPENAI_API_KEY not set")
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._check_key()
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self._api_key)
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            self._check_key()
+            from openai import AsyncOpenAI
+            # 重試由這裡控制，避免與 SDK 內建重試疊加
+            self._async_client = AsyncOpenAI(api_key=self._api_key, max_retries=0)
+        return self._async_client
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        vecs: List[List[float]] = []
+        for i in range(0, len(texts), self.batch_size):
+            resp = self.client.embeddings.create(model=self.model, input=texts[i : i + self.batch_size])
+            vecs.extend(d.embedding for d in resp.data)
+        return np.asarray(vecs, dtype=np.float32)
+
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        loop = asyncio.get_running_loop()
+        futures: Dict[str, asyncio.Future] = {}
+        pending: List[str] = []
+        for text in dict.fromkeys(texts):
+            future = self._inflight.get(text)
+            if future is None:
+                future = loop.create_future()
+                self._inflight[text] = future
+                pending.append(text)
+            else:
+                self.deduplicated += 1
+            futures[text] = future
+
+        if pending:
+            task = loop.create_task(self._embed_pending(pending, {text: futures[text] for text in pending}))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        # shield：呼叫端被取消時不取消共用的 future
+        vectors = [await asyncio.shield(futures[text]) for text in texts]
+        return np.asarray(vectors, dtype=np.float32)
+
+    async def _embed_pending(self, pending: List[str], futures: Dict[str, asyncio.Future]):
+        """送出一次呼叫新增的文字；所有批次結束後才離開，錯誤已交給對應的 future"""
+        self._busy_enter()
+        start = time.perf_counter()
+        batches = [pending[i : i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        try:
+            await asyncio.gather(*(self._embed_batch(batch, futures) for batch in batches), return_exceptions=True)
+        finally:
+            for text in pending:
+                self._inflight.pop(text, None)
+                future = futures[text]
+                if not future.done():
+                    # 只有服務關閉時任務被取消才會發生；以錯誤結束，不取消其他呼叫正在等待的 future
+                    future.set_exception(RuntimeError("嵌入請求已中止"))
+                    future.exception()
+            self._busy_exit()
+        elapsed = time.perf_counter() - start
+        if len(pending) >= 10 * self.batch_size:
+            print(f"⚡ 已嵌入 {len(pending)} 筆文字（{len(batches)} 個請求），{len(pending) / elapsed:.0f} 筆/秒")
+
+    def _busy_enter(self):
+        if self._active == 0:
+            self._busy_since = time.perf_counter()
+        self._active += 1
+
+    def _busy_exit(self):
+        self._active -= 1
+        if self._active == 0:
+            self.busy_seconds += time.perf_counter() - self._busy_since
+
+    @property
+    def busy(self) -> float:
+        """至少有一個請求進行中的累計秒數（包含目前進行中的時間）"""
+        if self._active:
+            return self.busy_seconds + time.perf_counter() - self._busy_since
+        return self.busy_seconds
+
+    async def _embed_batch(self, batch: List[str], futures: Dict[str, asyncio.Future]):
+        import openai
+        retryable = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    self.requests += 1
+                    resp = await self.async_client.embeddings.create(model=self.model, input=batch)
+                break
+            except retryable as e:
+                if attempt >= self.max_retries:
+                    self._fail(batch, futures, e)
+                    raise
+                delay = self._retry_after(e) or min(30.0, self.backoff * 2 ** attempt) * (0.5 + random.random())
+                attempt += 1
+                self.retries += 1
+                print(f"⏳ 嵌入請求失敗（{type(e).__name__}），{delay:.1f} 秒後第 {attempt} 次重試")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                self._fail(batch, futures, e)
+                raise
+        for text, item in zip(batch, sorted(resp.data, key=lambda d: d.index)):
+            if not futures[text].done():
+                futures[text].set_result(np.asarray(item.embedding, dtype=np.float32))
+        self.texts += len(batch)
+
+    def _fail(self, batch: List[str], futures: Dict[str, asyncio.Future], error: Exception):
+        self.failures += 1
+        for text in batch:
+            future = futures[text]
+            if not future.done():
+                future.set_exception(error)
+                # 沒有其他等待者時避免 "exception was never retrieved" 警告
+                future.exception()
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        try:
+            return float(response.headers.get("retry-after")) if response is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "concurrency": self.concurrency,
+            "texts": self.texts,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "deduplicated": self.deduplicated,
+            "texts_per_second": self.texts / self.busy if self.busy else 0.0
+        }
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    字元 n-gram 雜湊嵌入（行程內，無外部依賴）
+
+    文字正規化後加上邊界符號，取 min_n~max_n 字元的 n-gram，以 CRC32 雜湊到 dim 維
+    （另一個位元決定正負號以抵銷碰撞），權重為 1 + log(次數)，最後正規化。
+    對中文物品名稱的錯字、縮寫與部分比對效果良好，但沒有同義詞的語意。
+    """
+
+    local = True
+
+    def __init__(self, dim: int = 512, min_n: int = 1, max_n: int = 3):
+        self.model = f"{LOCAL_HASH_PREFIX}-{dim}"
+        self.dim = dim
+        self.min_n = min_n
+        self.max_n = max_n
+
+    def _ngrams(self, text: str) -> Counter:
+        text = re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip().casefold()
+        padded = f"\x02{text}\x03"
+        grams: Counter = Counter()
+        for n in range(self.min_n, self.max_n + 1):
+            for i in range(len(padded) - n + 1):
+                gram = padded[i : i + n]
+                if gram not in ("\x02", "\x03"):
+                    grams[gram] += 1
+        return grams
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for gram, count in self._ngrams(text).items():
+                h = zlib.crc32(gram.encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                out[row, h % self.dim] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1.0, norms)
+
+def create_backend(
+    model: str,
+    api_key: Optional[str] = None,
+    batch_size: int = 128,
+    concurrency: int = 8,
+    max_retries: int = 5
+) -> EmbeddingBackend:
+    """
+    依模型名稱建立嵌入後端
+
+    local-hash 或 local-hash-<維度> 使用行程內的 n-gram 雜湊；其他名稱視為 OpenAI 模型，
+    未設定 OPENAI_API_KEY 時改用行程內後端（不在匯入時中止整個服務）。
+    """
+    if model.startswith(LOCAL_HASH_PREFIX):
+        suffix = model[len(LOCAL_HASH_PREFIX):].lstrip("-")
+        return HashingEmbeddingBackend(dim=int(suffix) if suffix else 512)
+    if not api_key:
+        print(f"⚠️ 未設定 OPENAI_API_KEY，語意搜尋改用行程內的 {LOCAL_HASH_PREFIX} 嵌入")
+        return HashingEmbeddingBackend()
+    return OpenAIEmbeddingBackend(model, api_key, batch_size, concurrency, max_retries)
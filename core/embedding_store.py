@@ -0,0 +1,204 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterator, List
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+def name_hash(name: str) -> int:
+    """物品名稱的 64 位元雜湊（與行程、重啟無關）"""
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little")
+
+class EmbeddingStore:
+    """
+    本機持久化的物品向量庫
+
+    每個模型一個目錄，內含三個檔案：
+      - vectors.f32: 只附加的 float32 矩陣（每列一個已正規化的向量），以 np.memmap 讀取
+      - ids.u64: 與 vectors.f32 逐列對應的物品名稱雜湊
+      - meta.json: 模型名稱與維度
+    啟動時只需讀入 ids.u64 建立雜湊 → 列號索引，向量留在磁碟由作業系統分頁快取。
+    新物品才會呼叫嵌入函數，寫入時先附加向量、再附加 id，
+    中途中斷時以兩者較短者為準，不會讀到不完整的列。
+    多個 worker 可共用同一目錄：載入與附加都持有目錄的檔案鎖（fcntl.flock），
+    附加前先讀入其他行程新增的列，起始列號以檔案大小為準，雜湊 → 列號的對應在各行程一致。
+    沒有 fcntl 的平台只有行程內的鎖，請讓每個 worker 使用各自的 SEARCH_EMBED_DIR。
+
+    Args:
+        directory: 存放目錄（會在其下建立以模型命名的子目錄）
+        model: 嵌入模型名稱
+        dim: 向量維度
+    """
+
+    def __init__(self, directory: str, model: str, dim: int):
+        self.model = model
+        self.dim = dim
+        self.path = os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]", "_", model))
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._ids_path = os.path.join(self.path, "ids.u64")
+        self._lock_path = os.path.join(self.path, "lock")
+        self._rows: Dict[int, int] = {}
+        self._size = 0
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._lock = threading.Lock()
+        self.embedded = 0
+        self._load()
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """跨行程的目錄鎖（呼叫端需先持有 self._lock）"""
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self):
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock, self._file_lock():
+            self._load_locked()
+        print(f"📦 已載入向量庫 {self.path}（{len(self._rows)} 筆）")
+
+    def _load_locked(self):
+        meta_path = os.path.join(self.path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("dim") != self.dim:
+                raise ValueError(f"向量庫維度 {meta.get('dim')} 與模型 {self.model} 的 {self.dim} 不符: {self.path}")
+        else:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"model": self.model, "dim": self.dim}, f)
+
+        self._rows, self._size = {}, 0
+        self._catch_up()
+
+    def _catch_up(self) -> int:
+        """
+        讀入磁碟上尚未載入的列（其他行程附加的），回傳磁碟上的列數
+
+        需持有檔案鎖：此時沒有其他寫入者，長度不一致表示上次寫入中斷，截斷到完整的列。
+        """
+        vector_bytes = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        id_bytes = os.path.getsize(self._ids_path) if os.path.exists(self._ids_path) else 0
+        rows = min(vector_bytes // (4 * self.dim), id_bytes // 8)
+        if vector_bytes != rows * 4 * self.dim or id_bytes != rows * 8:
+            self._truncate(rows)
+        known = self._size
+        if rows > known:
+            ids = np.fromfile(self._ids_path, dtype=np.uint64, count=rows - known, offset=known * 8)
+            for row, h in enumerate(ids.tolist(), known):
+                self._rows.setdefault(h, row)
+        if rows != known or rows == 0:
+            self._size = rows
+            self._remap(rows)
+        return rows
+
+    def refresh(self):
+        """讀入其他行程新增的列"""
+        with self._lock, self._file_lock():
+            self._catch_up()
+
+    def _truncate(self, rows: int):
+        for path, width in ((self._vectors_path, 4 * self.dim), (self._ids_path, 8)):
+            if os.path.exists(path):
+                with open(path, "r+b") as f:
+                    f.truncate(rows * width)
+
+    def _remap(self, rows: int):
+        if rows == 0:
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+        else:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """全部向量（唯讀 memmap，形狀 (N, dim)）"""
+        return self._vectors
+
+    def rows_for(self, names: List[str], embed: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        取得物品在 vectors 中的列號，缺少的物品以 embed 計算後附加
+
+        Args:
+            names: 物品名稱
+            embed: 將名稱清單轉為 (N, dim) 向量的函數，只會收到尚未儲存的名稱
+        """
+        hashes = [name_hash(name) for name in names]
+        missing = [name for name, h in zip(names, hashes) if h not in self._rows]
+        if missing:
+            with self._lock, self._file_lock():
+                # 取得鎖後讀入其他行程的新列再檢查一次，避免重複嵌入同一批物品
+                self._catch_up()
+                pending = {}
+                for name in missing:
+                    h = name_hash(name)
+                    if h not in self._rows:
+                        pending.setdefault(h, name)
+                if pending:
+                    self._append(list(pending), embed(list(pending.values())))
+        return np.fromiter((self._rows[h] for h in hashes), dtype=np.int64, count=len(hashes))
+
+    async def arows_for(self, names: List[str], embed: Callable[[List[str]], Awaitable[np.ndarray]]) -> np.ndarray:
+        """
+        rows_for 的非同步版本：以 await embed(...) 計算缺少的物品
+
+        嵌入前先讀入其他行程新增的列；並行呼叫仍可能同時嵌入同一批物品
+        （後端會合併進行中的請求），寫入時只附加仍缺少的列。
+        等待檔案鎖與讀寫檔案都在執行緒池中進行，不阻塞事件迴圈。
+        """
+        hashes = [name_hash(name) for name in names]
+        loop = asyncio.get_running_loop()
+        if any(h not in self._rows for h in hashes):
+            await loop.run_in_executor(None, self.refresh)
+        pending: Dict[int, str] = {}
+        for name, h in zip(names, hashes):
+            if h not in self._rows:
+                pending.setdefault(h, name)
+        if pending:
+            vectors = await embed(list(pending.values()))
+            await loop.run_in_executor(None, self._append_missing, list(pending), vectors)
+        return np.fromiter((self._rows[h] for h in hashes), dtype=np.int64, count=len(hashes))
+
+    def _append_missing(self, hashes: List[int], vectors: np.ndarray):
+        """取得鎖並讀入其他行程的新列後，只附加仍缺少的列"""
+        with self._lock, self._file_lock():
+            self._catch_up()
+            keep = [i for i, h in enumerate(hashes) if h not in self._rows]
+            if keep:
+                self._append([hashes[i] for i in keep], np.asarray(vectors)[keep])
+
+    def _append(self, hashes: List[int], vectors: np.ndarray):
+        """附加新列（需持有檔案鎖且已 _catch_up，此時 _size 即磁碟上的列數）"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(hashes), self.dim):
+            raise ValueError(f"嵌入結果形狀 {vectors.shape} 與預期 {(len(hashes), self.dim)} 不符")
+        vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-8)
+        start = self._size
+        with open(self._vectors_path, "ab") as f:
+            f.write(vectors.astype(np.float32).tobytes())
+        with open(self._ids_path, "ab") as f:
+            f.write(np.asarray(hashes, dtype=np.uint64).tobytes())
+        self._rows.update((h, start + i) for i, h in enumerate(hashes))
+        self._size = start + len(hashes)
+        self._remap(self._size)
+        self.embedded += len(hashes)
+
+    def stats(self) -> Dict[str, int]:
+        return {"items": len(self._rows), "dim": self.dim, "embedded": self.embedded}
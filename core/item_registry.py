@@ -0,0 +1,112 @@
+import os
+import time
+import asyncio
+import hashlib
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+
+# 物品登錄表所在的 collection（以物品名稱為 _id，不是物品本身）
+ITEM_REGISTRY_COLLECTION = "Item-Registry"
+
+class ItemRegistry:
+    """
+    物品登錄表
+
+    取代以 list_collection_names() 推測物品：new_trade 把交易雙方的物品 upsert 到
+    Item-Registry（_id 即物品名稱，天然唯一索引），同時更新行程內的集合與排序快照。
+    讀取只回傳目前快照，不查詢 MongoDB。
+
+    物品只增不減，版本即物品數；快照內容另以雜湊作為 ETag。其他 worker 新增的物品
+    每 refresh_interval 秒以 estimated_document_count 檢查一次，數量不同才重新載入。
+
+    Args:
+        refresh_interval: 與 MongoDB 核對物品數的間隔（秒）
+    """
+
+    def __init__(self, refresh_interval: float = 30.0):
+        self.refresh_interval = refresh_interval
+        self.version = 0
+        self.etag = '"items-0"'
+        self._items: Set[str] = set()
+        self._snapshot: List[str] = []
+        self._loaded = False
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _publish(self):
+        self._snapshot = sorted(self._items)
+        self.version = len(self._snapshot)
+        digest = hashlib.blake2b("\n".join(self._snapshot).encode("utf-8"), digest_size=8).hexdigest()
+        self.etag = f'"items-{self.version}-{digest}"'
+
+    @staticmethod
+    async def _seed(db) -> List[str]:
+        """登錄表為空時，從 Trade-History 取出所有交易過的物品"""
+        pipeline = [
+            {"$project": {"items": ["$item_a", "$item_b"]}},
+            {"$unwind": "$items"},
+            {"$match": {"items": {"$ne": None}}},
+            {"$group": {"_id": "$items"}}
+        ]
+        names = [r["_id"] async for r in db["Trade-History"].aggregate(pipeline)]
+        if names:
+            now = datetime.datetime.utcnow()
+            await db[ITEM_REGISTRY_COLLECTION].bulk_write(
+                [UpdateOne({"_id": name}, {"$setOnInsert": {"first_seen": now}}, upsert=True) for name in names],
+                ordered=False
+            )
+            print(f"✅ 已從交易歷史建立物品登錄表（{len(names)} 項）")
+        return names
+
+    async def load(self, db):
+        """從 MongoDB 載入全部物品"""
+        async with self._lock:
+            names = [doc["_id"] async for doc in db[ITEM_REGISTRY_COLLECTION].find({}, {"_id": 1})]
+            if not names:
+                names = await self._seed(db)
+            self._items = set(names)
+            self._publish()
+            self._loaded = True
+            self._checked_at = time.monotonic()
+
+    async def _refresh_if_due(self, db):
+        if not self._loaded:
+            await self.load(db)
+            return
+        if time.monotonic() - self._checked_at < self.refresh_interval:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            count = await db[ITEM_REGISTRY_COLLECTION].estimated_document_count()
+            if count != len(self._items):
+                await self.load(db)
+        except Exception as e:
+            print(f"核對物品登錄表失敗: {e}")
+
+    async def register(self, db, items: Iterable[str], timestamp: Optional[datetime.datetime] = None):
+        """登錄交易中的物品，只有新物品會寫入 MongoDB"""
+        new_items = [item for item in dict.fromkeys(items) if item and item not in self._items]
+        if not new_items:
+            return
+        try:
+            now = timestamp or datetime.datetime.utcnow()
+            await db[ITEM_REGISTRY_COLLECTION].bulk_write(
+                [UpdateOne({"_id": item}, {"$setOnInsert": {"first_seen": now}}, upsert=True) for item in new_items],
+                ordered=False
+            )
+            self._items.update(new_items)
+            self._publish()
+        except Exception as e:
+            print(f"登錄物品失敗: {new_items} - {e}")
+
+    async def snapshot(self, db) -> Tuple[int, List[str]]:
+        """回傳 (版本, 排序後的物品清單)；清單為共用快照，呼叫端不應修改"""
+        await self._refresh_if_due(db)
+        return self.version, self._snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        return {"version": self.version, "items": len(self._items), "loaded": self._loaded}
+
+item_registry = ItemRegistry(refresh_interval=float(os.getenv("ITEM_REGISTRY_REFRESH_INTERVAL", "30")))
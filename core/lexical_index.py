@@ -0,0 +1,114 @@
+import bisect
+import heapq
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+from .query_vectors import normalize_query
+
+def trigrams(text: str) -> Set[str]:
+    """前補兩個、後補一個邊界符號後的字元三連字（與 pg_trgm 相同的做法）"""
+    padded = f"\x02\x02{text}\x03"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+class LexicalIndex:
+    """
+    物品名稱的字面索引（前綴 + 三連字）
+
+    名稱正規化後（NFKC、忽略大小寫、合併空白）同時放入：
+      - 排序陣列：以二分搜尋找出所有前綴相符的名稱
+      - 三連字倒排表：以共同三連字數計算 Jaccard 相似度，處理錯字與中間片段
+    分數：完全相符 1.0，前綴相符 0.9~1.0（越接近完整名稱越高），其餘為三連字相似度。
+    只支援新增（物品登錄表只增不減），寫入以鎖互斥，查詢不需加鎖。
+    """
+
+    def __init__(self):
+        self._names: List[str] = []
+        self._keys: List[str] = []
+        self._sorted: List[Tuple[str, int]] = []
+        self._grams: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._known: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._known
+
+    def add(self, names: Iterable[str]):
+        """新增物品名稱（已存在的會略過）"""
+        with self._lock:
+            added = []
+            for name in names:
+                if name in self._known:
+                    continue
+                key = normalize_query(name)
+                item_id = len(self._names)
+                grams = trigrams(key)
+                self._known.add(name)
+                self._names.append(name)
+                self._keys.append(key)
+                self._grams.append(len(grams))
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(item_id)
+                added.append((key, item_id))
+            if added:
+                # 少量新增以插入維持排序，大量時整體重排
+                if len(added) < 64:
+                    sorted_entries = list(self._sorted)
+                    for entry in added:
+                        bisect.insort(sorted_entries, entry)
+                else:
+                    sorted_entries = sorted(self._sorted + added)
+                self._sorted = sorted_entries
+
+    def _prefix(self, key: str, limit: int) -> List[int]:
+        """前綴相符的名稱中最短的 limit 個（分數越接近完整名稱越高，不依字母順序截斷）"""
+        entries = self._sorted
+        start = bisect.bisect_left(entries, (key, -1))
+        end = bisect.bisect_left(entries, (key + "\U0010ffff", -1), start)
+        if end - start <= limit:
+            return [item_id for _, item_id in entries[start:end]]
+        shortest = heapq.nsmallest(limit, entries[start:end], key=lambda entry: (len(entry[0]), entry[0]))
+        return [item_id for _, item_id in shortest]
+
+    def search(self, query: str, limit: int = 10, min_similarity: float = 0.1) -> List[Tuple[str, float]]:
+        """回傳 [(名稱, 分數)]，分數由高到低"""
+        key = normalize_query(query)
+        if not key:
+            return []
+        scores: Dict[int, float] = {}
+        for item_id in self._prefix(key, limit):
+            scores[item_id] = 1.0 if self._keys[item_id] == key else 0.9 + 0.1 * len(key) / len(self._keys[item_id])
+
+        # 前綴已足夠時（自動完成的常見情況）不必走三連字
+        if len(scores) < limit:
+            query_grams = trigrams(key)
+            postings = [self._postings.get(gram, ()) for gram in query_grams]
+            # 出現在太多名稱中的三連字（例如開頭單一字母）幾乎沒有鑑別力，只有在沒有其他可用時才計入
+            common = max(256, len(self._names) // 50)
+            selective = [p for p in postings if 0 < len(p) <= common]
+            shared: Counter = Counter()
+            for posting in selective or postings:
+                shared.update(posting)
+            candidates = shared.items()
+            exact = bool(selective) and len(selective) < len(postings)
+            if exact:
+                # 略過了常見三連字：先依部分共同數取前幾名，再以完整集合計算共同數
+                candidates = shared.most_common(4 * limit + len(scores))
+            for item_id, count in candidates:
+                if item_id in scores:
+                    continue
+                if exact:
+                    count = len(query_grams & trigrams(self._keys[item_id]))
+                similarity = count / (len(query_grams) + self._grams[item_id] - count)
+                if similarity >= min_similarity:
+                    scores[item_id] = similarity
+
+        best = sorted(scores.items(), key=lambda kv: (-kv[1], self._keys[kv[0]]))[:limit]
+        return [(self._names[item_id], score) for item_id, score in best]
+
+    def stats(self) -> Dict[str, int]:
+        return {"items": len(self._names), "trigrams": len(self._postings)}
@@ -0,0 +1,107 @@
+import time
+import fnmatch
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Tuple
+
+class LocalCache:
+    """
+    行程內 LRU 快取
+
+    以位元組數作為容量上限，每個鍵有獨立的 TTL，並可依標籤批次失效。
+    存放的是反序列化後的物件，呼叫端不應修改取得的值。
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Any, int, float, Tuple[str, ...]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """取得快取值，回傳 (是否命中, 值)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, size, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key: str, value: Any, size: int, ttl: float, tags: Iterable[str] = ()) -> bool:
+        """寫入快取值；單一條目超過容量上限時不寫入"""
+        if not self.enabled or ttl <= 0 or size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + ttl, tuple(tags))
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._remove(key)
+
+    def delete_pattern(self, pattern: str) -> int:
+        """刪除符合 glob 模式的條目"""
+        with self._lock:
+            matched = [k for k in self._entries if fnmatch.fnmatchcase(k, pattern)]
+            for k in matched:
+                self._remove(k)
+            return len(matched)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """刪除帶有任一指定標籤的條目"""
+        tags = set(tags)
+        with self._lock:
+            matched = [k for k, entry in self._entries.items() if tags.intersection(entry[3])]
+            for k in matched:
+                self._remove(k)
+            return len(matched)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[1]
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
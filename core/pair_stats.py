@@ -0,0 +1,287 @@
+import math
+import time
+import uuid
+import asyncio
+import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from .redis_client import redis_client
+
+# 匯率摘要所在的 collection（不是物品，列出物品時需排除）
+PAIR_STATS_COLLECTION = "Pair-Stats"
+# 完整重建後寫入的標記文件 _id
+BUILT_MARKER_ID = "built"
+ZERO_BUCKET = "zero"
+
+class RateSketch:
+    """
+    對數分桶的分位數草圖（DDSketch 的做法）
+
+    匯率 r 落在第 ceil(log_gamma(r)) 桶，gamma = (1 + α) / (1 - α)，
+    以桶中點估計時相對誤差不超過 α。桶只需計數，可以用 $inc 累加，
+    兩份草圖直接把計數相加即可合併。
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+
+    def bucket(self, rate: float) -> str:
+        if rate <= 0:
+            return ZERO_BUCKET
+        return str(math.ceil(math.log(rate) / self._log_gamma))
+
+    def value(self, bucket: str) -> float:
+        if bucket == ZERO_BUCKET:
+            return 0.0
+        return 2 * self.gamma ** int(bucket) / (self.gamma + 1)
+
+    @staticmethod
+    def merge(*sketches: Dict[str, int]) -> Dict[str, int]:
+        merged: Dict[str, int] = {}
+        for sketch in sketches:
+            for bucket, count in sketch.items():
+                merged[bucket] = merged.get(bucket, 0) + count
+        return merged
+
+    def quantiles(self, buckets: Dict[str, int], qs: Iterable[float]) -> Dict[str, Optional[float]]:
+        """由桶計數估計分位數，回傳 {"p50": ...} 形式"""
+        ordered = sorted(
+            buckets.items(),
+            key=lambda kv: -math.inf if kv[0] == ZERO_BUCKET else int(kv[0])
+        )
+        total = sum(count for _, count in ordered)
+        result: Dict[str, Optional[float]] = {}
+        for q in qs:
+            name = f"p{q * 100:g}"
+            if total == 0:
+                result[name] = None
+                continue
+            rank = q * (total - 1)
+            seen = 0
+            for bucket, count in ordered:
+                seen += count
+                if seen > rank:
+                    result[name] = self.value(bucket)
+                    break
+        return result
+
+class PairStats:
+    """
+    交易對的匯率摘要
+
+    每個有向交易對（item_from → item_to，匯率 = 每單位 item_from 可換得的 item_to）
+    一份文件：次數、總和、最小、最大與 RateSketch 桶計數。new_trade 以 $inc/$min/$max
+    upsert 兩個方向（新交易對會建立文件），查詢統計不必掃描交易歷史。
+
+    從交易歷史完整重建的結果才可信：重建寫入暫存 collection（含標記文件），
+    完成後以 renameCollection(dropTarget=True) 整體替換，讀取端不會看到寫到一半的摘要。
+    標記不存在時 get() 不回傳任何摘要（呼叫端退回聚合），避免部署後第一筆交易
+    產生的 count=1 摘要被當成完整歷史。start() 在背景以分散式鎖重建一次。
+
+    Args:
+        relative_accuracy: 分位數的相對誤差
+        check_interval: 重新檢查標記的間隔（秒）
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, check_interval: float = 30.0):
+        self.sketch = RateSketch(relative_accuracy)
+        self.check_interval = check_interval
+        self._indexed = False
+        self._built = False
+        self._checked_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def built(self, db) -> bool:
+        """是否已從交易歷史完整重建（每 check_interval 秒重新查詢標記，外部重建也會反映）"""
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return self._built
+        self._checked_at = time.monotonic()
+        self._built = await db[PAIR_STATS_COLLECTION].find_one({"_id": BUILT_MARKER_ID}) is not None
+        return self._built
+
+    async def _ensure_index(self, collection):
+        if self._indexed:
+            return
+        await collection.create_index([("item_from", 1), ("item_to", 1)], unique=True)
+        self._indexed = True
+
+    def _update(self, item_from: str, item_to: str, rate: float, timestamp: datetime.datetime) -> UpdateOne:
+        return UpdateOne(
+            {"item_from": item_from, "item_to": item_to},
+            {
+                "$inc": {"count": 1, "sum": rate, f"sketch.{self.sketch.bucket(rate)}": 1},
+                "$min": {"min": rate},
+                "$max": {"max": rate},
+                "$set": {"updated_at": timestamp}
+            },
+            upsert=True
+        )
+
+    @staticmethod
+    def _rates(trade: Dict[str, Any]) -> List[tuple]:
+        """一筆交易兩個方向的 (item_from, item_to, 匯率)；數量或物品缺少時為空"""
+        item_a, item_b = trade.get("item_a"), trade.get("item_b")
+        quantity_a, quantity_b = trade.get("quantity_a"), trade.get("quantity_b")
+        if not quantity_a or not quantity_b or item_a is None or item_b is None:
+            return []
+        return [(item_a, item_b, quantity_b / quantity_a), (item_b, item_a, quantity_a / quantity_b)]
+
+    @staticmethod
+    async def _bulk_upsert(collection, updates: List[UpdateOne]):
+        """兩個 worker 同時 upsert 新交易對時可能撞到唯一索引，重試一次即會更新既有文件"""
+        try:
+            await collection.bulk_write(updates, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if not errors or any(err.get("code") != 11000 for err in errors):
+                raise
+            await collection.bulk_write([updates[err["index"]] for err in errors], ordered=False)
+
+    async def record(self, db, item_a: str, quantity_a: int, item_b: str, quantity_b: int, timestamp: datetime.datetime):
+        """記錄一筆交易（兩個方向，單次 bulk_write）"""
+        rates = self._rates({"item_a": item_a, "quantity_a": quantity_a, "item_b": item_b, "quantity_b": quantity_b})
+        if not rates:
+            return
+        try:
+            collection = db[PAIR_STATS_COLLECTION]
+            await self._ensure_index(collection)
+            await self._bulk_upsert(collection, [self._update(*rate, timestamp) for rate in rates])
+        except Exception as e:
+            print(f"更新交易對匯率摘要失敗: {item_a} / {item_b} - {e}")
+
+    def summarize(self, doc: Dict[str, Any], qs: Iterable[float] = (0.5, 0.9, 0.99)) -> Dict[str, Any]:
+        """將摘要文件轉為平均、最小、最大與分位數（分位數限制在 [min, max] 內）"""
+        count = doc.get("count", 0)
+        low, high = doc.get("min", 0.0), doc.get("max", 0.0)
+        quantiles = {
+            name: min(max(value, low), high) if value is not None else None
+            for name, value in self.sketch.quantiles(doc.get("sketch", {}), qs).items()
+        }
+        return {
+            "item_from": doc.get("item_from"),
+            "item_to": doc.get("item_to"),
+            "count": count,
+            "mean": doc.get("sum", 0.0) / count if count else 0.0,
+            "min": low,
+            "max": high,
+            "quantiles": quantiles,
+            "updated_at": doc.get("updated_at")
+        }
+
+    async def get(self, db, item_from: str, partners: List[str]) -> Dict[str, Dict[str, Any]]:
+        """取得 item_from 對多個交易對象的摘要（索引查詢）；尚未完整重建時回傳空 dict"""
+        if not await self.built(db):
+            return {}
+        cursor = db[PAIR_STATS_COLLECTION].find({"item_from": item_from, "item_to": {"$in": partners}})
+        return {doc["item_to"]: doc async for doc in cursor}
+
+    @staticmethod
+    async def _latest_id(collection):
+        doc = await collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        return doc["_id"] if doc else None
+
+    async def rebuild(self, db, batch_size: int = 1000) -> int:
+        """
+        依 Trade-History 重建所有摘要，回傳交易對數
+
+        串流讀取到開始時最新的一筆交易，寫入暫存 collection 後整體替換 Pair-Stats。
+        重建期間 record() 寫入的是舊 collection（替換時丟棄），替換後再從交易歷史補上
+        這段期間的交易；替換前一刻才寫入交易歷史、替換後才 record() 的交易可能被計算兩次。
+        """
+        summaries: Dict[tuple, Dict[str, Any]] = {}
+
+        def add(item_from, item_to, rate, timestamp):
+            doc = summaries.setdefault((item_from, item_to), {
+                "count": 0, "sum": 0.0, "min": rate, "max": rate, "sketch": {}, "updated_at": timestamp
+            })
+            doc["count"] += 1
+            doc["sum"] += rate
+            doc["min"] = min(doc["min"], rate)
+            doc["max"] = max(doc["max"], rate)
+            bucket = self.sketch.bucket(rate)
+            doc["sketch"][bucket] = doc["sketch"].get(bucket, 0) + 1
+            if timestamp and (doc["updated_at"] is None or timestamp > doc["updated_at"]):
+                doc["updated_at"] = timestamp
+
+        history = db["Trade-History"]
+        projection = {"item_a": 1, "quantity_a": 1, "item_b": 1, "quantity_b": 1, "timestamp": 1}
+        scan_max = await self._latest_id(history)
+        if scan_max is not None:
+            async for trade in history.find({"_id": {"$lte": scan_max}}, projection, batch_size=batch_size):
+                for rate in self._rates(trade):
+                    add(*rate, trade.get("timestamp"))
+
+        temp = db[f"{PAIR_STATS_COLLECTION}-rebuild-{uuid.uuid4().hex[:8]}"]
+        try:
+            await temp.create_index([("item_from", 1), ("item_to", 1)], unique=True)
+            docs = [
+                {"item_from": item_from, "item_to": item_to, **summary}
+                for (item_from, item_to), summary in summaries.items()
+            ]
+            for i in range(0, len(docs), batch_size):
+                await temp.insert_many(docs[i : i + batch_size], ordered=False)
+            await temp.insert_one({"_id": BUILT_MARKER_ID, "built_at": datetime.datetime.utcnow()})
+            swap_max = await self._latest_id(history)
+            await temp.rename(PAIR_STATS_COLLECTION, dropTarget=True)
+        except BaseException:
+            await temp.drop()
+            raise
+
+        # 補上掃描之後、替換之前寫入交易歷史的交易
+        collection = db[PAIR_STATS_COLLECTION]
+        replayed = 0
+        if swap_max is not None and swap_max != scan_max:
+            window = {"$lte": swap_max} if scan_max is None else {"$gt": scan_max, "$lte": swap_max}
+            updates = []
+            async for trade in history.find({"_id": window}, projection):
+                updates.extend(self._update(*rate, trade.get("timestamp")) for rate in self._rates(trade))
+                replayed += 1
+            for i in range(0, len(updates), batch_size):
+                await self._bulk_upsert(collection, updates[i : i + batch_size])
+        self._indexed = True
+        self._built = True
+        self._checked_at = time.monotonic()
+        print(f"✅ 已重建 {len(docs)} 個交易對的匯率摘要（補上重建期間 {replayed} 筆交易）")
+        return len(docs)
+
+    async def bootstrap(self, db, lock_timeout: int = 1800):
+        """尚未建立時重建一次；跨 worker 以分散式鎖互斥，Redis 無法使用時留待下次啟動"""
+        self._checked_at = 0.0
+        if await self.built(db):
+            return
+        lock_key, token = "pair_stats:rebuild-lock", uuid.uuid4().hex
+        if not await redis_client.acquire_lock(lock_key, token, lock_timeout):
+            return
+        try:
+            self._checked_at = 0.0
+            if not await self.built(db):
+                await self.rebuild(db)
+        finally:
+            await redis_client.release_lock(lock_key, token)
+
+    async def start(self, get_database):
+        """在背景執行 bootstrap，不阻塞啟動"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(get_database))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, get_database):
+        try:
+            await self.bootstrap(await get_database())
+        except Exception as e:
+            print(f"❌ 交易對匯率摘要重建失敗: {e}")
+
+pair_stats = PairStats()
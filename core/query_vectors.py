@@ -0,0 +1,113 @@
+import re
+import asyncio
+import hashlib
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, List
+
+import numpy as np
+
+from .local_cache import LocalCache
+from .redis_client import redis_client
+
+def normalize_query(query: str) -> str:
+    """正規化查詢字串：NFKC、忽略大小寫、合併空白"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", query)).strip().casefold()
+
+class QueryVectorCache:
+    """
+    查詢向量快取
+
+    以（模型, 正規化後的查詢）為鍵，先查行程內 LRU，再查 Redis，都沒有才呼叫嵌入函數。
+    Redis 中存放原始 float32 位元組，不經過快取編解碼器。
+    同一查詢在行程內並行請求時只嵌入一次。
+
+    Args:
+        model: 嵌入模型名稱
+        dim: 向量維度
+        ttl: Redis 與行程內快取的存活時間（秒）
+        local_max_bytes: 行程內快取容量上限
+        key_prefix: Redis 鍵前綴
+    """
+
+    def __init__(
+        self,
+        model: str,
+        dim: int,
+        ttl: int = 86400,
+        local_max_bytes: int = 16 * 1024 * 1024,
+        key_prefix: str = "search:qvec"
+    ):
+        self.model = model
+        self.dim = dim
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.local = LocalCache(max_bytes=local_max_bytes)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.redis_hits = 0
+        self.embedded = 0
+
+    def key(self, query: str) -> str:
+        digest = hashlib.blake2b(normalize_query(query).encode("utf-8"), digest_size=16).hexdigest()
+        return f"{self.key_prefix}:{self.model}:{digest}"
+
+    async def get(self, query: str, embed: Callable[[List[str]], Awaitable[np.ndarray]]) -> np.ndarray:
+        """
+        取得查詢向量（形狀 (dim,)，呼叫端不應修改）
+
+        Args:
+            query: 查詢字串
+            embed: 非同步的嵌入函數，會以正規化後的查詢呼叫
+        """
+        key = self.key(query)
+        hit, vector = self.local.get(key)
+        if hit:
+            return vector
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            vector = await self._load(key, query, embed)
+            future.set_result(vector)
+            return vector
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 沒有其他等待者時避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _load(self, key: str, query: str, embed: Callable[[List[str]], Awaitable[np.ndarray]]) -> np.ndarray:
+        try:
+            raw = (await redis_client.mget([key], raw=True))[0]
+        except Exception as e:
+            print(f"讀取查詢向量快取失敗: {e}")
+            raw = None
+        if raw is not None and len(raw) == 4 * self.dim:
+            vector = np.frombuffer(raw, dtype=np.float32)
+            self.redis_hits += 1
+        else:
+            vectors = await embed([normalize_query(query)])
+            vector = np.asarray(vectors, dtype=np.float32)[0]
+            vector.setflags(write=False)
+            self.embedded += 1
+            try:
+                async with redis_client.pipeline() as batch:
+                    batch.command("set", key, vector.tobytes(), ex=self.ttl)
+            except Exception as e:
+                print(f"寫入查詢向量快取失敗: {e}")
+        self.local.set(key, vector, vector.nbytes, self.ttl)
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local": self.local.stats(),
+            "redis_hits": self.redis_hits,
+            "embedded": self.embedded
+        }
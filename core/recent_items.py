@@ -0,0 +1,142 @@
+import os
+import datetime
+from typing import Dict, List, Optional
+
+from .codecs import decode_text
+from .local_cache import LocalCache
+from .redis_client import redis_client
+
+# 只在索引已建立（標記與集合都存在）時更新；否則刪除標記，讓下一次讀取從 MongoDB 完整重建，
+# 避免 Redis 被清空或淘汰後，一筆新交易產生只有一項的集合而遮蔽整個歷史
+_RECORD_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 and redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('ZADD', KEYS[1], 'GT', ARGV[2], ARGV[1])
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -tonumber(ARGV[3]) - 1)
+    return 1
+end
+redis.call('DEL', KEYS[2])
+return 0
+"""
+
+class RecentItemsIndex:
+    """
+    使用者最近交易物品索引
+
+    每位使用者一個 Redis 有序集合（成員為物品、分數為最後交易時間），
+    new_trade 寫入時更新並修剪到 cap 筆，查詢只需一次 ZREVRANGE。
+    重建時另外寫入一個「已建立」標記鍵；標記不存在（從未重建、Redis 被清空或淘汰）時
+    從 MongoDB 以聚合重建，不會把只有新交易的集合當成完整結果。
+    Redis 無法使用時，重建結果在行程內保留 fallback_ttl 秒，不必每個請求都聚合。
+
+    Args:
+        cap: 每位使用者保留的物品數上限
+        key_prefix: Redis 鍵前綴
+        fallback_ttl: Redis 無法使用時行程內結果的存活時間（秒）
+    """
+
+    def __init__(self, cap: int = 100, key_prefix: str = "trade:recent", fallback_ttl: int = 30):
+        self.cap = cap
+        self.key_prefix = key_prefix
+        self.fallback_ttl = fallback_ttl
+        self._local = LocalCache(max_bytes=4 * 1024 * 1024)
+
+    def key(self, user: str) -> str:
+        return f"{self.key_prefix}:{user}"
+
+    def built_key(self, user: str) -> str:
+        return f"{self.key_prefix}-built:{user}"
+
+    @staticmethod
+    def _score(timestamp: Optional[datetime.datetime]) -> float:
+        if timestamp is None:
+            return 0.0
+        if timestamp.tzinfo is None:
+            # MongoDB 取回的時間為 naive UTC
+            timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+        return timestamp.timestamp()
+
+    async def record(self, user: str, item: str, timestamp: datetime.datetime):
+        """記錄一筆交易（只在時間較新時更新分數），並修剪超過上限的舊物品；索引未建立時只清除標記"""
+        self._local.delete(user)
+        try:
+            await redis_client.eval(
+                _RECORD_SCRIPT, [self.key(user), self.built_key(user)], [item, self._score(timestamp), self.cap]
+            )
+        except Exception as e:
+            print(f"更新最近交易物品失敗: {user} - {e}")
+
+    async def get(self, user: str, limit: int = -1) -> Optional[List[str]]:
+        """
+        依最後交易時間由新到舊取得物品；索引尚未建立（或已被清除）時回傳 None
+
+        標記存在但集合不存在（集合被單獨淘汰，或使用者沒有任何交易）也視為未建立，
+        由呼叫端重建；沒有交易的使用者重建時只是一次空的聚合。
+        """
+        stop = min(limit, self.cap) - 1 if limit > 0 else -1
+        async with redis_client.pipeline() as batch:
+            batch.command("exists", self.built_key(user))
+            batch.command("exists", self.key(user))
+            batch.command("zrevrange", self.key(user), 0, stop)
+        built, exists, members = batch.results
+        if not built or not exists:
+            return None
+        return [decode_text(m) for m in members or []]
+
+    async def items(self, db, user: str, limit: int = -1) -> List[str]:
+        """取得最近交易物品，索引不存在時從 MongoDB 重建"""
+        if not redis_client.available:
+            hit, items = self._local.get(user)
+            if hit:
+                return items[:limit] if limit > 0 else items
+        items = await self.get(user, limit)
+        if items is None:
+            items = await self.rebuild_user(db, user)
+            if not redis_client.available:
+                self._local.set(user, items, 64 + sum(len(i) for i in items), self.fallback_ttl)
+            if limit > 0:
+                items = items[:limit]
+        return items
+
+    def _queue_write(self, batch, user: str, items: Dict[str, float]):
+        batch.delete(self.key(user))
+        if items:
+            batch.zadd(self.key(user), items)
+            batch.zremrangebyrank(self.key(user), 0, -self.cap - 1)
+        batch.set(self.built_key(user), 1)
+
+    async def rebuild_user(self, db, user: str) -> List[str]:
+        """從使用者的交易集合重建索引，回傳由新到舊的物品"""
+        pipeline = [
+            {"$group": {"_id": "$item_a", "last": {"$max": "$timestamp"}}},
+            {"$match": {"_id": {"$ne": None}}},
+            {"$sort": {"last": -1}},
+            {"$limit": self.cap}
+        ]
+        results = await db[user].aggregate(pipeline).to_list(length=None)
+        items = {r["_id"]: self._score(r["last"]) for r in results}
+        async with redis_client.pipeline() as batch:
+            self._queue_write(batch, user, items)
+        return [r["_id"] for r in results]
+
+    async def rebuild_all(self, db, batch_size: int = 100) -> int:
+        """從 Trade-History 一次重建所有使用者的索引（每 batch_size 位使用者一次往返），回傳使用者數"""
+        pipeline = [
+            {"$group": {
+                "_id": {"user": "$user_a", "item": "$item_a"},
+                "last": {"$max": "$timestamp"}
+            }},
+            {"$match": {"_id.user": {"$ne": None}, "_id.item": {"$ne": None}}}
+        ]
+        per_user: Dict[str, Dict[str, float]] = {}
+        async for result in db["Trade-History"].aggregate(pipeline):
+            user, item = result["_id"]["user"], result["_id"]["item"]
+            per_user.setdefault(user, {})[item] = self._score(result["last"])
+        users = list(per_user.items())
+        for i in range(0, len(users), batch_size):
+            async with redis_client.pipeline() as batch:
+                for user, items in users[i : i + batch_size]:
+                    self._queue_write(batch, user, items)
+        print(f"✅ 已重建 {len(per_user)} 位使用者的最近交易物品索引")
+        return len(per_user)
+
+recent_items_index = RecentItemsIndex(cap=int(os.getenv("RECENT_ITEMS_CAP", "100")))
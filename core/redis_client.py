@@ -1,13 +1,32 @@
 import os
 import json
+import time
 import asyncio
-from typing import Any, Optional, Union, Dict, List
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Union, Dict, Iterator, List, Tuple
 from datetime import timedelta, datetime
 import redis.asyncio as redis
+import redis as sync_redis
 from dotenv import load_dotenv
 
+from .codecs import Codec, CodecError, codec_from_env, decode_text
+from .local_cache import LocalCache
+
 load_dotenv()
 
+# 只有持有者（token 相符）才能釋放鎖
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
 class DateTimeEncoder(json.JSONEncoder):
     """自定義 JSON 編碼器，處理 datetime 物件"""
     def default(self, obj):
@@ -17,24 +36,377 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.__dict__
         return super().default(obj)
 
+def _seconds(expire: Optional[Union[int, timedelta]]) -> Optional[int]:
+    if isinstance(expire, timedelta):
+        return int(expire.total_seconds())
+    return expire
+
+class CircuitBreaker:
+    """
+    Redis 斷路器
+    
+    連續失敗達 failure_threshold 次後開啟，開啟期間所有指令直接走備援、不嘗試連線；
+    經過 reset_timeout 秒進入半開，只放行一個探測請求，成功即關閉，失敗則重新開啟。
+    
+    Args:
+        failure_threshold: 開啟斷路器所需的連續失敗次數
+        reset_timeout: 開啟後多久允許探測（秒）
+    """
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return BREAKER_CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return BREAKER_HALF_OPEN
+        return BREAKER_OPEN
+    
+    def allow(self) -> bool:
+        """是否可以嘗試 Redis；半開時只放行一個探測請求"""
+        with self._lock:
+            state = self.state
+            if state == BREAKER_CLOSED:
+                return True
+            if state == BREAKER_HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                print("✅ Redis 已恢復，斷路器關閉")
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    print(f"⚠️ Redis 連續失敗 {self.failures} 次，斷路器開啟，改用行程內備援快取")
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+            self._probing = False
+    
+    def trip(self):
+        """立即開啟斷路器（例如啟動時就連不上 Redis）"""
+        with self._lock:
+            if self.opened_at is None:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+            self._probing = False
+    
+    def abort(self):
+        """請求在完成前被取消：釋放探測名額，不計入成敗"""
+        with self._lock:
+            self._probing = False
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout
+        }
+
+class FallbackStore:
+    """
+    Redis 無法使用時的行程內備援
+    
+    以 LocalCache 存放已編碼的值（與 Redis 內容相同的 bytes），容量有上限。
+    備援期間的遞增與刪除會被記下，Redis 恢復後補送，
+    讓失效標籤的世代與被刪除的鍵不會因為斷線而遺失。
+    
+    Args:
+        max_bytes: 容量上限（位元組）
+        default_ttl: 沒有指定過期時間的值在備援中保留的秒數
+    """
+    
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, default_ttl: int = 300):
+        self.store = LocalCache(max_bytes)
+        self.default_ttl = default_ttl
+        self.pending_incr: Dict[str, int] = {}
+        self.pending_delete: set = set()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[bytes]:
+        _, value = self.store.get(key)
+        return value
+    
+    def set(self, key: str, value: Union[bytes, str], ex: Optional[int] = None, nx: bool = False) -> bool:
+        if nx and self.exists(key):
+            return False
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        return self.store.set(key, value, len(value), ex or self.default_ttl)
+    
+    def exists(self, key: str) -> bool:
+        found, _ = self.store.get(key)
+        return found
+    
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            try:
+                value = int(self.get(key) or 0) + amount
+            except ValueError:
+                value = amount
+            self.set(key, str(value))
+            self.pending_incr[key] = self.pending_incr.get(key, 0) + amount
+            return value
+    
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            self.pending_delete.update(keys)
+        return sum(1 for k in keys if self.store.delete(k))
+    
+    def run(self, name: str, args: tuple, kwargs: dict) -> Any:
+        """以備援執行批次中的單一指令；不支援的指令回傳 None"""
+        if name == "get":
+            return self.get(args[0])
+        if name == "set":
+            return self.set(args[0], args[1], ex=kwargs.get("ex"), nx=kwargs.get("nx", False))
+        if name == "setex":
+            return self.set(args[0], args[2], ex=_seconds(args[1]))
+        if name in ("delete", "unlink"):
+            return self.delete(*args)
+        if name == "incr":
+            return self.incr(args[0], args[1] if len(args) > 1 else kwargs.get("amount", 1))
+        return None
+    
+    def drain_pending(self) -> Tuple[Dict[str, int], List[str]]:
+        with self._lock:
+            incrs, deletes = self.pending_incr, list(self.pending_delete)
+            self.pending_incr, self.pending_delete = {}, set()
+            return incrs, deletes
+    
+    def restore_pending(self, incrs: Dict[str, int], deletes: List[str]):
+        with self._lock:
+            for key, amount in incrs.items():
+                self.pending_incr[key] = self.pending_incr.get(key, 0) + amount
+            self.pending_delete.update(deletes)
+    
+    @property
+    def has_pending(self) -> bool:
+        return bool(self.pending_incr or self.pending_delete)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.store.stats(),
+            "pending_incr": len(self.pending_incr),
+            "pending_delete": len(self.pending_delete)
+        }
+
+class RedisBatch:
+    """
+    批次指令
+    
+    累積的指令在 execute() 時以單次往返送出；值的編碼與解碼與 RedisClient 相同。
+    透過 RedisClient.pipeline() 取得，離開 context 時自動執行，結果存於 results。
+    斷路器開啟時整批改由行程內備援執行。
+    """
+    
+    def __init__(self, client: "RedisClient", transaction: bool = False):
+        self._client = client
+        self._transaction = transaction
+        self._ops: List[Tuple[str, tuple, dict, Callable[[Any], Any]]] = []
+        self.results: List[Any] = []
+    
+    def __len__(self) -> int:
+        return len(self._ops)
+    
+    def _queue(self, decoder: Callable[[Any], Any], name: str, *args, **kwargs) -> "RedisBatch":
+        self._ops.append((name, args, kwargs, decoder))
+        return self
+    
+    def get(self, key: str) -> "RedisBatch":
+        return self._queue(self._client.decode_value, "get", key)
+    
+    def set(
+        self,
+        key: str,
+        value: Any,
+        expire: Optional[Union[int, timedelta]] = None,
+        nx: bool = False
+    ) -> "RedisBatch":
+        return self._queue(
+            bool, "set", key, self._client.encode_value(value), ex=_seconds(expire) or None, nx=nx
+        )
+    
+    def delete(self, *keys: str) -> "RedisBatch":
+        return self._queue(int, "delete", *keys)
+    
+    def unlink(self, *keys: str) -> "RedisBatch":
+        return self._queue(int, "unlink", *keys)
+    
+    def incr(self, key: str, amount: int = 1) -> "RedisBatch":
+        return self._queue(int, "incr", key, amount)
+    
+    def zadd(self, key: str, mapping: Dict[str, float], gt: bool = False) -> "RedisBatch":
+        return self._queue(int, "zadd", key, mapping, gt=gt)
+    
+    def zincrby(self, key: str, amount: float, member: str) -> "RedisBatch":
+        return self._queue(float, "zincrby", key, amount, member)
+    
+    def zremrangebyrank(self, key: str, start: int, stop: int) -> "RedisBatch":
+        return self._queue(int, "zremrangebyrank", key, start, stop)
+    
+    def expire(self, key: str, seconds: int) -> "RedisBatch":
+        return self._queue(bool, "expire", key, seconds)
+    
+    def publish(self, channel: str, message: Any) -> "RedisBatch":
+        if isinstance(message, (dict, list)):
+            message = json.dumps(message, ensure_ascii=False, cls=DateTimeEncoder)
+        return self._queue(int, "publish", channel, message)
+    
+    def command(self, name: str, *args, **kwargs) -> "RedisBatch":
+        """加入其他原始指令，結果不經解碼"""
+        return self._queue(lambda value: value, name, *args, **kwargs)
+    
+    async def execute(self) -> List[Any]:
+        if not self._ops:
+            return []
+        ops, self._ops = self._ops, []
+        
+        async def send():
+            async with self._client.redis.pipeline(transaction=self._transaction) as pipe:
+                for name, args, kwargs, _ in ops:
+                    getattr(pipe, name)(*args, **kwargs)
+                return await pipe.execute(raise_on_error=False)
+        
+        raw = await self._client._execute(
+            "PIPELINE", send,
+            lambda: [self._client.fallback.run(name, args, kwargs) for name, args, kwargs, _ in ops]
+        )
+        self.results = [
+            None if value is None or isinstance(value, Exception) else decoder(value)
+            for (_, _, _, decoder), value in zip(ops, raw)
+        ]
+        return self.results
+
 class RedisClient:
-    """Redis 客戶端管理類別"""
+    """
+    Redis 客戶端管理類別
+    
+    所有指令都經過斷路器：Redis 連續失敗後直接改用行程內備援（FallbackStore），
+    不再讓每個請求都等待連線或逾時；恢復後自動切回 Redis。
+    逾時與斷路器參數可由環境變數 REDIS_SOCKET_TIMEOUT、REDIS_CONNECT_TIMEOUT、
+    REDIS_BREAKER_FAILURES、REDIS_BREAKER_RESET、REDIS_FALLBACK_MAX_BYTES 調整。
+    """
     
-    def __init__(self):
+    def __init__(self, codec: Optional[Codec] = None):
         self.redis: Optional[redis.Redis] = None
         self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+        self.codec = codec or codec_from_env()
+        self.socket_timeout = float(os.getenv("REDIS_SOCKET_TIMEOUT", "1.0"))
+        self.connect_timeout = float(os.getenv("REDIS_CONNECT_TIMEOUT", "1.0"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("REDIS_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("REDIS_BREAKER_RESET", "10"))
+        )
+        self.fallback = FallbackStore(
+            max_bytes=int(os.getenv("REDIS_FALLBACK_MAX_BYTES", str(16 * 1024 * 1024)))
+        )
+        self._sync_redis: Optional[sync_redis.Redis] = None
+        self._sync_lock = threading.Lock()
+    
+    def _connection_options(self) -> Dict[str, Any]:
+        """同步與非同步客戶端共用的連線設定"""
+        return {
+            "encoding": "utf-8",
+            "decode_responses": False,
+            "retry_on_timeout": True,
+            "socket_timeout": self.socket_timeout,
+            "socket_connect_timeout": self.connect_timeout,
+            "socket_keepalive": True,
+            "socket_keepalive_options": {}
+        }
+    
+    def encode_value(self, value: Any) -> Union[bytes, str]:
+        """
+        序列化快取值
+        
+        整數維持原始文字，讓 INCR 等原子操作可以直接作用在同一個鍵上；
+        其他值交給編解碼器（標頭位元組記錄格式）。
+        """
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value)
+        return self.codec.encode(value)
+    
+    def decode_value(self, value: Any) -> Optional[Any]:
+        """反序列化快取值（相容各種格式與舊版 JSON 文字）"""
+        try:
+            return self.codec.decode(value)
+        except CodecError as e:
+            print(f"Redis 解碼錯誤: {e}")
+            return None
+    
+    @property
+    def available(self) -> bool:
+        """斷路器未開啟（關閉或可探測）"""
+        return self.breaker.state != BREAKER_OPEN
+    
+    async def _execute(self, op: str, command: Callable[[], Awaitable[Any]], fallback: Callable[[], Any]) -> Any:
+        """
+        經斷路器執行 Redis 指令
         
+        斷路器開啟時不連線、直接回傳 fallback()；指令失敗時記錄失敗並同樣回傳 fallback()。
+        """
+        if not self.breaker.allow():
+            return fallback()
+        try:
+            if not self.redis:
+                await self.connect()
+            if self.fallback.has_pending:
+                # 先補送失效，避免恢復後第一個讀取拿到斷線期間已失效的條目
+                await self._replay_pending()
+            result = await command()
+        except asyncio.CancelledError:
+            self.breaker.abort()
+            raise
+        except Exception as e:
+            self.breaker.record_failure()
+            print(f"Redis {op} 錯誤: {e}")
+            return fallback()
+        self.breaker.record_success()
+        return result
+    
+    async def _replay_pending(self):
+        """補送備援期間的遞增與刪除並清空備援內容；失敗時保留待補送項目並往外拋"""
+        incrs, deletes = self.fallback.drain_pending()
+        if not (incrs or deletes):
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, amount in incrs.items():
+                    pipe.incr(key, amount)
+                if deletes:
+                    pipe.unlink(*deletes)
+                await pipe.execute()
+        except BaseException:
+            self.fallback.restore_pending(incrs, deletes)
+            raise
+        self.fallback.store.clear()
+        print(f"🔁 已補送備援期間的 {len(incrs)} 個遞增、{len(deletes)} 個刪除")
+    
     async def connect(self):
         """建立 Redis 連線"""
         try:
-            self.redis = redis.from_url(
-                self.redis_url,
-                encoding="utf-8",
-                decode_responses=True,
-                retry_on_timeout=True,
-                socket_keepalive=True,
-                socket_keepalive_options={}
-            )
+            self.redis = redis.from_url(self.redis_url, **self._connection_options())
             # 測試連線
             await self.redis.ping()
             print("✅ 成功連接到 Redis!")
@@ -42,170 +414,316 @@ class RedisClient:
             print(f"❌ Redis 連線失敗: {e}")
             raise
     
+    def get_sync_client(self) -> sync_redis.Redis:
+        """
+        取得同步客戶端
+        
+        第一次呼叫時才建立，所有執行緒共用同一個連線池，
+        同步快取路徑不必每次都建立新的 TCP 連線。
+        """
+        if self._sync_redis is None:
+            with self._sync_lock:
+                if self._sync_redis is None:
+                    pool = sync_redis.ConnectionPool.from_url(self.redis_url, **self._connection_options())
+                    self._sync_redis = sync_redis.Redis(connection_pool=pool)
+        return self._sync_redis
+    
+    @contextmanager
+    def sync_session(self) -> Iterator[Optional[sync_redis.Redis]]:
+        """
+        同步路徑的斷路器保護
+        
+        斷路器開啟時產生 None（呼叫端應略過 Redis）；區塊內的例外會計為失敗後往外拋。
+        """
+        if not self.breaker.allow():
+            yield None
+            return
+        try:
+            yield self.get_sync_client()
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.abort()
+            raise
+        self.breaker.record_success()
+    
     async def disconnect(self):
         """關閉 Redis 連線"""
         if self.redis:
             await self.redis.close()
             print("🔌 已斷開 Redis 連線")
+        with self._sync_lock:
+            if self._sync_redis is not None:
+                self._sync_redis.close()
+                self._sync_redis.connection_pool.disconnect()
+                self._sync_redis = None
+    
+    def health(self) -> Dict[str, Any]:
+        """斷路器與備援快取的狀態"""
+        return {
+            "breaker": self.breaker.stats(),
+            "fallback": self.fallback.stats()
+        }
     
     async def set(
         self, 
         key: str, 
         value: Any, 
-        expire: Optional[Union[int, timedelta]] = None
+        expire: Optional[Union[int, timedelta]] = None,
+        nx: bool = False
     ) -> bool:
-        """設定快取值"""
-        if not self.redis:
-            await self.connect()
-        
+        """設定快取值（nx=True 時僅在鍵不存在時寫入）"""
         try:
-            # 將值序列化為 JSON
-            if isinstance(value, (dict, list)):
-                serialized_value = json.dumps(value, ensure_ascii=False, cls=DateTimeEncoder)
-            else:
-                serialized_value = str(value)
-            
-            if expire:
-                if isinstance(expire, timedelta):
-                    expire = int(expire.total_seconds())
-                return await self.redis.setex(key, expire, serialized_value)
-            else:
-                return await self.redis.set(key, serialized_value)
-        except Exception as e:
+            serialized_value = self.encode_value(value)
+        except CodecError as e:
             print(f"Redis SET 錯誤: {e}")
             return False
+        expire = _seconds(expire)
+        
+        async def command():
+            if nx:
+                return bool(await self.redis.set(key, serialized_value, ex=expire or None, nx=True))
+            if expire:
+                return await self.redis.setex(key, expire, serialized_value)
+            return await self.redis.set(key, serialized_value)
+        
+        return await self._execute(
+            "SET", command,
+            lambda: self.fallback.set(key, serialized_value, ex=expire or None, nx=nx)
+        )
     
     async def get(self, key: str) -> Optional[Any]:
         """取得快取值"""
-        if not self.redis:
-            await self.connect()
+        raw = await self._execute(
+            "GET", lambda: self.redis.get(key), lambda: self.fallback.get(key)
+        )
+        return self.decode_value(raw)
+    
+    async def mget(self, keys: List[str], raw: bool = False) -> List[Optional[Any]]:
+        """一次取得多個快取值（單次往返）；raw=True 時回傳未解碼的 bytes"""
+        if not keys:
+            return []
+        values = await self._execute(
+            "MGET", lambda: self.redis.mget(keys),
+            lambda: [self.fallback.get(k) for k in keys]
+        )
+        if raw:
+            return values
+        return [self.decode_value(value) for value in values]
+    
+    async def mset(
+        self,
+        mapping: Dict[str, Any],
+        expire: Optional[Union[int, timedelta, Dict[str, Union[int, timedelta]]]] = None
+    ) -> bool:
+        """
+        一次設定多個快取值（單次往返）
+        
+        Args:
+            mapping: 鍵值對
+            expire: 所有鍵共用的過期時間，或以鍵為索引的個別過期時間
+        """
+        if not mapping:
+            return True
         
         try:
-            value = await self.redis.get(key)
-            if value is None:
-                return None
-            
-            # 嘗試反序列化 JSON
-            try:
-                return json.loads(value)
-            except (json.JSONDecodeError, TypeError):
-                return value
+            async with self.pipeline() as batch:
+                for k, v in mapping.items():
+                    ttl = expire.get(k) if isinstance(expire, dict) else expire
+                    batch.set(k, v, expire=ttl)
+            return all(batch.results) and len(batch.results) == len(mapping)
         except Exception as e:
-            print(f"Redis GET 錯誤: {e}")
-            return None
+            print(f"Redis MSET 錯誤: {e}")
+            return False
+    
+    async def delete_many(self, keys: List[str], chunk_size: int = 1000) -> int:
+        """一次刪除多個鍵（依 chunk_size 分段，全部在同一次往返送出），回傳刪除數量"""
+        if not keys:
+            return 0
+        
+        async with self.pipeline() as batch:
+            for i in range(0, len(keys), chunk_size):
+                batch.delete(*keys[i : i + chunk_size])
+        return sum(r or 0 for r in batch.results)
+    
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = False):
+        """
+        批次指令的 context manager
+        
+        Example:
+            async with redis_client.pipeline() as batch:
+                batch.set("a", 1, expire=60).incr("counter")
+            print(batch.results)
+        
+        transaction=True 時以 MULTI/EXEC 原子執行。
+        """
+        batch = RedisBatch(self, transaction=transaction)
+        yield batch
+        await batch.execute()
+    
+    async def incr(self, key: str, amount: int = 1) -> Optional[int]:
+        """原子遞增計數器"""
+        return await self._execute(
+            "INCR", lambda: self.redis.incr(key, amount),
+            lambda: self.fallback.incr(key, amount)
+        )
     
     async def delete(self, key: str) -> bool:
         """刪除快取"""
-        if not self.redis:
-            await self.connect()
-        
-        try:
-            result = await self.redis.delete(key)
-            return result > 0
-        except Exception as e:
-            print(f"Redis DELETE 錯誤: {e}")
-            return False
+        result = await self._execute(
+            "DELETE", lambda: self.redis.delete(key), lambda: self.fallback.delete(key)
+        )
+        return result > 0
     
     async def exists(self, key: str) -> bool:
         """檢查鍵是否存在"""
-        if not self.redis:
-            await self.connect()
-        
-        try:
-            return await self.redis.exists(key) > 0
-        except Exception as e:
-            print(f"Redis EXISTS 錯誤: {e}")
-            return False
+        result = await self._execute(
+            "EXISTS", lambda: self.redis.exists(key), lambda: int(self.fallback.exists(key))
+        )
+        return result > 0
     
     async def expire(self, key: str, seconds: int) -> bool:
         """設定過期時間"""
-        if not self.redis:
-            await self.connect()
+        return await self._execute(
+            "EXPIRE", lambda: self.redis.expire(key, seconds), lambda: False
+        )
+    
+    async def acquire_lock(self, key: str, token: str, timeout: int) -> Optional[bool]:
+        """
+        嘗試取得分散式鎖
         
-        try:
-            return await self.redis.expire(key, seconds)
-        except Exception as e:
-            print(f"Redis EXPIRE 錯誤: {e}")
-            return False
+        Returns:
+            True 取得鎖、False 鎖已被持有、None 表示 Redis 無法使用
+        """
+        async def command():
+            return bool(await self.redis.set(key, token, ex=timeout, nx=True))
+        
+        return await self._execute("LOCK", command, lambda: None)
     
-    async def keys(self, pattern: str = "*") -> List[str]:
-        """取得符合模式的鍵列表"""
+    async def release_lock(self, key: str, token: str) -> bool:
+        """釋放分散式鎖（僅限持有者）"""
+        async def command():
+            return bool(await self.redis.eval(_RELEASE_LOCK_SCRIPT, 1, key, token))
+        
+        return await self._execute("UNLOCK", command, lambda: False)
+    
+    async def eval(self, script: str, keys: List[str], args: List[Any], default: Any = None) -> Any:
+        """執行 Lua 腳本；Redis 無法使用時回傳 default"""
+        return await self._execute(
+            "EVAL", lambda: self.redis.eval(script, len(keys), *keys, *args), lambda: default
+        )
+    
+    async def publish(self, channel: str, message: Any) -> int:
+        """發佈訊息到頻道，回傳收到訊息的訂閱者數量"""
+        if isinstance(message, (dict, list)):
+            message = json.dumps(message, ensure_ascii=False, cls=DateTimeEncoder)
+        return await self._execute(
+            "PUBLISH", lambda: self.redis.publish(channel, message), lambda: 0
+        )
+    
+    async def pubsub(self):
+        """建立新的 Pub/Sub 物件（使用獨立連線）；斷路器開啟時拋出 ConnectionError"""
+        if not self.available:
+            raise ConnectionError("Redis 斷路器開啟中")
         if not self.redis:
             await self.connect()
+        return self.redis.pubsub(ignore_subscribe_messages=True)
+    
+    async def keys(self, pattern: str = "*") -> List[str]:
+        """取得符合模式的鍵列表（KEYS 會阻塞伺服器，大量鍵時請改用 scan / scan_iter）"""
+        keys = await self._execute("KEYS", lambda: self.redis.keys(pattern), lambda: [])
+        return [decode_text(k) for k in keys]
+    
+    async def scan(self, cursor: int = 0, match: str = "*", count: int = 100) -> Tuple[int, List[str]]:
+        """
+        以 SCAN 分頁取得鍵（不會像 KEYS 一樣阻塞伺服器）
         
-        try:
-            return await self.redis.keys(pattern)
-        except Exception as e:
-            print(f"Redis KEYS 錯誤: {e}")
-            return []
+        Returns:
+            (下一頁游標, 本頁的鍵)；游標為 0 表示已走完
+        """
+        next_cursor, keys = await self._execute(
+            "SCAN", lambda: self.redis.scan(cursor=cursor, match=match, count=count),
+            lambda: (0, [])
+        )
+        return int(next_cursor), [decode_text(k) for k in keys]
+    
+    async def scan_iter(self, match: str = "*", count: int = 500) -> AsyncIterator[str]:
+        """逐一產生符合模式的鍵（內部以 SCAN 分批取得）"""
+        cursor = 0
+        while True:
+            cursor, keys = await self.scan(cursor, match=match, count=count)
+            for k in keys:
+                yield k
+            if cursor == 0:
+                break
+    
+    async def dbsize(self) -> int:
+        """取得目前資料庫的鍵總數（O(1)）"""
+        return await self._execute("DBSIZE", lambda: self.redis.dbsize(), lambda: 0)
+    
+    async def unlink_many(self, keys: List[str], chunk_size: int = 500) -> int:
+        """以 UNLINK 批次刪除（記憶體在背景回收），回傳刪除數量"""
+        if not keys:
+            return 0
+        
+        async with self.pipeline() as batch:
+            for i in range(0, len(keys), chunk_size):
+                batch.unlink(*keys[i : i + chunk_size])
+        return sum(r or 0 for r in batch.results)
     
     async def flushdb(self) -> bool:
-        """清空當前資料庫"""
-        if not self.redis:
-            await self.connect()
+        """清空當前資料庫（備援快取一併清空）"""
+        self.fallback.store.clear()
         
-        try:
+        async def command():
             await self.redis.flushdb()
             return True
-        except Exception as e:
-            print(f"Redis FLUSHDB 錯誤: {e}")
-            return False
+        
+        return await self._execute("FLUSHDB", command, lambda: False)
+    
+    async def zadd(self, key: str, mapping: Dict[str, float], gt: bool = False) -> int:
+        """加入有序集合成員（gt=True 時只在新分數較大時更新）"""
+        if not mapping:
+            return 0
+        return await self._execute(
+            "ZADD", lambda: self.redis.zadd(key, mapping, gt=gt), lambda: 0
+        )
+    
+    async def zrevrange(self, key: str, start: int, stop: int, withscores: bool = False) -> List[Any]:
+        """依分數由高到低取得有序集合成員（成員名稱已解碼為 str）"""
+        members = await self._execute(
+            "ZREVRANGE", lambda: self.redis.zrevrange(key, start, stop, withscores=withscores),
+            lambda: []
+        )
+        if withscores:
+            return [(decode_text(m), score) for m, score in members]
+        return [decode_text(m) for m in members]
+    
+    async def zremrangebyrank(self, key: str, start: int, stop: int) -> int:
+        """依排名刪除有序集合成員"""
+        return await self._execute(
+            "ZREMRANGEBYRANK", lambda: self.redis.zremrangebyrank(key, start, stop), lambda: 0
+        )
     
     async def hset(self, name: str, mapping: Dict[str, Any]) -> int:
-        """設定雜湊表"""
-        if not self.redis:
-            await self.connect()
+        """設定雜湊表（值與 set 相同經編解碼器序列化，hget 才能還原型別）"""
+        serialized_mapping = {k: self.encode_value(v) for k, v in mapping.items()}
         
-        try:
-            # 序列化值
-            serialized_mapping = {}
-            for k, v in mapping.items():
-                if isinstance(v, (dict, list)):
-                    serialized_mapping[k] = json.dumps(v, ensure_ascii=False, cls=DateTimeEncoder)
-                else:
-                    serialized_mapping[k] = str(v)
-            
-            return await self.redis.hset(name, mapping=serialized_mapping)
-        except Exception as e:
-            print(f"Redis HSET 錯誤: {e}")
-            return 0
+        return await self._execute(
+            "HSET", lambda: self.redis.hset(name, mapping=serialized_mapping), lambda: 0
+        )
     
     async def hget(self, name: str, key: str) -> Optional[Any]:
         """取得雜湊表值"""
-        if not self.redis:
-            await self.connect()
-        
-        try:
-            value = await self.redis.hget(name, key)
-            if value is None:
-                return None
-            
-            # 嘗試反序列化 JSON
-            try:
-                return json.loads(value)
-            except (json.JSONDecodeError, TypeError):
-                return value
-        except Exception as e:
-            print(f"Redis HGET 錯誤: {e}")
-            return None
+        raw = await self._execute("HGET", lambda: self.redis.hget(name, key), lambda: None)
+        return self.decode_value(raw)
     
     async def hgetall(self, name: str) -> Dict[str, Any]:
         """取得所有雜湊表值"""
-        if not self.redis:
-            await self.connect()
-        
-        try:
-            data = await self.redis.hgetall(name)
-            result = {}
-            for k, v in data.items():
-                try:
-                    result[k] = json.loads(v)
-                except (json.JSONDecodeError, TypeError):
-                    result[k] = v
-            return result
-        except Exception as e:
-            print(f"Redis HGETALL 錯誤: {e}")
-            return {}
+        data = await self._execute("HGETALL", lambda: self.redis.hgetall(name), lambda: {})
+        return {decode_text(k): self.decode_value(v) for k, v in data.items()}
 
 # 全域 Redis 實例
 redis_client = RedisClient()
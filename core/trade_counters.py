@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .redis_client import redis_client
+from .codecs import decode_text
+
+class TradeCounters:
+    """
+    交易次數計數器
+
+    以 Redis 有序集合維護三種排名，new_trade 每筆交易以 ZINCRBY 更新：
+      - pairs: 交易對（字典序較小者在前）→ 次數
+      - items: 物品 → 出現次數（交易雙方各計一次）
+      - partners:<item>: 與該物品交易過的物品 → 次數
+    Top-N 查詢只需一次 ZREVRANGE。計數可能因寫入失敗或 Redis 被清空而偏移，
+    由 reconcile() 定期以 MongoDB 的 Trade-History 核對並修正。
+
+    reconcile() 完成時寫入「已建立」標記（值為完成時間）。標記不存在（從未核對、
+    快取被清除或淘汰）時 top_* 回傳 None，呼叫端退回聚合並以 request_reconcile() 排程核對，
+    不會把清除後只累積了幾筆的計數當成正確結果。
+    核對以分散式鎖互斥；各 worker 只在標記缺少或超過 interval 時才核對。
+
+    Args:
+        key_prefix: Redis 鍵前綴
+        interval: 定期核對的間隔（秒），0 表示不啟動背景核對
+        lock_timeout: 核對鎖的逾時（秒）
+    """
+
+    def __init__(self, key_prefix: str = "trade:freq", interval: float = 3600.0, lock_timeout: int = 600):
+        self.key_prefix = key_prefix
+        self.interval = interval
+        self.lock_timeout = lock_timeout
+        self.last_reconcile: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Optional[asyncio.Task] = None
+
+    @property
+    def built_key(self) -> str:
+        return f"{self.key_prefix}:built"
+
+    @property
+    def lock_key(self) -> str:
+        return f"{self.key_prefix}:reconcile-lock"
+
+    @property
+    def pairs_key(self) -> str:
+        return f"{self.key_prefix}:pairs"
+
+    @property
+    def items_key(self) -> str:
+        return f"{self.key_prefix}:items"
+
+    def partners_key(self, item: str) -> str:
+        return f"{self.key_prefix}:partners:{item}"
+
+    @staticmethod
+    def _pair_member(item_a: str, item_b: str) -> str:
+        # 以 JSON 陣列表示交易對，物品名稱中有任何字元都不會混淆
+        return json.dumps(sorted([item_a, item_b]), ensure_ascii=False)
+
+    async def record(self, item_a: str, item_b: str):
+        """記錄一筆交易（單次往返）"""
+        try:
+            async with redis_client.pipeline() as batch:
+                batch.zincrby(self.pairs_key, 1, self._pair_member(item_a, item_b))
+                batch.zincrby(self.items_key, 1, item_a)
+                batch.zincrby(self.items_key, 1, item_b)
+                batch.zincrby(self.partners_key(item_a), 1, item_b)
+                batch.zincrby(self.partners_key(item_b), 1, item_a)
+        except Exception as e:
+            print(f"更新交易計數失敗: {item_a} / {item_b} - {e}")
+
+    @staticmethod
+    def _stop(limit: int) -> int:
+        return limit - 1 if limit > 0 else -1
+
+    async def _ranked(self, key: str, limit: int) -> Optional[List[Tuple[str, int]]]:
+        """讀取排名（與標記同一次往返）；計數器尚未建立時回傳 None"""
+        async with redis_client.pipeline() as batch:
+            batch.command("exists", self.built_key)
+            batch.command("zrevrange", key, 0, self._stop(limit), withscores=True)
+        built, members = batch.results
+        if not built:
+            return None
+        return [(decode_text(member), int(score)) for member, score in (members or [])]
+
+    async def top_pairs(self, limit: int = -1) -> Optional[List[Tuple[List[str], int]]]:
+        ranked = await self._ranked(self.pairs_key, limit)
+        return None if ranked is None else [(json.loads(member), count) for member, count in ranked]
+
+    async def top_items(self, limit: int = -1) -> Optional[List[Tuple[str, int]]]:
+        return await self._ranked(self.items_key, limit)
+
+    async def top_partners(self, item: str, limit: int = -1) -> Optional[List[Tuple[str, int]]]:
+        return await self._ranked(self.partners_key(item), limit)
+
+    @staticmethod
+    async def _expected_counts(db) -> Tuple[Dict[str, int], Dict[str, int], Dict[str, Dict[str, int]]]:
+        """以單次聚合（依有向交易對分組）算出三種計數"""
+        pipeline = [
+            {"$group": {"_id": {"a": "$item_a", "b": "$item_b"}, "count": {"$sum": 1}}},
+            {"$match": {"_id.a": {"$ne": None}, "_id.b": {"$ne": None}}}
+        ]
+        pairs: Dict[str, int] = defaultdict(int)
+        items: Dict[str, int] = defaultdict(int)
+        partners: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        async for result in db["Trade-History"].aggregate(pipeline):
+            a, b, count = result["_id"]["a"], result["_id"]["b"], result["count"]
+            pairs[TradeCounters._pair_member(a, b)] += count
+            items[a] += count
+            items[b] += count
+            partners[a][b] += count
+            partners[b][a] += count
+        return pairs, items, partners
+
+    @staticmethod
+    async def _current(keys: List[str], chunk_size: int = 100) -> List[Dict[str, int]]:
+        """以批次讀取多個有序集合的目前內容"""
+        current = []
+        for i in range(0, len(keys), chunk_size):
+            async with redis_client.pipeline() as batch:
+                for key in keys[i : i + chunk_size]:
+                    batch.command("zrange", key, 0, -1, withscores=True)
+            current.extend(
+                {decode_text(member): int(score) for member, score in (members or [])}
+                for members in batch.results
+            )
+        return current
+
+    async def reconcile(self, db) -> Dict[str, Any]:
+        """
+        與 MongoDB 核對並修正計數
+
+        只有內容不同的有序集合會被改寫（MULTI/EXEC 內刪除後重建，讀取端不會看到空集合）。
+        核對期間進行中的交易可能被少算或重複計算一次，會在下次核對時修正。
+        """
+        pairs, items, partners = await self._expected_counts(db)
+        expected = {self.pairs_key: pairs, self.items_key: items}
+        for item, counts in partners.items():
+            expected[self.partners_key(item)] = counts
+        stale_partner_keys = [
+            key async for key in redis_client.scan_iter(match=self.partners_key("*"))
+            if key not in expected
+        ]
+
+        keys = list(expected)
+        drifted = [
+            key for key, current in zip(keys, await self._current(keys))
+            if current != dict(expected[key])
+        ]
+        for i in range(0, len(drifted), 100):
+            async with redis_client.pipeline(transaction=True) as batch:
+                for key in drifted[i : i + 100]:
+                    batch.delete(key)
+                    batch.zadd(key, dict(expected[key]))
+        await redis_client.unlink_many(stale_partner_keys)
+        await redis_client.set(self.built_key, time.time())
+
+        self.last_reconcile = {
+            "pairs": len(pairs),
+            "items": len(items),
+            "drifted_keys": len(drifted),
+            "removed_keys": len(stale_partner_keys)
+        }
+        print(f"🔁 交易計數核對完成: 修正 {len(drifted)} 個、移除 {len(stale_partner_keys)} 個有序集合")
+        return self.last_reconcile
+
+    async def reconcile_if_due(self, db, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        標記缺少或超過 max_age 秒（預設 interval）時取得鎖並核對
+
+        其他 worker 正在核對或 Redis 無法使用時直接略過，回傳 None。
+        """
+        max_age = self.interval if max_age is None else max_age
+        built_at = await redis_client.get(self.built_key)
+        if isinstance(built_at, (int, float)) and time.time() - built_at < max_age:
+            return None
+        token = uuid.uuid4().hex
+        if not await redis_client.acquire_lock(self.lock_key, token, self.lock_timeout):
+            return None
+        try:
+            # 取得鎖後再檢查一次，其他 worker 可能剛完成核對
+            built_at = await redis_client.get(self.built_key)
+            if isinstance(built_at, (int, float)) and time.time() - built_at < max_age:
+                return None
+            return await self.reconcile(db)
+        finally:
+            await redis_client.release_lock(self.lock_key, token)
+
+    def request_reconcile(self, db):
+        """計數器尚未建立時由讀取端呼叫：在背景排程一次核對（已排程時不重複）"""
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.create_task(self._reconcile_once(db))
+
+    async def _reconcile_once(self, db):
+        try:
+            await self.reconcile_if_due(db)
+        except Exception as e:
+            print(f"❌ 交易計數核對失敗: {e}")
+
+    async def start(self, get_database):
+        """啟動背景核對：計數器尚未建立或已過期時核對，之後每 interval 秒檢查一次"""
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(get_database))
+
+    async def stop(self):
+        for task in (self._task, self._pending):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._pending = None
+
+    async def _run(self, get_database):
+        while True:
+            try:
+                await self.reconcile_if_due(await get_database())
+            except Exception as e:
+                print(f"❌ 交易計數核對失敗: {e}")
+            await asyncio.sleep(self.interval)
+
+trade_counters = TradeCounters(interval=float(os.getenv("TRADE_COUNTER_RECONCILE_INTERVAL", "3600")))
@@ -0,0 +1,156 @@
+import os
+import time
+import uuid
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+from .cache import track_access, pop_access_count
+from .redis_client import redis_client
+
+# 啟動預熱的跨 worker 鎖
+WARMUP_LOCK_KEY = "cache:warmup-lock"
+
+class WarmupEntry:
+    """一個需要預熱的快取呼叫（函數與固定參數）"""
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.key = func.cache_key(*args, **kwargs)
+        self.rate = 0.0          # 每秒存取次數（指數移動平均）
+        self.refreshes = 0
+        self.last_refresh: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "function": self.func.__name__,
+            "key": self.key,
+            "access_rate": self.rate,
+            "refreshes": self.refreshes,
+            "last_refresh": self.last_refresh,
+            "last_error": self.last_error
+        }
+
+class CacheWarmer:
+    """
+    快取預熱排程器
+
+    啟動時以有限並行數預熱所有登記的呼叫（跨 worker 以 Redis 鎖互斥，只有一個 worker 預熱），
+    之後定期檢查：
+    最近仍有人存取、且即將過期（或已被失效）的條目會在過期前重算，
+    沒人存取的條目則任其自然過期。
+
+    Args:
+        concurrency: 同時重算的上限，避免預熱時大量查詢 MongoDB
+        interval: 檢查間隔（秒）
+        lead_time: 距過期多少秒內視為需要提前重算（另加上次重算耗時的兩倍）
+        min_rate: 視為熱門所需的每秒存取次數
+        smoothing: 存取率指數移動平均的權重
+        warmup_lock_timeout: 預熱鎖的存活時間（秒）；鎖不主動釋放，期間啟動的 worker 都略過預熱
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 2,
+        interval: float = 15.0,
+        lead_time: float = 30.0,
+        min_rate: float = 0.01,
+        smoothing: float = 0.5,
+        warmup_lock_timeout: int = 300
+    ):
+        self.concurrency = concurrency
+        self.interval = interval
+        self.lead_time = lead_time
+        self.min_rate = min_rate
+        self.smoothing = smoothing
+        self.warmup_lock_timeout = warmup_lock_timeout
+        self.entries: List[WarmupEntry] = []
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, func: Callable, *args, **kwargs) -> WarmupEntry:
+        """登記一個以 @cache 裝飾的 async 函數與其呼叫參數"""
+        if not hasattr(func, "cache_refresh"):
+            raise TypeError(f"{getattr(func, '__name__', func)} 不是以 @cache 裝飾的 async 函數")
+        entry = WarmupEntry(func, args, kwargs)
+        track_access(entry.key)
+        self.entries.append(entry)
+        return entry
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def warm_all(self):
+        """
+        預熱所有登記的呼叫
+
+        只有取得預熱鎖的 worker 執行，其餘 worker 的條目已在共用的 Redis 中。
+        Redis 無法使用時各 worker 的快取改走各自的行程內備援，因此各自預熱。
+        """
+        acquired = await redis_client.acquire_lock(WARMUP_LOCK_KEY, uuid.uuid4().hex, self.warmup_lock_timeout)
+        if acquired is False:
+            print("🔥 其他 worker 已在預熱快取，略過")
+            return
+        print(f"🔥 開始預熱快取（{len(self.entries)} 項，並行上限 {self.concurrency}）...")
+        await asyncio.gather(*(self._refresh(entry) for entry in self.entries))
+        print("🔥 快取預熱完成")
+
+    async def _run(self):
+        await self.warm_all()
+        last_check = time.monotonic()
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            elapsed = max(now - last_check, 1e-6)
+            last_check = now
+            try:
+                await self.refresh_due(elapsed)
+            except Exception as e:
+                print(f"❌ 快取預熱排程錯誤: {e}")
+
+    async def refresh_due(self, elapsed: float):
+        """更新存取率並重算即將過期的熱門條目"""
+        due = []
+        for entry in self.entries:
+            accesses = pop_access_count(entry.key)
+            entry.rate = self.smoothing * (accesses / elapsed) + (1 - self.smoothing) * entry.rate
+            if entry.rate < self.min_rate:
+                continue
+            status = await entry.func.cache_status(*entry.args, **entry.kwargs)
+            lead = self.lead_time + 2 * (status["delta"] or 0.0)
+            if status["state"] != "fresh" or status["remaining"] <= lead:
+                due.append(entry)
+        if due:
+            await asyncio.gather(*(self._refresh(entry) for entry in due))
+
+    async def _refresh(self, entry: WarmupEntry):
+        async with self._semaphore:
+            try:
+                await entry.func.cache_refresh(*entry.args, **entry.kwargs)
+                entry.refreshes += 1
+                entry.last_refresh = time.time()
+                entry.last_error = None
+                print(f"✅ 預熱完成: {entry.func.__name__}")
+            except Exception as e:
+                entry.last_error = str(e)
+                print(f"❌ 預熱失敗: {entry.func.__name__} - {e}")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [entry.snapshot() for entry in self.entries]
+
+cache_warmer = CacheWarmer(
+    concurrency=int(os.getenv("CACHE_WARMUP_CONCURRENCY", "2")),
+    interval=float(os.getenv("CACHE_WARMUP_INTERVAL", "15"))
+)
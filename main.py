@@ -11,12 +11,18 @@ from slowapi.errors import RateLimitExceeded
 
 load_dotenv()
 
-from core.db import init_db
+from core.db import init_db, get_database
 from core.limiter import limiter
 from core.redis_client import redis_client
+from core.cache import cache_invalidation_listener
+from core.warmup import cache_warmer
+from core.trade_counters import trade_counters
+from core.pair_stats import pair_stats
 from api.auth import router as auth_router
 from core.db import register_db_events
 from api.trade import router as api_router
+from core.item_registry import item_registry
+from api.trade import get_collections, get_most_frequent_trades, ensure_trade_history_indexes
 from api.fuzzy_search import router as fuzzy_search_router
 from api.cache import router as cache_router
 
@@ -26,6 +32,10 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# 熱門快取端點：啟動時預熱，之後依存取頻率在過期前重算
+cache_warmer.register(get_collections)
+cache_warmer.register(get_most_frequent_trades)
+
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -33,10 +43,35 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 @app.on_event("startup")
 async def startup_event():
     await init_db()
-    await redis_client.connect()
+    # 物品登錄表：載入全部物品（首次啟動時從交易歷史建立），失敗時於第一次讀取再載入
+    try:
+        await item_registry.load(await get_database())
+    except Exception as e:
+        print(f"⚠️ 物品登錄表載入失敗: {e}")
+    try:
+        await redis_client.connect()
+    except Exception:
+        # Redis 無法使用時仍啟動服務，快取由斷路器改走行程內備援
+        redis_client.breaker.trip()
+        print("⚠️ Redis 暫時無法使用，快取改用行程內備援")
+    # 既有交易 collection 的分頁索引（跨 worker 只執行一次）；之後新的 collection 由 new_trade 建立索引
+    try:
+        await ensure_trade_history_indexes(await get_database())
+    except Exception as e:
+        print(f"⚠️ 建立交易歷史索引失敗: {e}")
+    await cache_invalidation_listener.start()
+    await cache_warmer.start()
+    # 交易次數計數器：尚未建立或已過期時核對（跨 worker 以鎖互斥），之後定期檢查
+    await trade_counters.start(get_database)
+    # 交易對匯率摘要：尚未從交易歷史完整建立時在背景重建一次
+    await pair_stats.start(get_database)
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await pair_stats.stop()
+    await trade_counters.stop()
+    await cache_warmer.stop()
+    await cache_invalidation_listener.stop()
     await redis_client.disconnect()
 
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
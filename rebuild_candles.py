@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+
+import asyncio
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.db import get_database
+from core.candles import rate_candles, RESOLUTIONS
+
+async def main():
+    print("🔧 重建交易對匯率 K 線")
+    print("=" * 60)
+    db = await get_database()
+    start = time.perf_counter()
+    total = await rate_candles.rebuild(db)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️ {total} 根 K 線（{', '.join(RESOLUTIONS)}），耗時 {elapsed:.2f} 秒")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+
+import asyncio
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.db import get_database
+from core.pair_stats import pair_stats
+
+async def main():
+    print("🔧 重建交易對匯率摘要")
+    print("=" * 60)
+    db = await get_database()
+    start = time.perf_counter()
+    pairs = await pair_stats.rebuild(db)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️ {pairs} 個交易對，耗時 {elapsed:.2f} 秒")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+
+import asyncio
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.db import get_database
+from core.redis_client import redis_client
+from core.recent_items import recent_items_index
+
+async def main():
+    print("🔧 重建使用者最近交易物品索引")
+    print("=" * 60)
+    try:
+        await redis_client.connect()
+        db = await get_database()
+        start = time.perf_counter()
+        users = await recent_items_index.rebuild_all(db)
+        elapsed = time.perf_counter() - start
+        print(f"⏱️ {users} 位使用者，耗時 {elapsed:.2f} 秒（每人保留 {recent_items_index.cap} 項）")
+    finally:
+        await redis_client.disconnect()
+
+if __name__ == "__main__":
+    asyncio.run(main())
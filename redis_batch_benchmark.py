@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import asyncio
+import time
+import json
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.redis_client import redis_client
+
+KEY_COUNTS = [10, 100, 1000]
+TTL = 60
+
+async def timed(coro_factory) -> float:
+    start = time.perf_counter()
+    await coro_factory()
+    return (time.perf_counter() - start) * 1000
+
+async def benchmark(count: int):
+    keys = [f"bench:batch:{count}:{i}" for i in range(count)]
+    values = {k: {"index": i, "payload": "x" * 64} for i, k in enumerate(keys)}
+
+    async def loop_set():
+        for k, v in values.items():
+            await redis_client.set(k, v, expire=TTL)
+
+    async def loop_get():
+        for k in keys:
+            await redis_client.get(k)
+
+    async def loop_delete():
+        for k in keys:
+            await redis_client.delete(k)
+
+    results = {}
+    results["set"] = (await timed(loop_set), await timed(lambda: redis_client.mset(values, expire=TTL)))
+    results["get"] = (await timed(loop_get), await timed(lambda: redis_client.mget(keys)))
+    await redis_client.mset(values, expire=TTL)
+    loop_delete_ms = await timed(loop_delete)
+    await redis_client.mset(values, expire=TTL)
+    results["delete"] = (loop_delete_ms, await timed(lambda: redis_client.delete_many(keys)))
+
+    print(f"\n📦 {count} 個鍵（逐一: {count} 次往返 → 批次: 1 次往返，節省 {count - 1} 次）")
+    for op, (loop_ms, batch_ms) in results.items():
+        speedup = loop_ms / batch_ms if batch_ms else float("inf")
+        print(f"  {op:<7} 逐一 {loop_ms:9.2f}ms   批次 {batch_ms:8.2f}ms   ⚡ {speedup:6.1f} 倍")
+
+    return {
+        "keys": count,
+        "round_trips_saved": count - 1,
+        "operations": {
+            op: {"loop_ms": loop_ms, "batch_ms": batch_ms}
+            for op, (loop_ms, batch_ms) in results.items()
+        }
+    }
+
+async def main():
+    print("🚀 Redis 批次操作效能測試")
+    print("=" * 60)
+    try:
+        await redis_client.connect()
+        report = [await benchmark(count) for count in KEY_COUNTS]
+        with open("redis_batch_report.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print("\n📄 報告已儲存至 redis_batch_report.json")
+    finally:
+        await redis_client.disconnect()
+
+if __name__ == "__main__":
+    asyncio.run(main())
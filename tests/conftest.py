@@ -0,0 +1,23 @@
+import fakeredis
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from core.cache import local_cache
+from core.redis_client import CircuitBreaker, FallbackStore, redis_client
+
+@pytest.fixture
+def fake_redis():
+    """以 fakeredis（支援 Lua）取代全域 redis_client 的連線，測試結束後還原"""
+    original = redis_client.redis, redis_client.breaker, redis_client.fallback
+    redis_client.redis = fakeredis.FakeAsyncRedis()
+    redis_client.breaker = CircuitBreaker()
+    redis_client.fallback = FallbackStore()
+    local_cache.clear()
+    yield redis_client.redis
+    redis_client.redis, redis_client.breaker, redis_client.fallback = original
+    local_cache.clear()
+
+@pytest.fixture
+def fake_db():
+    """記憶體內的 MongoDB（mongomock-motor），介面與 Motor 相同"""
+    return AsyncMongoMockClient()["test"]
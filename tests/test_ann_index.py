@@ -0,0 +1,72 @@
+import numpy as np
+
+from core.ann_index import IVFIndex, top_k
+
+def normalized(rng, n, dim=32, clusters=20):
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.3 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_top_k_matches_full_sort():
+    scores = np.random.default_rng(0).standard_normal(1000)
+    assert top_k(scores, 10).tolist() == np.argsort(-scores)[:10].tolist()
+    assert len(top_k(scores[:3], 10)) == 3
+    assert len(top_k(scores, 0)) == 0
+
+def test_exact_below_threshold_is_exact():
+    rng = np.random.default_rng(1)
+    vectors = normalized(rng, 500)
+    index = IVFIndex(exact_threshold=1000)
+    index.build(vectors)
+    assert index.stats()["exact"]
+    query = vectors[7]
+    ids, scores = index.search(query, 5)
+    assert ids.tolist() == top_k(vectors @ query, 5).tolist()
+    assert ids[0] == 7
+    assert np.all(np.diff(scores) <= 0)
+
+def test_switches_to_clusters_when_crossing_threshold():
+    rng = np.random.default_rng(2)
+    vectors = normalized(rng, 1200)
+    index = IVFIndex(exact_threshold=1000)
+    index.add(vectors[:900], np.arange(900))
+    assert index.stats()["exact"]
+    index.add(vectors[900:], np.arange(900, 1200))
+    stats = index.stats()
+    assert not stats["exact"]
+    assert stats["items"] == 1200
+    assert stats["nlist"] == IVFIndex.default_nlist(1200)
+    # 每個 id 恰好落在一個群
+    _, _, list_ids = index._state
+    assert sorted(np.concatenate(list_ids).tolist()) == list(range(1200))
+
+def test_clustered_recall_and_full_probe_is_exact():
+    rng = np.random.default_rng(3)
+    vectors = normalized(rng, 3000)
+    queries = normalized(rng, 50)
+    index = IVFIndex(nprobe=8, exact_threshold=100)
+    index.build(vectors)
+    nlist = index.stats()["nlist"]
+    recall = {8: [], 32: []}
+    for q in queries:
+        truth = set(top_k(vectors @ q, 10).tolist())
+        for nprobe in recall:
+            recall[nprobe].append(len(truth & set(index.search(q, 10, nprobe)[0].tolist())) / 10)
+        assert index.search(q, 10, nprobe=nlist)[0].tolist() == top_k(vectors @ q, 10).tolist()
+    # 比對的群越多召回率越高
+    assert np.mean(recall[8]) >= 0.7
+    assert np.mean(recall[32]) >= 0.95
+
+def test_add_after_training_is_searchable_and_retrains_on_growth():
+    rng = np.random.default_rng(4)
+    vectors = normalized(rng, 4000)
+    index = IVFIndex(exact_threshold=100, retrain_factor=2.0)
+    index.build(vectors[:1000])
+    nlist = index.stats()["nlist"]
+    index.add(vectors[1000:1500], np.arange(1000, 1500))
+    assert index.stats()["nlist"] == nlist
+    ids, _ = index.search(vectors[1200], 1, nprobe=nlist)
+    assert ids[0] == 1200
+    index.add(vectors[1500:], np.arange(1500, 4000))
+    assert index.stats()["nlist"] == IVFIndex.default_nlist(4000)
+    assert len(index) == 4000
@@ -0,0 +1,50 @@
+import asyncio
+
+from core.cache import _admit, budget_keys, cache, cache_metrics, namespace_budgets
+
+def test_entries_over_namespace_budget_are_not_written(fake_redis, monkeypatch):
+    monkeypatch.setitem(namespace_budgets, "budget", 700)
+    calls = []
+
+    @cache(ttl=60, key_prefix="budget:big", max_bytes=0)
+    async def big(i):
+        calls.append(i)
+        return "x" * 200
+
+    async def scenario():
+        rejected = cache_metrics.prefix("budget:big").rejected_budget
+        for i in range(4):
+            assert await big(i) == "x" * 200
+        stored = [await fake_redis.exists(big.cache_key(i)) for i in range(4)]
+        used = int(await fake_redis.get(budget_keys("budget")[2]))
+        return stored, used, cache_metrics.prefix("budget:big").rejected_budget - rejected
+
+    stored, used, rejected = asyncio.run(scenario())
+    assert stored == [1, 1, 0, 0]
+    assert rejected == 2
+    assert used <= 700
+
+def test_rewrite_replaces_previous_size_and_expired_entries_are_reclaimed(fake_redis, monkeypatch):
+    monkeypatch.setitem(namespace_budgets, "budget", 100)
+
+    async def scenario():
+        assert await _admit("budget", "budget:a", 60, ttl=60)
+        # 同一個鍵重寫時先扣回舊的大小
+        assert await _admit("budget", "budget:a", 80, ttl=60)
+        assert not await _admit("budget", "budget:b", 30, ttl=60)
+        assert int(await fake_redis.get(budget_keys("budget")[2])) == 80
+        # 已過期的條目在下一次檢查時扣回
+        assert await _admit("budget", "budget:a", 80, ttl=-1)
+        assert await _admit("budget", "budget:b", 30, ttl=60)
+        return int(await fake_redis.get(budget_keys("budget")[2]))
+
+    assert asyncio.run(scenario()) == 30
+
+def test_unlimited_namespace_skips_accounting(fake_redis, monkeypatch):
+    monkeypatch.setitem(namespace_budgets, "budget", 0)
+
+    async def scenario():
+        assert await _admit("budget", "budget:a", 10 ** 9, ttl=60)
+        return await fake_redis.exists(*budget_keys("budget"))
+
+    assert asyncio.run(scenario()) == 0
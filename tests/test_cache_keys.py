@@ -0,0 +1,43 @@
+import inspect
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from core.cache import CacheConfig, generate_cache_key
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def key_for(func, *args, **kwargs):
+    return generate_cache_key(
+        func.__name__, args, kwargs, CacheConfig(key_prefix="trade:history"), inspect.signature(func)
+    )
+
+async def history(user, limit=-1, filters=None):
+    return []
+
+def test_positional_keyword_and_default_arguments_share_a_key():
+    expected = key_for(history, "alice")
+    assert key_for(history, "alice", -1) == expected
+    assert key_for(history, user="alice", limit=-1) == expected
+    assert key_for(history, "alice", limit=10) != expected
+
+def test_key_ignores_dict_and_set_ordering():
+    first = key_for(history, "alice", filters={"b": {2, 1}, "a": datetime(2025, 1, 1)})
+    second = key_for(history, "alice", filters={"a": datetime(2025, 1, 1), "b": {1, 2}})
+    assert first == second
+
+def test_key_is_stable_across_processes():
+    code = (
+        "from tests.test_cache_keys import history, key_for;"
+        "print(key_for(history, 'alice', filters={'tags': {'x', 'y', 'z'}}))"
+    )
+    keys = {
+        subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+            cwd=ROOT, env={"PYTHONHASHSEED": seed, "PYTHONPATH": str(ROOT)}
+        ).stdout.strip()
+        for seed in ("1", "2", "3")
+    }
+    assert len(keys) == 1
+    assert keys == {key_for(history, "alice", filters={"tags": {"z", "y", "x"}})}
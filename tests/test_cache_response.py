@@ -0,0 +1,49 @@
+import asyncio
+import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.cache import cache
+
+def make_app(calls):
+    app = FastAPI()
+
+    @app.get("/rates/{item}")
+    @cache(ttl=60, key_prefix="trade:response", response=True)
+    async def rates(item: str, limit: int = 10):
+        calls.append(item)
+        return {"item": item, "limit": limit, "at": datetime.datetime(2025, 1, 2, 3, 4, 5)}
+
+    return app, rates
+
+def test_cached_body_matches_default_json_response(fake_redis):
+    calls = []
+    app, _ = make_app(calls)
+    with TestClient(app) as client:
+        first = client.get("/rates/apple")
+        second = client.get("/rates/apple")
+    assert first.status_code == second.status_code == 200
+    assert first.json() == {"item": "apple", "limit": 10, "at": "2025-01-02T03:04:05"}
+    assert first.content == second.content
+    assert first.headers["etag"] == second.headers["etag"]
+    assert calls == ["apple"]
+
+def test_if_none_match_returns_304(fake_redis):
+    calls = []
+    app, _ = make_app(calls)
+    with TestClient(app) as client:
+        etag = client.get("/rates/apple").headers["etag"]
+        assert client.get("/rates/apple", headers={"If-None-Match": etag}).status_code == 304
+        assert client.get("/rates/apple", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+        assert client.get("/rates/apple", headers={"If-None-Match": '"other"'}).status_code == 200
+        # 不同參數是不同的條目與 ETag
+        other = client.get("/rates/apple", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    assert other.headers["etag"] != etag
+    assert calls == ["apple", "apple"]
+
+def test_direct_call_returns_json_compatible_value(fake_redis):
+    _, rates = make_app([])
+    value = asyncio.run(rates("apple"))
+    assert value == {"item": "apple", "limit": 10, "at": "2025-01-02T03:04:05"}
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+from core.cache import LOCK_KEY_PREFIX, _inflight, cache
+
+def test_concurrent_misses_compute_once(fake_redis):
+    calls = []
+
+    @cache(ttl=60, key_prefix="trade:flight")
+    async def slow(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return {"value": value}
+
+    async def scenario():
+        results = await asyncio.gather(*(slow(1) for _ in range(10)))
+        assert results == [{"value": 1}] * 10
+        assert not _inflight
+
+    asyncio.run(scenario())
+    assert calls == [1]
+
+def test_stale_entry_is_served_while_refreshing_in_background(fake_redis):
+    calls = []
+
+    @cache(ttl=1, key_prefix="trade:swr", stale_ttl=60)
+    async def rate():
+        calls.append(1)
+        return {"call": len(calls)}
+
+    async def scenario():
+        assert (await rate())["call"] == 1
+        # 讓條目超過邏輯期限，進入 stale 視窗
+        status = await rate.cache_status()
+        assert status["state"] == "fresh"
+        await asyncio.sleep(1.05)
+        assert (await rate.cache_status())["state"] == "stale"
+        assert (await rate())["call"] == 1
+        for _ in range(100):
+            if (await rate.cache_status())["state"] == "fresh":
+                break
+            await asyncio.sleep(0.01)
+        assert (await rate())["call"] == 2
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+def make_locked(calls):
+    @cache(ttl=60, key_prefix="trade:locked", lock_timeout=30)
+    async def compute():
+        calls.append(1)
+        return {"call": len(calls)}
+
+    return compute
+
+def test_waiter_uses_entry_written_by_lock_holder(fake_redis):
+    calls = []
+    compute = make_locked(calls)
+
+    async def scenario():
+        await compute()
+        key = compute.cache_key()
+        raw = await fake_redis.get(key)
+        await fake_redis.delete(key)
+        # 另一個 worker 持有鎖並在稍後寫入條目
+        await fake_redis.set(f"{LOCK_KEY_PREFIX}{key}", "other-worker", ex=30)
+        waiter = asyncio.create_task(compute())
+        await asyncio.sleep(0.1)
+        await fake_redis.set(key, raw)
+        return await waiter
+
+    assert asyncio.run(scenario()) == {"call": 1}
+    assert calls == [1]
+
+def test_waiter_stops_when_lock_is_released_without_entry(fake_redis):
+    calls = []
+    compute = make_locked(calls)
+
+    async def scenario():
+        lock_key = f"{LOCK_KEY_PREFIX}{compute.cache_key()}"
+        await fake_redis.set(lock_key, "other-worker", ex=30)
+        waiter = asyncio.create_task(compute())
+        await asyncio.sleep(0.1)
+        # 持有者重算失敗，沒有寫入就釋放鎖：等待者不應等到 lock_timeout
+        started = time.monotonic()
+        await fake_redis.delete(lock_key)
+        result = await waiter
+        return result, time.monotonic() - started
+
+    result, waited = asyncio.run(scenario())
+    assert result == {"call": 1}
+    assert waited < 1
@@ -0,0 +1,62 @@
+import asyncio
+
+from core.cache import CacheManager, cache, invalidate_cache, tag_key
+
+def make_counter(key_prefix, **options):
+    calls = []
+
+    @cache(ttl=60, key_prefix=key_prefix, **options)
+    async def compute(value):
+        calls.append(value)
+        return {"value": value, "call": len(calls)}
+
+    return compute, calls
+
+def test_tag_invalidation_recomputes_only_tagged_entries(fake_redis):
+    trades, trade_calls = make_counter("trade:history")
+    items, item_calls = make_counter("items:list")
+
+    @invalidate_cache(tags=["trade"])
+    async def new_trade():
+        return True
+
+    async def scenario():
+        await trades(1)
+        await items(1)
+        assert (await trades(1))["call"] == 1
+        await new_trade()
+        assert (await trades(1))["call"] == 2
+        assert (await items(1))["call"] == 1
+
+    asyncio.run(scenario())
+    assert trade_calls == [1, 1]
+    assert item_calls == [1]
+
+def test_lost_generation_counter_invalidates_entries(fake_redis):
+    trades, calls = make_counter("trade:history")
+
+    async def scenario():
+        await trades(1)
+        # 計數器被淘汰後以時間戳重新起算，舊條目不會復活
+        await fake_redis.delete(tag_key("trade"))
+        await trades(1)
+        await trades(1)
+
+    asyncio.run(scenario())
+    assert calls == [1, 1]
+
+def test_invalidate_tags_bumps_one_counter_per_tag(fake_redis):
+    trades, _ = make_counter("trade:history")
+
+    async def scenario():
+        for i in range(20):
+            await trades(i)
+        before = int(await fake_redis.get(tag_key("trade")))
+        await CacheManager.invalidate_tags("trade")
+        after = int(await fake_redis.get(tag_key("trade")))
+        return before, after, len(await fake_redis.keys("trade:*"))
+
+    before, after, entries = asyncio.run(scenario())
+    assert after == before + 1
+    # 條目本身不必刪除，讀取時比對世代即視為失效
+    assert entries == 20
@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+from core.cache import (
+    INVALIDATION_CHANNEL, CacheInvalidationListener, cache, cache_metrics, local_cache, tag_key
+)
+
+VALUE = {"items": [{"name": "藍色洗衣籃", "rate": 1.5}], "total": 1}
+
+def test_l2_entry_has_codec_header_and_l1_hit_skips_redis(fake_redis):
+    calls = []
+
+    @cache(ttl=60, key_prefix="items:tiered", local_ttl=30)
+    async def items():
+        calls.append(1)
+        return VALUE
+
+    async def scenario():
+        assert await items() == VALUE
+        key = items.cache_key()
+        raw = await fake_redis.get(key)
+        assert 0x80 <= raw[0] < 0xC0
+        # L1 命中時不讀取 Redis：即使 L2 條目被刪除仍回傳同一個值
+        await fake_redis.delete(key)
+        hits = cache_metrics.prefix("items:tiered").l1_hits
+        assert await items() == VALUE
+        assert cache_metrics.prefix("items:tiered").l1_hits == hits + 1
+        # L1 清空後從 L2 解碼帶標頭的條目
+        await fake_redis.set(key, raw)
+        local_cache.clear()
+        assert await items() == VALUE
+
+    asyncio.run(scenario())
+    assert calls == [1]
+
+def test_other_worker_invalidation_clears_l1(fake_redis):
+    calls = []
+
+    @cache(ttl=60, key_prefix="trade:tiered", local_ttl=30)
+    async def history():
+        calls.append(1)
+        return {"call": len(calls)}
+
+    async def wait_until(condition):
+        for _ in range(100):
+            if await condition():
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("timed out")
+
+    async def subscribed():
+        return (await fake_redis.pubsub_numsub(INVALIDATION_CHANNEL))[0][1] == 1
+
+    async def evicted():
+        return not local_cache.get(history.cache_key())[0]
+
+    async def scenario():
+        listener = CacheInvalidationListener()
+        await listener.start()
+        try:
+            await wait_until(subscribed)
+            await history()
+            assert local_cache.get(history.cache_key())[0]
+            # 其他 worker 遞增世代並廣播：本行程的 L1 條目應被移除
+            await fake_redis.incr(tag_key("trade"))
+            await fake_redis.publish(INVALIDATION_CHANNEL, json.dumps({"src": "other", "tags": ["trade"]}))
+            await wait_until(evicted)
+            assert (await history())["call"] == 2
+        finally:
+            await listener.stop()
+
+    asyncio.run(scenario())
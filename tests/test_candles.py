@@ -0,0 +1,55 @@
+import asyncio
+import datetime
+
+import pytest
+
+from core.candles import CANDLES_COLLECTION, RateCandles, bucket_start
+
+UTC8 = datetime.timezone(datetime.timedelta(hours=8))
+
+@pytest.mark.parametrize("timestamp, resolution, expected", [
+    (datetime.datetime(2025, 3, 1, 12, 0, 0), "1h", datetime.datetime(2025, 3, 1, 12)),
+    (datetime.datetime(2025, 3, 1, 11, 59, 59, 999999), "1h", datetime.datetime(2025, 3, 1, 11)),
+    (datetime.datetime(2025, 3, 1, 12, 34, 56, 1), "1m", datetime.datetime(2025, 3, 1, 12, 34)),
+    (datetime.datetime(2025, 3, 1, 23, 59, 59), "1d", datetime.datetime(2025, 3, 1)),
+    (datetime.datetime(2025, 3, 2, 0, 0, 0), "1d", datetime.datetime(2025, 3, 2)),
+    # 帶時區的時間先轉為 UTC：台灣 3/2 07:30 是 UTC 3/1 23:30
+    (datetime.datetime(2025, 3, 2, 7, 30, tzinfo=UTC8), "1d", datetime.datetime(2025, 3, 1)),
+    (datetime.datetime(2025, 3, 2, 7, 30, tzinfo=UTC8), "1h", datetime.datetime(2025, 3, 1, 23)),
+])
+def test_bucket_start(timestamp, resolution, expected):
+    assert bucket_start(timestamp, resolution) == expected
+
+def hour(h):
+    return datetime.datetime(2025, 3, 1, h)
+
+@pytest.fixture
+def candles(fake_db):
+    asyncio.run(fake_db[CANDLES_COLLECTION].insert_many([
+        {"item_from": "apple", "item_to": "pear", "resolution": "1h", "start": hour(h), "open": h, "count": 1}
+        for h in range(6)
+    ] + [
+        {"item_from": "apple", "item_to": "pear", "resolution": "1d", "start": hour(0), "open": 0, "count": 6}
+    ]))
+    return fake_db
+
+def starts(result):
+    return [c["start"].hour for c in result]
+
+def test_query_range_includes_start_bucket_and_excludes_end(candles):
+    query = RateCandles().query(
+        candles, "apple", "pear", "1h",
+        start=datetime.datetime(2025, 3, 1, 1, 30), end=hour(4)
+    )
+    assert starts(asyncio.run(query)) == [1, 2, 3]
+
+def test_query_without_start_returns_latest_in_ascending_order(candles):
+    query = RateCandles().query(candles, "apple", "pear", "1h", end=hour(5), limit=3)
+    assert starts(asyncio.run(query)) == [2, 3, 4]
+
+def test_query_converts_aware_bounds_to_utc(candles):
+    query = RateCandles().query(
+        candles, "apple", "pear", "1h",
+        start=datetime.datetime(2025, 3, 1, 10, 0, tzinfo=UTC8), end=datetime.datetime(2025, 3, 1, 12, 0, tzinfo=UTC8)
+    )
+    assert starts(asyncio.run(query)) == [2, 3]
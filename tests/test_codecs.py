@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import pytest
+
+from core.codecs import Codec, CodecError, available_codecs
+
+VALUE = {
+    "items": [{"name": "藍色洗衣籃", "rate": 1.5, "qty": i} for i in range(200)],
+    "updated": datetime(2025, 1, 2, 3, 4, 5),
+    "raw": b"\x00\x01binary",
+}
+
+@pytest.mark.parametrize("name", sorted(available_codecs(min_compress_bytes=16)))
+def test_round_trip(name):
+    codec = available_codecs(min_compress_bytes=16)[name]
+    assert Codec.decode(codec.encode(VALUE)) == VALUE
+
+def test_header_outside_utf8_lead_bytes():
+    # 標頭必須不可能是合法 UTF-8 文字的第一個位元組
+    for codec in available_codecs(min_compress_bytes=16).values():
+        for value in (VALUE, "x", [1]):
+            assert 0x80 <= codec.encode(value)[0] < 0xC0
+
+def test_decode_is_independent_of_current_settings():
+    data = Codec("json", "zlib", min_compress_bytes=16).encode(VALUE)
+    assert Codec("json", "none").decode(data) == VALUE
+
+@pytest.mark.parametrize("raw, expected", [
+    (b'{"a": 1, "b": [1, 2]}', {"a": 1, "b": [1, 2]}),
+    (b'[1, "two"]', [1, "two"]),
+    (b'"quoted"', "quoted"),
+    (b"!important", "!important"),
+    (b"plain text", "plain text"),
+    ("藍色".encode("utf-8"), "藍色"),
+    ("already str", "already str"),
+    (b"42", 42),
+])
+def test_legacy_values_decode_as_json_text(raw, expected):
+    assert Codec.decode(raw) == expected
+
+def test_corrupt_payload_raises_codec_error():
+    data = Codec("json", "zlib", min_compress_bytes=16).encode(VALUE)
+    with pytest.raises(CodecError):
+        Codec.decode(data[:1] + b"not zlib")
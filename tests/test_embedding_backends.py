@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import openai
+import pytest
+
+from core.embedding_backends import OpenAIEmbeddingBackend
+
+class FakeEmbeddings:
+    """模擬 AsyncOpenAI().embeddings；failures 為前幾次請求要拋出的錯誤"""
+
+    def __init__(self, delay=0.0, failures=()):
+        self.delay = delay
+        self.failures = list(failures)
+        self.inputs = []
+
+    async def create(self, model, input):
+        self.inputs.append(list(input))
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            raise self.failures.pop(0)
+        # 打亂順序，回傳結果需依 index 對回輸入
+        data = [SimpleNamespace(index=i, embedding=[float(len(t)), float(i)]) for i, t in enumerate(input)]
+        return SimpleNamespace(data=data[::-1])
+
+def make_backend(embeddings, **options):
+    backend = OpenAIEmbeddingBackend("text-embedding-3-small", "sk-test", backoff=0.001, **options)
+    backend.dim = 2
+    backend._async_client = SimpleNamespace(embeddings=embeddings)
+    return backend
+
+def timeout_error():
+    return openai.APITimeoutError(request=None)
+
+def test_batches_preserve_order_and_duplicates():
+    embeddings = FakeEmbeddings()
+    backend = make_backend(embeddings, batch_size=2)
+    vectors = asyncio.run(backend.aembed(["apple", "pear", "apple", "fig"]))
+    assert vectors.tolist() == [[5, 0], [4, 1], [5, 0], [3, 0]]
+    assert sorted(map(len, embeddings.inputs)) == [1, 2]
+
+def test_concurrent_calls_share_in_flight_texts():
+    embeddings = FakeEmbeddings(delay=0.05)
+    backend = make_backend(embeddings)
+
+    async def scenario():
+        return await asyncio.gather(backend.aembed(["apple", "pear"]), backend.aembed(["pear", "fig"]))
+
+    first, second = asyncio.run(scenario())
+    assert np.array_equal(first[1], second[0])
+    assert sorted(t for batch in embeddings.inputs for t in batch) == ["apple", "fig", "pear"]
+    assert backend.deduplicated == 1
+    assert not backend._inflight
+
+def test_retryable_errors_are_retried():
+    embeddings = FakeEmbeddings(failures=[timeout_error(), timeout_error()])
+    backend = make_backend(embeddings, max_retries=2)
+    assert asyncio.run(backend.aembed(["apple"])).tolist() == [[5, 0]]
+    assert backend.retries == 2
+    assert backend.requests == 3
+
+def test_exhausted_retries_fail_every_waiter_and_clear_in_flight():
+    embeddings = FakeEmbeddings(delay=0.01, failures=[timeout_error()] * 2)
+    backend = make_backend(embeddings, max_retries=1)
+
+    async def scenario():
+        return await asyncio.gather(
+            backend.aembed(["apple"]), backend.aembed(["apple"]), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, openai.APITimeoutError) for r in results)
+    assert backend.failures == 1
+    assert not backend._inflight
+
+def test_cancelled_owner_does_not_cancel_other_waiters():
+    embeddings = FakeEmbeddings(delay=0.05)
+    backend = make_backend(embeddings)
+
+    async def scenario():
+        owner = asyncio.create_task(backend.aembed(["apple", "pear"]))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(backend.aembed(["pear"]))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return await waiter
+
+    assert asyncio.run(scenario()).tolist() == [[4, 1]]
+    assert len(embeddings.inputs) == 1
+
+def test_busy_time_counts_overlapping_calls_once():
+    embeddings = FakeEmbeddings(delay=0.1)
+    backend = make_backend(embeddings)
+
+    async def scenario():
+        await asyncio.gather(*(backend.aembed([f"item-{i}"]) for i in range(5)))
+
+    asyncio.run(scenario())
+    assert 0.1 <= backend.busy_seconds < 0.3
+    assert backend.stats()["texts_per_second"] > 15
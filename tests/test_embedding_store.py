@@ -0,0 +1,81 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from core.embedding_store import EmbeddingStore
+
+DIM = 4
+
+def fake_embed(names):
+    return np.array([[len(n), ord(n[0]), 1.0, 0.5] for n in names], dtype=np.float32)
+
+def open_store(tmp_path):
+    return EmbeddingStore(str(tmp_path), "test-model", DIM)
+
+def test_rows_survive_reopen_and_only_missing_names_are_embedded(tmp_path):
+    embedded = []
+
+    def embed(names):
+        embedded.extend(names)
+        return fake_embed(names)
+
+    store = open_store(tmp_path)
+    first = store.rows_for(["apple", "pear", "apple"], embed)
+    reopened = open_store(tmp_path)
+    second = reopened.rows_for(["pear", "plum", "apple"], embed)
+    assert first.tolist() == [0, 1, 0]
+    assert second.tolist() == [1, 2, 0]
+    assert embedded == ["apple", "pear", "plum"]
+    np.testing.assert_allclose(np.linalg.norm(reopened.vectors, axis=1), 1.0, rtol=1e-5)
+
+def test_torn_write_is_truncated_to_complete_rows(tmp_path):
+    store = open_store(tmp_path)
+    store.rows_for(["apple", "pear"], fake_embed)
+    # 模擬寫入中斷：向量多了一列半、id 只寫了一半
+    with open(os.path.join(store.path, "vectors.f32"), "ab") as f:
+        f.write(np.ones(DIM + 2, dtype=np.float32).tobytes())
+    with open(os.path.join(store.path, "ids.u64"), "ab") as f:
+        f.write(b"\x01\x02\x03")
+    reopened = open_store(tmp_path)
+    assert len(reopened) == 2
+    assert os.path.getsize(os.path.join(store.path, "vectors.f32")) == 2 * DIM * 4
+    assert os.path.getsize(os.path.join(store.path, "ids.u64")) == 2 * 8
+    assert reopened.rows_for(["plum"], fake_embed).tolist() == [2]
+
+def test_workers_sharing_a_directory_agree_on_rows(tmp_path):
+    worker_a, worker_b = open_store(tmp_path), open_store(tmp_path)
+    worker_a.rows_for(["apple"], fake_embed)
+    worker_b.rows_for(["pear"], fake_embed)
+
+    async def scenario():
+        async def aembed(names):
+            raise AssertionError(f"不應重新嵌入 {names}")
+        return await worker_a.arows_for(["pear", "apple"], aembed)
+
+    assert asyncio.run(scenario()).tolist() == [1, 0]
+    assert len(worker_b.vectors) == 2
+
+def test_concurrent_async_calls_append_each_name_once(tmp_path):
+    store = open_store(tmp_path)
+
+    async def aembed(names):
+        await asyncio.sleep(0.01)
+        return fake_embed(names)
+
+    async def scenario():
+        return await asyncio.gather(
+            store.arows_for(["apple", "pear"], aembed),
+            store.arows_for(["pear", "plum"], aembed)
+        )
+
+    first, second = asyncio.run(scenario())
+    assert first[1] == second[0]
+    assert len(store) == 3
+    assert os.path.getsize(os.path.join(store.path, "ids.u64")) == 3 * 8
+
+def test_dimension_mismatch_is_rejected(tmp_path):
+    open_store(tmp_path)
+    with pytest.raises(ValueError):
+        EmbeddingStore(str(tmp_path), "test-model", DIM + 1)
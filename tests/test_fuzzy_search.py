@@ -0,0 +1,61 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import api.fuzzy_search as fuzzy
+from core.lexical_index import LexicalIndex
+
+ITEMS = ["apple pie", "apple juice", "cider", "pear"]
+
+@pytest.fixture
+def search(fake_redis, monkeypatch):
+    async def fetch():
+        return len(ITEMS), ITEMS
+
+    monkeypatch.setattr(fuzzy, "_fetch_all_item_names", fetch)
+    monkeypatch.setattr(fuzzy, "lexical_index", LexicalIndex())
+    monkeypatch.setattr(fuzzy, "_item_cache", {**fuzzy._item_cache, "lexical_version": None})
+    calls = []
+
+    async def semantic(q, top_k, min_score, nprobe, hybrid):
+        calls.append(hybrid)
+        return semantic.results
+
+    semantic.results = ["cider", "apple juice"]
+    monkeypatch.setattr(fuzzy, "_semantic_search", semantic)
+    return calls, semantic
+
+def run(mode, q="apple"):
+    return asyncio.run(fuzzy.fuzzy_search(q=q, top_k=3, min_score=0.2, nprobe=None, mode=mode))
+
+def test_hybrid_merges_with_embeddings_even_on_prefix_match(search):
+    calls, _ = search
+    assert run("hybrid") == ["cider", "apple juice"]
+    assert calls == [True]
+
+def test_lexical_mode_skips_embeddings(search):
+    calls, _ = search
+    assert run("lexical") == ["apple pie", "apple juice"]
+    assert calls == []
+
+def test_hybrid_falls_back_to_lexical_when_embedding_fails(search):
+    calls, semantic = search
+    semantic.results = []
+    assert run("hybrid") == ["apple pie", "apple juice"]
+
+def test_core_ranks_lexical_and_semantic_candidates_together(monkeypatch):
+    # 向量近鄰：cider 與查詢最相近；apple pie 只是字面相符、語意較遠
+    vectors = np.array([[0.0, 1.0], [0.6, 0.8], [1.0, 0.0], [0.0, -1.0]], dtype=np.float32)
+    names = dict(enumerate(ITEMS))
+    monkeypatch.setattr(fuzzy, "_item_cache", {
+        **fuzzy._item_cache, "names": names, "rows": {n: i for i, n in names.items()}
+    })
+    monkeypatch.setattr(fuzzy, "embedding_store", SimpleNamespace(vectors=vectors))
+    monkeypatch.setattr(fuzzy, "item_index", SimpleNamespace(
+        search=lambda q, k, nprobe: (np.array([2, 1]), np.array([1.0, 0.6]))
+    ))
+    q_vec = np.array([1.0, 0.0], dtype=np.float32)
+    ranked = fuzzy._fuzzy_search_core(q_vec, 3, 0.2, lexical=[("apple pie", 0.95), ("apple juice", 0.93)])
+    assert ranked == ["cider", "apple juice", "apple pie"]
@@ -0,0 +1,61 @@
+import random
+
+from core.lexical_index import LexicalIndex, trigrams
+
+ITEMS = ["藍色洗衣籃", "藍色收納籃", "藍紫色提籃", "紅色蘋果", "青蘋果", "Apple Juice", "apple pie", "Apple"]
+
+def make_index(names=ITEMS):
+    index = LexicalIndex()
+    index.add(names)
+    return index
+
+def test_trigrams_are_padded():
+    assert trigrams("ab") == {"\x02\x02a", "\x02ab", "ab\x03"}
+
+def test_exact_match_ranks_first_then_shorter_prefixes():
+    results = make_index().search("apple", limit=5)
+    assert results[0] == ("Apple", 1.0)
+    assert [name for name, _ in results[1:3]] == ["apple pie", "Apple Juice"]
+    assert all(0.9 < score < 1.0 for _, score in results[1:3])
+
+def test_prefix_is_normalized():
+    results = make_index().search("  ＡＰＰＬＥ   j", limit=3)
+    assert results[0][0] == "Apple Juice"
+
+def test_typo_and_infix_fall_back_to_trigrams():
+    index = make_index()
+    assert index.search("aple pie", limit=1)[0][0] == "apple pie"
+    names = [name for name, _ in index.search("蘋果", limit=5)]
+    assert set(names[:2]) == {"紅色蘋果", "青蘋果"}
+
+def test_scores_are_sorted_and_limited():
+    results = make_index().search("藍色", limit=2)
+    assert len(results) == 2
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+def test_add_is_incremental_and_idempotent():
+    index = make_index()
+    index.add(["藍色大籃子", "Apple"])
+    assert len(index) == len(ITEMS) + 1
+    assert "藍色大籃子" in index
+    assert index.search("藍色大", limit=1)[0][0] == "藍色大籃子"
+
+def test_no_match():
+    assert make_index().search("xyz") == []
+    assert make_index().search("   ") == []
+
+def test_large_index_skips_common_grams_but_keeps_ranking():
+    rng = random.Random(0)
+    alphabet = "abcdefghij"
+    names = ["".join(rng.choice(alphabet) for _ in range(8)) for _ in range(20000)]
+    index = make_index(names + ["needle-item"])
+    results = index.search("neddle-item", limit=3)
+    assert results[0][0] == "needle-item"
+
+def test_prefix_keeps_closest_matches_not_alphabetical_first():
+    # 字母順序在前但較長的名稱不應擠掉較接近查詢的名稱
+    index = make_index([f"apple a long variety {i:02d}" for i in range(20)] + ["apple pie"])
+    results = index.search("apple", limit=5)
+    assert results[0][0] == "apple pie"
+    assert len(results) == 5
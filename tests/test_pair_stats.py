@@ -0,0 +1,177 @@
+import random
+import asyncio
+
+import pytest
+
+from core.pair_stats import PairStats, RateSketch
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+def to_buckets(sketch, values):
+    buckets = {}
+    for v in values:
+        b = sketch.bucket(v)
+        buckets[b] = buckets.get(b, 0) + 1
+    return buckets
+
+@pytest.mark.parametrize("accuracy", [0.01, 0.05])
+def test_quantiles_within_relative_accuracy(accuracy):
+    rng = random.Random(42)
+    values = [rng.lognormvariate(0, 2) for _ in range(20000)]
+    sketch = RateSketch(accuracy)
+    qs = [0.01, 0.1, 0.5, 0.9, 0.99, 0.999]
+    estimates = sketch.quantiles(to_buckets(sketch, values), qs)
+    for q in qs:
+        expected = exact_quantile(values, q)
+        estimate = estimates[f"p{q * 100:g}"]
+        assert abs(estimate - expected) <= accuracy * expected * (1 + 1e-9)
+
+def test_merge_equals_sketch_of_union():
+    rng = random.Random(1)
+    sketch = RateSketch()
+    a = [rng.uniform(0.1, 10) for _ in range(500)]
+    b = [rng.uniform(5, 50) for _ in range(500)]
+    merged = RateSketch.merge(to_buckets(sketch, a), to_buckets(sketch, b))
+    assert merged == to_buckets(sketch, a + b)
+
+def test_zero_and_empty():
+    sketch = RateSketch()
+    assert sketch.quantiles({}, [0.5]) == {"p50": None}
+    assert sketch.quantiles(to_buckets(sketch, [0.0, 0.0, 2.0]), [0.5]) == {"p50": 0.0}
+
+def test_summarize_clamps_quantiles_to_observed_range():
+    stats = PairStats()
+    rate = 3.0
+    doc = {"count": 1, "sum": rate, "min": rate, "max": rate, "sketch": {stats.sketch.bucket(rate): 1}}
+    summary = stats.summarize(doc, qs=(0.5, 0.99))
+    assert summary["mean"] == rate
+    assert summary["quantiles"] == {"p50": rate, "p99": rate}
+
+class FakeCollection:
+    """只實作 PairStats 用到的 Motor collection 操作"""
+
+    def __init__(self, db, name):
+        self.db, self.name, self.docs = db, name, []
+        self.on_find = None
+
+    @staticmethod
+    def _match(doc, query):
+        for field, cond in query.items():
+            value = doc.get(field)
+            if isinstance(cond, dict):
+                if "$in" in cond and value not in cond["$in"]:
+                    return False
+                if "$gt" in cond and not (value is not None and value > cond["$gt"]):
+                    return False
+                if "$lte" in cond and not (value is not None and value <= cond["$lte"]):
+                    return False
+            elif value != cond:
+                return False
+        return True
+
+    async def create_index(self, keys, unique=False):
+        pass
+
+    async def find_one(self, query, projection=None, sort=None):
+        docs = [d for d in self.docs if self._match(d, query)]
+        if sort:
+            field, direction = sort[0]
+            docs.sort(key=lambda d: d[field], reverse=direction < 0)
+        return docs[0] if docs else None
+
+    async def find(self, query, projection=None, batch_size=None):
+        for doc in [d for d in self.docs if self._match(d, query)]:
+            yield doc
+            if self.on_find:
+                await self.on_find()
+
+    async def insert_many(self, docs, ordered=True):
+        self.docs.extend(dict(d) for d in docs)
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    async def bulk_write(self, updates, ordered=True):
+        for update in updates:
+            doc = next((d for d in self.docs if self._match(d, update._filter)), None)
+            if doc is None:
+                doc = dict(update._filter)
+                self.docs.append(doc)
+            for field, amount in update._doc["$inc"].items():
+                if field.startswith("sketch."):
+                    sketch = doc.setdefault("sketch", {})
+                    bucket = field.split(".", 1)[1]
+                    sketch[bucket] = sketch.get(bucket, 0) + amount
+                else:
+                    doc[field] = doc.get(field, 0) + amount
+            for field, value in update._doc["$min"].items():
+                doc[field] = min(doc.get(field, value), value)
+            for field, value in update._doc["$max"].items():
+                doc[field] = max(doc.get(field, value), value)
+            doc.update(update._doc["$set"])
+
+    async def rename(self, new_name, dropTarget=False):
+        assert dropTarget or new_name not in self.db.collections
+        del self.db.collections[self.name]
+        self.name = new_name
+        self.db.collections[new_name] = self
+
+    async def drop(self):
+        self.db.collections.pop(self.name, None)
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self, name)
+        return self.collections[name]
+
+def add_trade(db, trade_id, item_a, quantity_a, item_b, quantity_b):
+    db["Trade-History"].docs.append({
+        "_id": trade_id, "item_a": item_a, "quantity_a": quantity_a,
+        "item_b": item_b, "quantity_b": quantity_b, "timestamp": None
+    })
+
+def test_rebuild_counts_trades_recorded_during_scan():
+    db = FakeDatabase()
+    for i in range(5):
+        add_trade(db, i, "apple", 1, "banana", 2)
+    stats = PairStats()
+    recorded = []
+
+    async def new_trade_during_scan():
+        # 掃描途中有新交易：寫入交易歷史並 record()
+        if not recorded:
+            trade_id = 100 + len(recorded)
+            recorded.append(trade_id)
+            add_trade(db, trade_id, "apple", 1, "banana", 4)
+            await stats.record(db, "apple", 1, "banana", 4, None)
+
+    db["Trade-History"].on_find = new_trade_during_scan
+
+    async def run():
+        await stats.rebuild(db)
+        db["Trade-History"].on_find = None
+        assert await stats.built(db)
+        return await stats.get(db, "apple", ["banana"])
+
+    docs = asyncio.run(run())
+    assert docs["banana"]["count"] == 6
+    assert docs["banana"]["max"] == 4
+    assert set(db.collections) == {"Trade-History", "Pair-Stats"}
+
+def test_built_rechecks_marker_after_interval():
+    db = FakeDatabase()
+    stats = PairStats(check_interval=0)
+
+    async def run():
+        await stats.rebuild(db)
+        assert await stats.built(db)
+        db["Pair-Stats"].docs.clear()
+        return await stats.built(db)
+
+    assert asyncio.run(run()) is False
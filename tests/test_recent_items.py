@@ -0,0 +1,67 @@
+import asyncio
+import datetime
+
+from core.recent_items import RecentItemsIndex
+
+BASE = datetime.datetime(2025, 1, 1)
+
+def at(minutes):
+    return BASE + datetime.timedelta(minutes=minutes)
+
+async def seed(db, user, trades):
+    await db[user].insert_many([{"item_a": item, "timestamp": at(m)} for item, m in trades])
+
+def test_record_updates_built_index_and_trims_to_cap(fake_redis, fake_db):
+    index = RecentItemsIndex(cap=3)
+
+    async def scenario():
+        await seed(fake_db, "alice", [("apple", 1), ("pear", 2)])
+        assert await index.items(fake_db, "alice") == ["pear", "apple"]
+        await index.record("alice", "plum", at(3))
+        await index.record("alice", "fig", at(4))
+        # 較舊的時間不會覆蓋較新的分數
+        await index.record("alice", "fig", at(0))
+        return await index.get("alice")
+
+    assert asyncio.run(scenario()) == ["fig", "plum", "pear"]
+
+def test_record_on_unbuilt_index_only_clears_marker(fake_redis, fake_db):
+    index = RecentItemsIndex()
+
+    async def scenario():
+        await index.record("bob", "apple", at(1))
+        assert not await fake_redis.exists(index.key("bob"))
+        await seed(fake_db, "bob", [("apple", 1), ("pear", 0)])
+        return await index.items(fake_db, "bob")
+
+    assert asyncio.run(scenario()) == ["apple", "pear"]
+
+def test_evicted_set_with_marker_is_rebuilt(fake_redis, fake_db):
+    index = RecentItemsIndex()
+
+    async def scenario():
+        await seed(fake_db, "carol", [("apple", 1), ("pear", 2)])
+        await index.items(fake_db, "carol")
+        # 只有集合被淘汰：標記仍在，不應回傳空結果
+        await fake_redis.delete(index.key("carol"))
+        assert await fake_redis.exists(index.built_key("carol"))
+        assert await index.get("carol") is None
+        await index.record("carol", "plum", at(3))
+        return await index.items(fake_db, "carol", limit=2)
+
+    assert asyncio.run(scenario()) == ["pear", "apple"]
+
+def test_rebuild_all_groups_trade_history_by_user(fake_redis, fake_db):
+    index = RecentItemsIndex()
+
+    async def scenario():
+        await fake_db["Trade-History"].insert_many([
+            {"user_a": "alice", "item_a": "apple", "timestamp": at(1)},
+            {"user_a": "alice", "item_a": "apple", "timestamp": at(5)},
+            {"user_a": "alice", "item_a": "pear", "timestamp": at(3)},
+            {"user_a": "bob", "item_a": "plum", "timestamp": at(2)},
+        ])
+        users = await index.rebuild_all(fake_db, batch_size=1)
+        return users, await index.get("alice"), await index.get("bob")
+
+    assert asyncio.run(scenario()) == (2, ["apple", "pear"], ["plum"])
@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+from core.redis_client import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, CircuitBreaker, RedisClient
+
+class FlakyRedis:
+    """只實作測試用到的指令；down=True 時所有指令連線失敗"""
+
+    def __init__(self):
+        self.data = {}
+        self.down = False
+        self.calls = 0
+
+    def _check(self):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("redis down")
+
+    async def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        self._check()
+        self.data[key] = value
+        return True
+
+    async def setex(self, key, seconds, value):
+        return await self.set(key, value)
+
+    async def incr(self, key, amount=1):
+        self._check()
+        self.data[key] = str(int(self.data.get(key, 0)) + amount).encode()
+        return int(self.data[key])
+
+    def pipeline(self, transaction=False):
+        return FlakyPipeline(self)
+
+class FlakyPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def incr(self, key, amount=1):
+        self.ops.append(("incr", key, amount))
+
+    def unlink(self, *keys):
+        self.ops.append(("unlink", keys))
+
+    async def execute(self, raise_on_error=True):
+        self.redis._check()
+        results = []
+        for op in self.ops:
+            if op[0] == "incr":
+                results.append(await self.redis.incr(op[1], op[2]))
+            else:
+                results.append(sum(self.redis.data.pop(k, None) is not None for k in op[1]))
+        return results
+
+def make_client(threshold=3, reset=60.0):
+    client = RedisClient()
+    client.redis = FlakyRedis()
+    client.breaker = CircuitBreaker(failure_threshold=threshold, reset_timeout=reset)
+    return client
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == BREAKER_CLOSED
+    breaker.record_success()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN
+    assert not breaker.allow()
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    breaker.opened_at = time.monotonic() - 61
+    assert breaker.state == BREAKER_HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN
+    breaker.opened_at = time.monotonic() - 61
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == BREAKER_CLOSED
+
+def test_outage_is_served_from_fallback_without_touching_redis():
+    async def scenario():
+        client = make_client(threshold=3)
+        client.redis.down = True
+        for i in range(3):
+            assert await client.set(f"k{i}", {"v": i}, expire=60)
+        assert client.breaker.state == BREAKER_OPEN
+        calls = client.redis.calls
+        assert await client.get("k1") == {"v": 1}
+        assert await client.incr("gen", 2) == 2
+        assert client.redis.calls == calls
+    asyncio.run(scenario())
+
+def test_recovery_replays_increments_and_deletes():
+    async def scenario():
+        client = make_client(threshold=1)
+        client.redis.data["stale"] = b"1"
+        client.redis.down = True
+        await client.incr("tag:gen")
+        assert client.breaker.state == BREAKER_OPEN
+        await client.delete("stale")
+        await client.incr("tag:gen")
+
+        client.redis.down = False
+        client.breaker.opened_at = time.monotonic() - 61
+        assert await client.get("missing") is None
+        assert client.breaker.state == BREAKER_CLOSED
+        assert client.redis.data["tag:gen"] == b"2"
+        assert "stale" not in client.redis.data
+        assert not client.fallback.has_pending
+    asyncio.run(scenario())
@@ -0,0 +1,58 @@
+import asyncio
+
+from core.trade_counters import TradeCounters
+
+TRADES = [("apple", "pear"), ("pear", "apple"), ("apple", "plum"), ("fig", "pear")]
+
+async def seed(db):
+    await db["Trade-History"].insert_many([{"item_a": a, "item_b": b} for a, b in TRADES])
+
+def test_counts_are_unavailable_until_reconciled(fake_redis, fake_db):
+    counters = TradeCounters()
+
+    async def scenario():
+        await seed(fake_db)
+        # 未核對前的遞增不應被當成完整結果
+        await counters.record("apple", "pear")
+        assert await counters.top_pairs() is None
+        await counters.reconcile(fake_db)
+        return await counters.top_pairs(), await counters.top_items(2), await counters.top_partners("pear")
+
+    pairs, items, partners = asyncio.run(scenario())
+    assert pairs[0] == (["apple", "pear"], 2)
+    assert sorted(count for _, count in pairs) == [1, 1, 2]
+    assert dict(items) == {"apple": 3, "pear": 3}
+    assert dict(partners) == {"apple": 2, "fig": 1}
+
+def test_reconcile_repairs_drift_and_removes_stale_partners(fake_redis, fake_db):
+    counters = TradeCounters()
+
+    async def scenario():
+        await seed(fake_db)
+        await counters.reconcile(fake_db)
+        await counters.record("apple", "pear")
+        await counters.record("ghost", "apple")
+        stats = await counters.reconcile(fake_db)
+        return stats, await counters.top_partners("apple"), await fake_redis.exists(counters.partners_key("ghost"))
+
+    stats, partners, ghost = asyncio.run(scenario())
+    assert stats["drifted_keys"] == 4
+    assert stats["removed_keys"] == 1
+    assert dict(partners) == {"pear": 2, "plum": 1}
+    assert ghost == 0
+
+def test_reconcile_if_due_skips_fresh_marker_and_held_lock(fake_redis, fake_db):
+    counters = TradeCounters(interval=3600)
+
+    async def scenario():
+        await seed(fake_db)
+        await fake_redis.set(counters.lock_key, "other-worker")
+        assert await counters.reconcile_if_due(fake_db) is None
+        assert await counters.top_items() is None
+        await fake_redis.delete(counters.lock_key)
+        assert await counters.reconcile_if_due(fake_db) is not None
+        # 標記未過期時不再核對
+        assert await counters.reconcile_if_due(fake_db) is None
+        return await counters.reconcile_if_due(fake_db, max_age=0)
+
+    assert asyncio.run(scenario()) is not None
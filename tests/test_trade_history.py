@@ -0,0 +1,104 @@
+import asyncio
+import datetime
+import json
+
+import pytest
+
+import api.trade as trade_api
+from api.trade import (
+    _decode_cursor, _encode_cursor, _stream_trade_document, _stream_trades, get_trade_history
+)
+
+BASE = datetime.datetime(2025, 1, 1)
+
+@pytest.fixture
+def history(fake_redis, fake_db, monkeypatch):
+    async def get_database():
+        return fake_db
+
+    monkeypatch.setattr(trade_api, "get_database", get_database)
+    # 時間重複（同一分鐘兩筆）與缺少 timestamp 的交易都要依 (timestamp, _id) 排在固定位置
+    trades = [{"n": i, "timestamp": BASE + datetime.timedelta(minutes=i // 2)} for i in range(23)]
+    trades += [{"n": 100 + i} for i in range(3)]
+    asyncio.run(fake_db["Trade-History"].insert_many(trades))
+    return fake_db
+
+def expected_order(db):
+    async def load():
+        return await db["Trade-History"].find({}).sort(trade_api.TRADE_HISTORY_SORT).to_list(length=None)
+    return [t["n"] for t in asyncio.run(load())]
+
+def test_cursor_pages_cover_history_without_gaps(history):
+    async def pages():
+        seen, cursor = [], ""
+        while True:
+            page = await get_trade_history(limit=7, cursor=cursor)
+            seen.extend(t["n"] for t in page["trade_history"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return seen
+
+    assert asyncio.run(pages()) == expected_order(history)
+
+def test_cursor_round_trip_orders_after_the_trade():
+    oid = "65a000000000000000000001"
+    assert _decode_cursor(_encode_cursor({"_id": oid, "timestamp": BASE})) == {"$or": [
+        {"timestamp": {"$lt": BASE}},
+        {"timestamp": BASE, "_id": {"$lt": trade_api.ObjectId(oid)}},
+        {"timestamp": None}
+    ]}
+    assert _decode_cursor(_encode_cursor({"_id": oid})) == {
+        "timestamp": None, "_id": {"$lt": trade_api.ObjectId(oid)}
+    }
+
+def test_invalid_cursor_is_reported(history):
+    result = asyncio.run(get_trade_history(limit=5, cursor="not-a-cursor"))
+    assert result["error"] == "無效的 cursor"
+
+async def read_body(response):
+    return "".join([chunk async for chunk in response.body_iterator])
+
+def test_default_limit_returns_every_trade(history):
+    async def scenario():
+        return json.loads(await read_body(await get_trade_history()))
+
+    result = asyncio.run(scenario())
+    assert [t["n"] for t in result["trade_history"]] == expected_order(history)
+    assert result["count"] == 26
+    assert result["next_cursor"] is None
+
+def test_ndjson_stream_respects_limit(history):
+    async def scenario():
+        return await read_body(await get_trade_history(limit=5, stream=True))
+
+    lines = [json.loads(line) for line in asyncio.run(scenario()).splitlines()]
+    assert [t["n"] for t in lines] == expected_order(history)[:5]
+
+class FailingCursor:
+    def __init__(self, trades):
+        self.trades = list(trades)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.trades:
+            raise RuntimeError("connection reset")
+        return self.trades.pop(0)
+
+def test_stream_failure_ends_with_error_line():
+    async def scenario():
+        return [line async for line in _stream_trades(FailingCursor([{"_id": 1, "n": 1}]))]
+
+    lines = [json.loads(line) for line in asyncio.run(scenario())]
+    assert lines[0]["n"] == 1
+    assert lines[-1] == {"error": "交易歷史串流中斷", "details": "connection reset"}
+
+def test_document_stream_failure_stays_valid_json():
+    async def scenario():
+        chunks = [c async for c in _stream_trade_document(FailingCursor([{"_id": 1, "n": 1}]))]
+        return json.loads("".join(chunks))
+
+    result = asyncio.run(scenario())
+    assert result["count"] == 1
+    assert result["error"] == "交易歷史串流中斷"
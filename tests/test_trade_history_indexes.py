@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+import api.trade as trade_api
+from api.trade import TRADE_HISTORY_INDEX_LOCK, ensure_trade_history_indexes
+from core.redis_client import FallbackStore, redis_client
+
+@pytest.fixture
+def worker(fake_redis, fake_db, monkeypatch):
+    """模擬新啟動的 worker：行程內的索引記錄是空的，並記錄列舉 collection 的次數"""
+    scans = []
+    list_collection_names = fake_db.list_collection_names
+
+    async def counted():
+        scans.append(1)
+        return await list_collection_names()
+
+    async def snapshot(db):
+        return 1, ["apple"]
+
+    monkeypatch.setattr(fake_db, "list_collection_names", counted)
+    monkeypatch.setattr(trade_api.item_registry, "snapshot", snapshot)
+    monkeypatch.setattr(trade_api, "_indexed_collections", set())
+    asyncio.run(fake_db["Trade-History"].insert_one({"user_a": "alice", "item_a": "apple"}))
+    asyncio.run(fake_db["alice"].insert_one({"item_a": "apple"}))
+    asyncio.run(fake_db["apple"].insert_one({"item_a": "apple"}))
+    return fake_db, scans
+
+def indexed(db, name):
+    return "timestamp_-1__id_-1" in asyncio.run(db[name].index_information())
+
+def test_indexes_are_built_once_across_workers(worker, monkeypatch):
+    db, scans = worker
+    asyncio.run(ensure_trade_history_indexes(db))
+    assert all(indexed(db, name) for name in ("Trade-History", "alice", "apple"))
+    # 下一個 worker（或重啟）看到標記後直接略過
+    monkeypatch.setattr(trade_api, "_indexed_collections", set())
+    asyncio.run(ensure_trade_history_indexes(db))
+    assert scans == [1]
+
+def test_worker_skips_while_another_holds_the_lock(worker, fake_redis):
+    db, scans = worker
+
+    async def scenario():
+        await fake_redis.set(TRADE_HISTORY_INDEX_LOCK, "other-worker")
+        await ensure_trade_history_indexes(db)
+
+    asyncio.run(scenario())
+    assert scans == []
+
+def test_each_worker_builds_when_redis_is_unavailable(worker):
+    db, scans = worker
+    redis_client.breaker.trip()
+    asyncio.run(ensure_trade_history_indexes(db))
+    # 另一個 worker 有自己的行程內備援，看不到這個 worker 的標記
+    redis_client.fallback = FallbackStore()
+    asyncio.run(ensure_trade_history_indexes(db))
+    assert scans == [1, 1]
+    assert indexed(db, "alice")
@@ -0,0 +1,38 @@
+import asyncio
+
+from core.cache import cache
+from core.redis_client import redis_client
+from core.warmup import CacheWarmer
+
+def test_only_one_worker_warms_up(fake_redis):
+    calls = []
+
+    @cache(ttl=60, key_prefix="items:warm")
+    async def collections():
+        calls.append(1)
+        return ["apple"]
+
+    async def scenario():
+        workers = [CacheWarmer(), CacheWarmer()]
+        for warmer in workers:
+            warmer.register(collections)
+        await asyncio.gather(*(warmer.warm_all() for warmer in workers))
+        return [warmer.entries[0].refreshes for warmer in workers]
+
+    assert sorted(asyncio.run(scenario())) == [0, 1]
+    assert calls == [1]
+
+def test_each_worker_warms_when_redis_is_unavailable(fake_redis):
+    @cache(ttl=60, key_prefix="items:warm-down")
+    async def collections():
+        return ["apple"]
+
+    async def scenario():
+        redis_client.breaker.trip()
+        workers = [CacheWarmer(), CacheWarmer()]
+        for warmer in workers:
+            warmer.register(collections)
+            await warmer.warm_all()
+        return [warmer.entries[0].refreshes for warmer in workers]
+
+    assert asyncio.run(scenario()) == [1, 1]